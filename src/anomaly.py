@@ -0,0 +1,162 @@
+import os
+import math
+import threading
+from collections import deque
+from src.bulk import machine_tags
+
+# Metrics watched by default ('cpu' ratio, 'mem' bytes, I/O bytes/s)
+ANOMALY_METRICS = ('cpu', 'mem', 'diskread', 'diskwrite', 'netin', 'netout')
+# Smallest standard deviation per metric, so a perfectly flat baseline does not
+# turn a 0.1% CPU blip into an anomaly
+MIN_STD = {'cpu': 0.02, 'mem': 16 * 1024**2, 'diskread': 64 * 1024, 'diskwrite': 64 * 1024, 'netin': 64 * 1024, 'netout': 64 * 1024}
+
+class AnomalyDetector:
+    """
+    Streaming anomaly detector over guest metrics.
+
+    Keeps an exponentially weighted mean and variance per (guest, metric):
+    O(1) memory and O(1) work per sample, so a whole cluster can be fed on
+    every poll. A sample more than `threshold` standard deviations away from
+    the guest's own baseline (after `warmup` samples) opens an anomaly window,
+    which closes at the first normal sample and is then kept in a bounded
+    history. Flagged samples do not move the baseline until the window
+    outlasts `warmup` samples (a lasting level shift becomes the new normal).
+    """
+
+    def __init__(self, alpha=None, threshold=None, warmup=None, history=None, metrics=ANOMALY_METRICS):
+        """
+        Args:
+            alpha (float, optional): EWMA smoothing factor (env: PROXMOX_ANOMALY_ALPHA, default 0.1).
+            threshold (float, optional): z-score flagging a sample (env: PROXMOX_ANOMALY_Z, default 3).
+            warmup (int, optional): Samples before a baseline is trusted (env: PROXMOX_ANOMALY_WARMUP, default 10).
+            history (int, optional): Closed windows kept (env: PROXMOX_ANOMALY_HISTORY, default 500).
+            metrics (tuple): Metrics watched.
+        """
+        self.alpha = alpha or float(os.getenv("PROXMOX_ANOMALY_ALPHA", "0.1"))
+        self.threshold = threshold or float(os.getenv("PROXMOX_ANOMALY_Z", "3"))
+        self.warmup = warmup if warmup is not None else int(os.getenv("PROXMOX_ANOMALY_WARMUP", "10"))
+        self.metrics = metrics
+        self._state = {}
+        self._open = {}
+        self._closed = deque(maxlen=history or int(os.getenv("PROXMOX_ANOMALY_HISTORY", "500")))
+        self._lock = threading.Lock()
+
+    def observe(self, vmid, ts, values):
+        """
+        Feeds one sample of a guest.
+
+        Args:
+            vmid (int): Guest ID.
+            ts (int): Sample timestamp.
+            values (dict): {metric: value}; missing or None metrics are skipped.
+
+        Returns:
+            list: Metrics of this sample found abnormal.
+        """
+        flagged = []
+        with self._lock:
+            for metric in self.metrics:
+                value = values.get(metric)
+                if value is None or value != value:
+                    continue
+                key = (int(vmid), metric)
+                state = self._state.get(key)
+                if state is None:
+                    self._state[key] = [float(value), 0.0, 1]
+                    continue
+                mean, var, count = state
+                std = max(math.sqrt(var), MIN_STD.get(metric, 0.0), abs(mean) * 0.01)
+                z = (value - mean) / std if std else 0.0
+
+                if count >= self.warmup and abs(z) >= self.threshold:
+                    flagged.append(metric)
+                    self._flag(key, ts, value, mean, std, z)
+                    # Keep outliers out of the baseline, unless they last long
+                    # enough to be the guest's new level
+                    if self._open[key]['samples'] <= self.warmup:
+                        continue
+                elif key in self._open:
+                    self._closed.append(dict(self._open.pop(key), active=False))
+
+                # Exponentially weighted mean and variance (West's incremental update)
+                diff = value - mean
+                incr = self.alpha * diff
+                state[0] = mean + incr
+                state[1] = (1 - self.alpha) * (var + diff * incr)
+                state[2] = count + 1
+        return flagged
+
+    def _flag(self, key, ts, value, mean, std, z):
+        window = self._open.get(key)
+        if window is None:
+            window = self._open[key] = {
+                'vmid': key[0], 'metric': key[1], 'start': ts, 'end': ts, 'samples': 0,
+                'peak': value, 'z': z, 'baseline': mean, 'std': std, 'active': True,
+            }
+        window['end'] = ts
+        window['samples'] += 1
+        if abs(z) > abs(window['z']):
+            window.update(peak=value, z=z)
+
+    def observe_rows(self, ts, rows):
+        """Feeds one sample per guest (dicts with 'vmid' and metric values). Returns the number of flags."""
+        return sum(len(self.observe(r['vmid'], ts, r)) for r in rows)
+
+    def replay(self, vmid, points):
+        """Feeds a guest's RRD points in time order (bootstraps a baseline from history)."""
+        for p in sorted((p for p in points if p.get('time') is not None), key=lambda p: p['time']):
+            self.observe(vmid, int(p['time']), p)
+
+    def anomalies(self, active_only=False, metric=None, since=None):
+        """
+        Lists anomaly windows, most recent first.
+
+        Args:
+            active_only (bool): Only windows still open.
+            metric (str, optional): Only this metric.
+            since (int, optional): Only windows ending at or after this timestamp.
+
+        Returns:
+            list: Window dicts (vmid, metric, start, end, samples, peak, z, baseline, std, active).
+        """
+        with self._lock:
+            windows = [dict(w) for w in self._open.values()]
+            if not active_only:
+                windows += [dict(w) for w in self._closed]
+        windows = [w for w in windows if (not metric or w['metric'] == metric) and (since is None or w['end'] >= since)]
+        return sorted(windows, key=lambda w: (w['end'], abs(w['z'])), reverse=True)
+
+    def stats(self):
+        """dict: Baselines tracked, open and closed windows."""
+        with self._lock:
+            return {'baselines': len(self._state), 'active': len(self._open), 'closed': len(self._closed)}
+
+def detect_from_rrd(series, **options):
+    """
+    Replays RRD history into a fresh detector (used when no collector is running).
+
+    Args:
+        series (dict): {vmid: rrddata points}.
+        **options: AnomalyDetector arguments.
+
+    Returns:
+        AnomalyDetector: The detector after the replay.
+    """
+    detector = AnomalyDetector(**options)
+    for vmid, points in series.items():
+        detector.replay(vmid, points)
+    return detector
+
+def annotate(windows, machines, node=None, tag=None):
+    """
+    Adds the name, node and type of each guest to anomaly windows, dropping
+    the guests outside the node/tag scope or gone from the inventory.
+    """
+    by_vmid = {int(m['vmid']): m for m in machines}
+    result = []
+    for w in windows:
+        m = by_vmid.get(w['vmid'])
+        if m is None or (node and m.get('node') != node) or (tag and tag not in machine_tags(m)):
+            continue
+        result.append(dict(w, name=m.get('name'), node=m.get('node'), type=m.get('type')))
+    return result
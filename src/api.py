@@ -1,220 +1,544 @@
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from typing import Optional, List
-from src.client import ProxmoxClient
+from contextlib import asynccontextmanager
+from src.lazy import LazyClient
+from src.settings import load_env
+from src.models import (
+    MachineActionRequest, StopMachineRequest, SnapshotRequest, RollbackRequest, CloneRequest,
+    ResizeRequest, BulkActionRequest, CreateBackupRequest, FirewallRuleRequest, BatchRequest,
+)
+from src.batch import run_batch
+from src.pagination import SnapshotPager
+from src.query import QUERY_FIELDS, DEFAULT_FIELDS, build_query
+from src.history import HistoryCollector, get_history_store
+from src.top import TOP_METRICS, top_consumers as select_top
+from src.fleet import FLEET_METRICS, GROUP_BY, check_query, select_fleet, fleet_summary
+from src.forecast import FORECAST_METHODS, capacity_targets, capacity_forecasts
+from src.anomaly import ANOMALY_METRICS, AnomalyDetector, detect_from_rrd, annotate
+from src.metrics import REGISTRY, CONTENT_TYPE, ENDPOINT_DURATION, track, watch_client
+from src.events import EVENT_TYPES, ClusterWatcher
 import os
+import json
+import time
+import hashlib
+
+# Settings from the .env file, before anything reads them
+load_env()
+
+def _connect():
+    """Builds the shared Proxmox client (httpx is only imported here, on first use)."""
+    from src.async_client import get_async_client
+    client = get_async_client()
+    watch_client(client)
+    return client
+
+# Proxmox client, built on the first request that needs it (and retried after a failure)
+proxmox = LazyClient(_connect)
+
+# Optional local metrics history (PROXMOX_HISTORY_DB) and anomaly detection, sampled in the background;
+# the SQLite database is only opened when the collector starts (see lifespan)
+detector = AnomalyDetector()
+watch = bool(os.getenv("PROXMOX_HISTORY_DB")) or os.getenv("PROXMOX_ANOMALY_WATCH", "false").lower() == "true"
+collector = HistoryCollector(proxmox, detector=detector) if watch else None
+# Single cluster poller shared by every /events subscriber
+watcher = ClusterWatcher(proxmox)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if collector:
+        collector.store = get_history_store()
+        collector.start()
+    yield
+    if collector:
+        await collector.stop()
+    if watcher:
+        await watcher.stop()
+    if proxmox is not None:
+        await proxmox.aclose()
+
+# Inventory snapshots backing the /machines cursors
+pager = SnapshotPager()
 
 app = FastAPI(
     title="Proxmox MCP API",
     description="REST API to control Proxmox VE, compatible with LobeChat Plugins.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Initialize Proxmox Client
-try:
-    proxmox = ProxmoxClient()
-except Exception as e:
-    print(f"Warning: Proxmox Client initialization failed: {e}")
-    proxmox = None
+# Compresses the JSON listings (a 1000-guest /machines is ~100 KB, ~10 KB gzipped)
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("PROXMOX_API_GZIP_MIN_SIZE", "1024")))
 
-# --- Pydantic Models ---
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Records the latency of every request per route template and status code."""
+    with track('endpoint', ENDPOINT_DURATION, method=request.method, route='unmatched') as outcome:
+        response = await call_next(request)
+        outcome['status'] = str(response.status_code)
+        # Matched route template (/machines/{node}/{vmid}/config), not the raw path
+        route = request.scope.get('route')
+        if route:
+            outcome['route'] = route.path
+    return response
 
-class MachineActionRequest(BaseModel):
-    node: str
-    vmid: int
-    type: str  # 'qemu' or 'lxc'
+# --- Helpers ---
 
-class StopMachineRequest(MachineActionRequest):
-    force: bool = False
+def _ndjson(items):
+    """Serializes items one per line, so large listings are streamed instead of built in memory."""
+    for item in items:
+        yield json.dumps(item) + "\n"
 
-class SnapshotRequest(MachineActionRequest):
-    snapname: str
-    description: Optional[str] = None
-
-class RollbackRequest(MachineActionRequest):
-    snapname: str
+async def _resolve(req):
+    """Fills in the node (and type) a request omitted from the vmid location index."""
+    if req.node and getattr(req, 'type', True):
+        return
+    try:
+        node, machine_type = await proxmox.locate(req.vmid)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    req.node = req.node or node
+    if hasattr(req, 'type'):
+        req.type = req.type or machine_type
 
-class CloneRequest(MachineActionRequest):
-    newid: int
-    name: str
-    target_node: Optional[str] = None
+def _set_failures_header(response: Response, failures):
+    """Lists the nodes skipped by a cluster-wide fan-out in the X-Partial-Nodes header."""
+    if failures:
+        response.headers["X-Partial-Nodes"] = ", ".join(f"{f['node']}/{f['resource']}:{f['reason']}" for f in failures)
 
-class ResizeRequest(MachineActionRequest):
-    cores: Optional[int] = None
-    memory_mb: Optional[int] = None
+def _etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
 
-class CreateBackupRequest(BaseModel):
-    node: str
-    vmid: int
-    storage: str
-    mode: str = "snapshot"
+def _json_response(request: Request, response: Response, payload):
+    """
+    Serializes a listing once and tags it with an ETag (hash of the body).
 
-class FirewallRuleRequest(MachineActionRequest):
-    action: str
-    direction: str # 'in' or 'out'
-    proto: Optional[str] = None
-    port: Optional[str] = None
+    A client sending the ETag back in If-None-Match gets an empty 304 while the
+    data is unchanged, so polling a steady cluster costs no payload. The tag is
+    weak because GZipMiddleware may re-encode the body. Headers already set on
+    `response` (X-Partial-Nodes...) are kept.
+    """
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {k: v for k, v in response.headers.items() if k not in ("content-length", "content-type")}
+    headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 # --- Endpoints ---
 
+@app.get("/metrics", summary="Prometheus Metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Tool/endpoint latency, upstream Proxmox calls, cache and pool counters in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/infrastructure", summary="List Infrastructure Nodes")
-def list_infrastructure():
-    """Lists all nodes in the Proxmox cluster with their CPU and RAM usage."""
+async def list_infrastructure(request: Request, response: Response):
+    """Lists all nodes in the Proxmox cluster with their CPU and RAM usage (ETag / If-None-Match aware)."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
     
-    nodes = proxmox.get_nodes()
+    nodes = await proxmox.get_nodes()
+    fetched = await proxmox.get_all_node_resources([n['node'] for n in nodes])
+    _set_failures_header(response, fetched.failures)
+    resources = {r['node']: r for r in fetched}
     results = []
     for node in nodes:
-        # Fetch detailed resources for each node
-        try:
-            res = proxmox.get_node_resources(node['node'])
-            results.append({
-                "node": node['node'],
-                "status": node.get('status', 'unknown'),
-                "cpu_usage": f"{res.get('cpu', 0) * 100:.1f}%",
-                "ram_usage": f"{res.get('memory', {}).get('used', 0) / 1024**3:.1f} GB / {res.get('memory', {}).get('total', 0) / 1024**3:.1f} GB"
-            })
-        except:
-             results.append({"node": node['node'], "status": "unreachable"})
-    return results
+        res = resources.get(node['node'])
+        if res is None:
+            results.append({"node": node['node'], "status": "unreachable"})
+            continue
+        results.append({
+            "node": node['node'],
+            "status": node.get('status', 'unknown'),
+            "cpu_usage": f"{res.get('cpu', 0) * 100:.1f}%",
+            "ram_usage": f"{res.get('memory', {}).get('used', 0) / 1024**3:.1f} GB / {res.get('memory', {}).get('total', 0) / 1024**3:.1f} GB"
+        })
+    return _json_response(request, response, results)
 
 @app.get("/machines", summary="List all Machines")
-def list_machines(
+async def list_machines(
+    request: Request,
+    response: Response,
     name_filter: Optional[str] = None,
     status_filter: Optional[str] = Query(None, enum=["running", "stopped"]),
-    type_filter: Optional[str] = Query(None, enum=["qemu", "lxc"])
+    type_filter: Optional[str] = Query(None, enum=["qemu", "lxc"]),
+    node: Optional[str] = None,
+    tag: Optional[str] = None,
+    where: Optional[List[str]] = Query(None, description="Conditions, all required (e.g. mem>4G, cpu>=50%, name~web, tag!=dev)"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated columns among {', '.join(QUERY_FIELDS)} (default: {','.join(DEFAULT_FIELDS)}; '*' for every column)"),
+    sort: str = Query("vmid", description="Sort key, '-' prefix for descending (e.g. -mem)"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size (all machines if omitted)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    format: str = Query("json", enum=["json", "ndjson"])
 ):
-    """Lists all VMs and Containers (LXC) with optional filtering."""
+    """
+    Lists all VMs and Containers (LXC) with optional filtering.
+
+    The filters (`where` conditions and the name/status/type/node/tag
+    shorthands) are compiled once and applied in a single pass over the
+    cached inventory; only the `fields` columns are returned (`fields=*` for
+    the full rows). With `limit`, returns one page and the cursor of the next one in the
+    X-Next-Cursor header (X-Total-Count holds the total). `format=ndjson`
+    streams one JSON object per line. JSON pages carry an ETag; sending it back
+    in If-None-Match yields a 304 while the page is unchanged.
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+
+    try:
+        query = build_query(where, fields.split(",") if fields else None, sort,
+                            name_filter, status_filter, type_filter, node, tag)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    selected = None
+    headers = {}
+    if not cursor:
+        machines = await proxmox.get_all_machines()
+        _set_failures_header(response, machines.failures)
+        headers = dict(response.headers)
+        selected = query.select(machines)
+
+    try:
+        page = pager.page(limit, cursor, query.key, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = query.project(page.items)
+
+    headers["X-Total-Count"] = str(page.total)
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    if format == "ndjson":
+        return StreamingResponse(_ndjson(items), media_type="application/x-ndjson", headers=headers)
+    response.headers.update(headers)
+    return _json_response(request, response, items)
+
+@app.get("/machines/top", summary="Top Resource Consumers")
+async def top_consumers(
+    response: Response,
+    metric: str = Query("cpu", enum=list(TOP_METRICS)),
+    limit: int = Query(10, ge=1, le=1000),
+    node: Optional[str] = None,
+    tag: Optional[str] = None
+):
+    """
+    Lists the running guests consuming the most of a resource, from one
+    cluster-wide snapshot. I/O metrics are rates in bytes/s.
+    """
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
-    
-    machines = proxmox.get_all_machines()
-    filtered = []
-    for m in machines:
-        if name_filter and name_filter.lower() not in m.get('name', '').lower(): continue
-        if status_filter and m.get('status') != status_filter: continue
-        if type_filter and m.get('type') != type_filter: continue
-        
-        filtered.append({
-            "vmid": m.get('vmid'),
-            "name": m.get('name'),
-            "node": m.get('node'),
-            "type": m.get('type'),
-            "status": m.get('status'),
-            "uptime": m.get('uptime')
-        })
-    return filtered
+
+    machines = await proxmox.get_all_machines()
+    _set_failures_header(response, machines.failures)
+    previous = collector.counters() if collector else None
+    try:
+        return select_top(machines, metric, limit, node, tag, previous)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/storage", summary="List Storage")
-def list_storage(content_filter: Optional[str] = None):
-    """Displays the storage status for all nodes."""
+async def list_storage(request: Request, response: Response, content_filter: Optional[str] = None):
+    """Displays the storage status for all nodes (ETag / If-None-Match aware)."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
     
-    nodes = proxmox.get_nodes()
+    storages = await proxmox.get_all_storage([n['node'] for n in await proxmox.get_nodes()])
+    _set_failures_header(response, storages.failures)
     results = []
-    for node in nodes:
-        try:
-            storages = proxmox.get_storage_status(node['node'])
-            for s in storages:
-                 if content_filter and content_filter not in s.get('content', ''): continue
-                 results.append({
-                     "node": node['node'],
-                     "storage": s.get('storage'),
-                     "content": s.get('content'),
-                     "used_fraction": f"{s.get('used_fraction', 0) * 100:.1f}%",
-                     "total": f"{s.get('total', 0) / 1024**3:.1f} GB"
-                 })
-        except:
-            pass
-    return results
+    for s in storages:
+        if content_filter and content_filter not in s.get('content', ''): continue
+        results.append({
+            "node": s['node'],
+            "storage": s.get('storage'),
+            "content": s.get('content'),
+            "used_fraction": f"{s.get('used_fraction', 0) * 100:.1f}%",
+            "total": f"{s.get('total', 0) / 1024**3:.1f} GB"
+        })
+    return _json_response(request, response, results)
 
 @app.post("/machines/start", summary="Start a Machine")
-def start_machine(req: MachineActionRequest):
+async def start_machine(req: MachineActionRequest):
     """Starts a specific machine."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.set_machine_state(req.node, req.vmid, req.type, "start")}
+        return {"task_id": await proxmox.set_machine_state(req.node, req.vmid, req.type, "start")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/machines/stop", summary="Stop a Machine")
-def stop_machine(req: StopMachineRequest):
+async def stop_machine(req: StopMachineRequest):
     """Stops a specific machine (shutdown or force stop)."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
     action = "stop" if req.force else "shutdown"
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.set_machine_state(req.node, req.vmid, req.type, action)}
+        return {"task_id": await proxmox.set_machine_state(req.node, req.vmid, req.type, action)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/machines/reboot", summary="Reboot a Machine")
-def reboot_machine(req: MachineActionRequest):
+async def reboot_machine(req: MachineActionRequest):
     """Reboots a specific machine."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.set_machine_state(req.node, req.vmid, req.type, "reboot")}
+        return {"task_id": await proxmox.set_machine_state(req.node, req.vmid, req.type, "reboot")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/machines/bulk", summary="Bulk Power Action")
+async def bulk_power_action(req: BulkActionRequest, response: Response):
+    """
+    Starts, stops or reboots every machine matching a vmid list, tag and/or name pattern.
+
+    Returns one row per guest with a status: 'ok', 'error', or 'unknown' when
+    the call was sent without an answer in time (the action may have run).
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    if req.action not in ("start", "stop", "shutdown", "reboot"):
+        raise HTTPException(status_code=400, detail="action must be 'start', 'stop', 'shutdown' or 'reboot'")
+    try:
+        results = await proxmox.bulk_set_machine_state(req.action, req.vmids, req.tag, req.name_pattern, req.use_node_endpoints)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    _set_failures_header(response, results.failures)
+    return list(results)
+
+@app.post("/batch", summary="Batch Operations")
+async def batch_operations(req: BatchRequest):
+    """
+    Runs many start/stop/reboot/snapshot/rollback/clone/backup/resize operations
+    concurrently (at most PROXMOX_BULK_PER_NODE calls at a time per node).
+
+    Each operation's params follow the model of the matching single-action
+    endpoint. An operation listed in another's depends_on is waited for, and
+    its dependents are skipped unless its task succeeded. Returns one result
+    (status, UPID, task) per operation, in the given order.
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    try:
+        return await run_batch(proxmox, req.operations, req.wait, req.timeout)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/machines/{node}/{vmid}/config", summary="Get Machine Configuration")
-def get_machine_config(node: str, vmid: int, type: str = Query(..., enum=["qemu", "lxc"])):
+async def get_machine_config(node: str, vmid: int, type: str = Query(..., enum=["qemu", "lxc"])):
     """Retrieves the detailed configuration of a machine."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
     try:
-        return proxmox.get_machine_config(node, vmid, type)
+        return await proxmox.get_machine_config(node, vmid, type)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/machines/clone", summary="Clone a Machine")
-def clone_machine(req: CloneRequest):
+async def clone_machine(req: CloneRequest):
     """Clones a machine."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.clone_machine(req.node, req.vmid, req.newid, req.name, req.type, req.target_node)}
+        return {"task_id": await proxmox.clone_machine(req.node, req.vmid, req.newid, req.name, req.type, req.target_node)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/snapshots", summary="Create Snapshot")
-def create_snapshot(req: SnapshotRequest):
+async def create_snapshot(req: SnapshotRequest):
     """Creates a snapshot."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.create_snapshot(req.node, req.vmid, req.type, req.snapname, req.description)}
+        return {"task_id": await proxmox.create_snapshot(req.node, req.vmid, req.type, req.snapname, req.description)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/snapshots/rollback", summary="Rollback Snapshot")
-def rollback_snapshot(req: RollbackRequest):
+async def rollback_snapshot(req: RollbackRequest):
     """Rolls back to a snapshot."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.rollback_snapshot(req.node, req.vmid, req.type, req.snapname)}
+        return {"task_id": await proxmox.rollback_snapshot(req.node, req.vmid, req.type, req.snapname)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/snapshots", summary="List Snapshots")
-def list_snapshots(node: str, vmid: int, type: str = Query(..., enum=["qemu", "lxc"])):
+async def list_snapshots(node: str, vmid: int, type: str = Query(..., enum=["qemu", "lxc"])):
     """Lists snapshots."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
     try:
-        return proxmox.list_snapshots(node, vmid, type)
+        return await proxmox.list_snapshots(node, vmid, type)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/backups", summary="Create Backup")
-def create_backup(req: CreateBackupRequest):
+async def create_backup(req: CreateBackupRequest):
     """Creates a backup."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    await _resolve(req)
     try:
-        return {"task_id": proxmox.create_backup(req.node, req.vmid, req.storage, req.mode)}
+        return {"task_id": await proxmox.create_backup(req.node, req.vmid, req.storage, req.mode)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/backups", summary="List Backups")
-def list_backups(node: str, storage: str):
+async def list_backups(node: str, storage: str):
     """Lists backups."""
     if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
     try:
-        return proxmox.list_backups(node, storage)
+        return await proxmox.list_backups(node, storage)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/fleet/rrd", summary="Fleet Performance Aggregates")
+async def fleet_performance(
+    response: Response,
+    metric: str = Query("cpu", enum=list(FLEET_METRICS)),
+    timeframe: str = Query("hour", enum=["hour", "day", "week", "month", "year"]),
+    group_by: Optional[str] = Query(None, enum=list(GROUP_BY)),
+    node: Optional[str] = None,
+    tag: Optional[str] = None,
+    vmids: Optional[List[int]] = Query(None)
+):
+    """
+    Fetches the RRD data of the selected guests concurrently and returns, per
+    group, the sum, mean and p50/p95/p99 across guests at each timestamp.
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+
+    try:
+        check_query(metric, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    inventory = await proxmox.get_all_machines()
+    selected = select_fleet(inventory, vmids, node, tag)
+    fetched = await proxmox.get_machines_rrd_data(selected, timeframe)
+    _set_failures_header(response, inventory.failures + fetched.failures)
+    return fleet_summary(selected, dict(fetched), metric, group_by)
+
+@app.get("/capacity/forecast", summary="Capacity Forecast")
+async def capacity_forecast(
+    response: Response,
+    node: Optional[str] = None,
+    storage: Optional[str] = None,
+    threshold: float = Query(95, gt=0, le=100, description="Usage threshold in percent"),
+    timeframe: str = Query("month", enum=["week", "month", "year"]),
+    method: str = Query("theil-sen", enum=list(FORECAST_METHODS))
+):
+    """
+    Fits the usage trend of node RAM, node root disks and storages and returns
+    when each should reach the threshold (eta timestamp, days_left), soonest first.
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    if method not in FORECAST_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method '{method}'")
+
+    nodes = [n['node'] for n in await proxmox.get_nodes() if n.get('status') == 'online']
+    storages = await proxmox.get_all_storage(nodes)
+    series = await proxmox.get_capacity_rrd_data(capacity_targets(nodes, storages, node, storage), timeframe)
+    _set_failures_header(response, storages.failures + series.failures)
+    return capacity_forecasts(series, threshold / 100, method)
+
+@app.get("/anomalies", summary="Metric Anomalies")
+async def list_anomalies(
+    response: Response,
+    metric: Optional[str] = Query(None, enum=list(ANOMALY_METRICS)),
+    active_only: bool = False,
+    since_minutes: int = Query(60, ge=1),
+    node: Optional[str] = None,
+    tag: Optional[str] = None,
+    source: str = Query("auto", enum=["auto", "live", "rrd"])
+):
+    """
+    Lists the anomaly windows of guests deviating from their own baseline
+    (EWMA z-score), from the background detector or a replay of RRD history.
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    if source == "live" and not collector:
+        raise HTTPException(status_code=400, detail="Live detection disabled (set PROXMOX_ANOMALY_WATCH=true or PROXMOX_HISTORY_DB)")
+    if metric and metric not in ANOMALY_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric '{metric}'")
+
+    inventory = await proxmox.get_all_machines()
+    failures = list(inventory.failures)
+    if source == "live" or (source == "auto" and collector):
+        found = detector
+    else:
+        running = [m for m in select_fleet(inventory, node=node, tag=tag) if m.get('status') == 'running']
+        fetched = await proxmox.get_machines_rrd_data(running, 'hour')
+        failures += fetched.failures
+        found = detect_from_rrd(dict(fetched))
+    _set_failures_header(response, failures)
+    windows = found.anomalies(active_only, metric, since=int(time.time()) - since_minutes * 60)
+    return annotate(windows, inventory, node, tag)
+
+@app.get("/events", summary="Cluster Change Events (SSE)")
+async def cluster_events(
+    request: Request,
+    types: Optional[str] = Query(None, description=f"Comma-separated event types among {', '.join(EVENT_TYPES)}"),
+):
+    """
+    Streams cluster changes as Server-Sent Events: guests started, stopped or
+    migrated, nodes going offline, storages crossing the usage threshold,
+    tasks finished.
+
+    Every subscriber shares one upstream poll (PROXMOX_EVENTS_INTERVAL); only
+    changes are sent. A client reconnecting with Last-Event-ID gets the events
+    it missed, as far as the backlog (PROXMOX_EVENTS_BACKLOG) goes.
+    """
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    wanted = {t.strip() for t in types.split(",") if t.strip()} if types else None
+    unknown = (wanted or set()) - set(EVENT_TYPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown event types: {', '.join(sorted(unknown))}")
+    last_id = request.headers.get("last-event-id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    # Only needed by this endpoint
+    from sse_starlette.sse import EventSourceResponse
+
+    async def stream():
+        async with watcher.subscribe(last_id) as queue:
+            while True:
+                event = await queue.get()
+                if wanted is None or event['type'] in wanted:
+                    yield {"id": str(event['id']), "event": event['type'], "data": json.dumps(event)}
+
+    return EventSourceResponse(stream(), ping=15)
+
+@app.get("/tasks/{upid}", summary="Get Task Status")
+async def get_task_status(upid: str, wait: bool = False, timeout: int = Query(300, ge=0)):
+    """Returns the state, exit status and duration of a task; with wait=true, waits until it finishes."""
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    try:
+        if wait:
+            return await proxmox.wait_for_task(upid, timeout)
+        return await proxmox.get_task_status(upid)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/stats/pool", summary="Connection Pool Statistics")
+async def get_connection_pool_stats():
+    """Shows reused vs new connections to the Proxmox API."""
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    return proxmox.get_pool_stats()
+
+@app.get("/stats/cache", summary="Inventory Cache Statistics")
+async def get_cache_stats():
+    """Shows cache hits, misses and TTLs per resource kind."""
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    return proxmox.get_cache_stats()
+
+@app.get("/stats/calls", summary="Proxmox API Call Statistics")
+async def get_call_stats(slowest: int = Query(10, ge=0)):
+    """Shows per-endpoint latency (connect, server, transfer, decode) and the slowest recent calls."""
+    if not proxmox: raise HTTPException(status_code=503, detail="Proxmox client not initialized")
+    return proxmox.get_call_stats(slowest)
@@ -0,0 +1,811 @@
+import os
+import time
+import shlex
+import asyncio
+import logging
+from http.client import responses
+import httpx
+from proxmoxer.core import ResourceException, ANYEVENT_HTTP_STATUS_CODES
+from src.settings import load_settings, load_pool_settings
+from src.resources import (
+    machines_from_resources, machines_from_nodes, storage_from_resources, add_node_storage,
+    node_status_from_resources, node_status_from_nodes
+)
+from src.fanout import AsyncFanOut, PartialResult
+from src.cache import TTLCache, CLUSTER_TAG, invalidates_cache
+from src.locations import LocationIndex
+from src.tasks import TaskTracker, tracks_task
+from src.bulk import select_machines, plan_bulk_action, bulk_rows
+from src.metrics import IN_FLIGHT, ERRORS, observe_upstream
+from src.callstats import CallStats, trace_phases
+
+logger = logging.getLogger("mcp-proxmox.async_client")
+
+class AsyncProxmoxResource:
+    """
+    Minimal asyncio equivalent of proxmoxer's ProxmoxResource.
+
+    Builds API paths the same way (`api.nodes(node).qemu(vmid).status`) so
+    client methods read identically, but performs the requests with a shared
+    httpx.AsyncClient.
+    """
+
+    def __init__(self, http, path="", stats=None):
+        self._http = http
+        self._path = path
+        self._stats = stats
+
+    def __getattr__(self, item):
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return AsyncProxmoxResource(self._http, f"{self._path}/{item}", self._stats)
+
+    def __call__(self, resource_id=None):
+        if resource_id in (None, "", ()):
+            return self
+        if isinstance(resource_id, (tuple, list)):
+            resource_id = "/".join(str(part) for part in resource_id)
+        return AsyncProxmoxResource(self._http, f"{self._path}/{resource_id}", self._stats)
+
+    async def _request(self, method, data=None, params=None):
+        path = self._path
+        # Same cleanups as proxmoxer: drop None values, split agent commands
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        data = {k: v for k, v in (data or {}).items() if v is not None}
+        if isinstance(data.get('command'), str) and path.endswith("agent/exec"):
+            data['command'] = shlex.split(data['command'])
+
+        IN_FLIGHT.inc(side='upstream')
+        start = time.perf_counter()
+        try:
+            resp = await self._http.request(method, path, params=params or None, data=data or None)
+        except httpx.HTTPError as e:
+            ERRORS.inc(side='upstream', error=type(e).__name__)
+            self._observe(method, params or data, None, time.perf_counter() - start)
+            raise
+        finally:
+            IN_FLIGHT.dec(side='upstream')
+        elapsed = time.perf_counter() - start
+        if resp.status_code >= 400:
+            self._observe(method, params or data, resp, elapsed)
+            try:
+                errors = resp.json().get('errors')
+            except ValueError:
+                errors = None
+            # pveproxy answers 595/596 for unreachable nodes: no standard phrase for those
+            phrase = responses.get(resp.status_code) or ANYEVENT_HTTP_STATUS_CODES.get(resp.status_code, resp.reason_phrase)
+            raise ResourceException(resp.status_code, phrase, resp.reason_phrase or resp.text, errors=errors)
+        decoding = time.perf_counter()
+        result = resp.json().get('data')
+        self._observe(method, params or data, resp, elapsed, time.perf_counter() - decoding)
+        return result
+
+    def _observe(self, method, args, resp, elapsed, decode=None):
+        """Feeds the Prometheus metrics and the client's call statistics (resp is None without a response)."""
+        status = resp.status_code if resp is not None else 0
+        size = len(resp.content) if resp is not None else 0
+        observe_upstream(method, self._path, status, elapsed, size)
+        if self._stats is not None:
+            timings = trace_phases(resp.request.extensions.get('marks', {})) if resp is not None else {}
+            timings.update(decode=decode, total=elapsed + (decode or 0))
+            self._stats.record(method, self._path, status, timings, size, args)
+
+    async def get(self, *args, **params):
+        return await self(args)._request("GET", params=params)
+
+    async def post(self, *args, **data):
+        return await self(args)._request("POST", data=data)
+
+    async def put(self, *args, **data):
+        return await self(args)._request("PUT", data=data)
+
+    async def delete(self, *args, **params):
+        return await self(args)._request("DELETE", params=params)
+
+class AsyncProxmoxClient:
+    """
+    Asyncio client for the Proxmox VE API, built on httpx.AsyncClient.
+
+    Exposes the methods of ProxmoxClient as coroutines, so many tool calls
+    can be in flight on one event loop without a thread per request, plus
+    what the server and the API build on: inventory cache, vmid location
+    index, task tracking, bulk power actions, batched RRD reads and call
+    statistics.
+    """
+
+    def __init__(self, transport=None):
+        """
+        Initializes the async Proxmox API client using environment variables.
+
+        Args:
+            transport (httpx.AsyncBaseTransport, optional): Custom transport (tests, fake backends).
+
+        Raises:
+            ValueError: If required environment variables are missing.
+        """
+        settings = load_settings()
+        self.pool_settings = load_pool_settings()
+        self.pool_counters = {'requests': 0, 'new_connections': 0, 'tls_handshakes': 0}
+        # One client = one SSL context and one keep-alive pool: a TLS handshake
+        # only happens when the pool has to open a new connection.
+        self.http = httpx.AsyncClient(
+            base_url=f"https://{settings['host']}:{settings['port']}/api2/json",
+            headers={"Authorization": f"PVEAPIToken={settings['user']}!{settings['token_id']}={settings['token_secret']}"},
+            verify=settings['verify_ssl'],
+            timeout=float(os.getenv("PROXMOX_TIMEOUT", "5")),
+            limits=httpx.Limits(
+                max_connections=self.pool_settings['max_connections'],
+                max_keepalive_connections=self.pool_settings['max_keepalive'],
+                keepalive_expiry=self.pool_settings['keepalive_expiry'],
+            ),
+            event_hooks={'request': [self._on_request]},
+            transport=transport,
+        )
+        self.call_stats = CallStats()
+        self.api = AsyncProxmoxResource(self.http, stats=self.call_stats)
+        self.fanout = AsyncFanOut()
+        self.cache = TTLCache()
+        self.locations = LocationIndex()
+        self.tasks = TaskTracker()
+        # Concurrent power commands sent to a single node by bulk actions
+        self.bulk_per_node = int(os.getenv("PROXMOX_BULK_PER_NODE", "4"))
+
+    async def _on_request(self, request):
+        self.pool_counters['requests'] += 1
+        # Timestamps of the connection/request events, turned into call phases once answered
+        marks = request.extensions['marks'] = {}
+
+        async def trace(event, info):
+            marks[event.split('.', 1)[1]] = time.perf_counter()
+            await self._on_trace(event, info)
+        request.extensions['trace'] = trace
+
+    async def _on_trace(self, event, info):
+        # httpcore only emits connect/TLS events when it opens a new connection
+        if event == 'connection.connect_tcp.complete':
+            self.pool_counters['new_connections'] += 1
+        elif event == 'connection.start_tls.complete':
+            self.pool_counters['tls_handshakes'] += 1
+
+    def get_pool_stats(self):
+        """
+        Reports connection pool usage.
+
+        Returns:
+            dict: requests sent, new connections opened, TLS handshakes, pool
+                  hits (requests served on an already open connection) and limits.
+        """
+        counters = dict(self.pool_counters)
+        counters['pool_hits'] = counters['requests'] - counters['new_connections']
+        counters['limits'] = self.pool_settings
+        return counters
+
+    async def aclose(self):
+        """Closes the underlying HTTP connections."""
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def get_nodes(self):
+        """Lists all nodes in the Proxmox cluster."""
+        return await self._cached(('nodes',), lambda: self.api.nodes.get())
+
+    async def get_cluster_resources(self, resource_type=None):
+        """Lists the whole cluster's resources in a single call (/cluster/resources)."""
+        return await self._cached(('resources', resource_type), lambda: self.api.cluster.resources.get(type=resource_type))
+
+    async def _try_cluster_resources(self, resource_type):
+        """Returns /cluster/resources entries, or None if the endpoint is unavailable."""
+        try:
+            return await self.get_cluster_resources(resource_type)
+        except Exception as e:
+            logger.warning(f"/cluster/resources?type={resource_type} unavailable, falling back to per-node calls: {e}")
+            return None
+
+    async def get_all_machines(self):
+        """
+        Retrieves all VMs (QEMU) and Containers (LXC) across all nodes.
+
+        Uses /cluster/resources as primary source (one request for the whole
+        cluster). If it is unavailable, the per-node QEMU and LXC listings are
+        fetched concurrently, each node bounded by its own deadline. Either
+        way the location index is refreshed from the result.
+
+        Returns:
+            PartialResult: A unified list of dictionaries for both VMs and LXCs,
+                           including an extra 'type' field ('qemu' or 'lxc').
+                           Skipped nodes are listed in its `failures` attribute.
+        """
+        resources = await self._try_cluster_resources('vm')
+        if resources is not None:
+            machines = machines_from_resources(resources)
+            self.locations.refresh(machines)
+            return machines
+
+        targets = [(node['node'], machine_type) for node in await self.get_nodes() for machine_type in ('qemu', 'lxc')]
+        fetched = await self.fanout.run(
+            lambda node, machine_type: getattr(self.api.nodes(node), machine_type).get(),
+            targets
+        )
+        machines = machines_from_nodes(fetched)
+        self._log_failures("get_all_machines", machines.failures)
+        self.locations.refresh(machines, complete=machines.complete)
+        return machines
+
+    async def locate(self, vmid):
+        """
+        Finds the node and type of a machine from its vmid.
+
+        Uses the location index, refreshing it from the cluster inventory
+        when it is stale or does not know the vmid.
+
+        Args:
+            vmid (int): Machine ID.
+
+        Returns:
+            tuple: (node, machine_type).
+
+        Raises:
+            ValueError: If no machine with this vmid exists in the cluster.
+        """
+        location = None if self.locations.stale else self.locations.get(vmid)
+        if location is None:
+            await self.get_all_machines()
+            location = self.locations.get(vmid)
+        if location is None:
+            raise ValueError(f"Machine {vmid} introuvable dans le cluster.")
+        return location
+
+    async def get_all_storage(self, nodes=None):
+        """
+        Retrieves the storage status of several nodes.
+
+        Uses /cluster/resources as primary source. Nodes whose entries lack
+        the content types (older Proxmox versions), or all nodes if the
+        endpoint is unavailable, are queried concurrently per node.
+
+        Args:
+            nodes (list, optional): Node names to query. Defaults to every online node.
+
+        Returns:
+            PartialResult: Storage dictionaries, each including a 'node' field.
+                           Skipped nodes are listed in its `failures` attribute.
+        """
+        if nodes is None:
+            nodes = [n['node'] for n in await self.get_nodes() if n.get('status') == 'online']
+
+        storages, missing = storage_from_resources(await self._try_cluster_resources('storage'), nodes)
+        fetched = await self.fanout.run(lambda node, _: self.get_storage_status(node), [(node, 'storage') for node in missing])
+        add_node_storage(storages, fetched)
+        self._log_failures("get_all_storage", storages.failures)
+        return storages
+
+    async def get_all_node_resources(self, nodes=None):
+        """
+        Retrieves resource usage statistics of several nodes.
+
+        Uses /cluster/resources as primary source, falling back to concurrent
+        per-node status calls if it is unavailable.
+
+        Args:
+            nodes (list, optional): Node names to query. Defaults to every node in the cluster.
+
+        Returns:
+            PartialResult: Node status dictionaries (cpu, memory...), each including a 'node' field.
+                           Skipped or offline nodes are listed in its `failures` attribute.
+        """
+        resources = await self._try_cluster_resources('node')
+        if resources is not None:
+            return node_status_from_resources(resources, nodes)
+
+        if nodes is None:
+            nodes = [n['node'] for n in await self.get_nodes()]
+        fetched = await self.fanout.run(lambda node, _: self.get_node_resources(node), [(node, 'status') for node in nodes])
+        resources = node_status_from_nodes(fetched)
+        self._log_failures("get_all_node_resources", resources.failures)
+        return resources
+
+    async def _cached(self, key, fetch, tags=(CLUSTER_TAG,)):
+        """Returns the cached value for key, calling fetch() and caching its result on a miss."""
+        hit, value = self.cache.get(key)
+        if not hit:
+            value = await fetch()
+            self.cache.set(key, value, tags)
+        return value
+
+    def get_cache_stats(self):
+        """
+        Reports cache usage, to tune TTLs.
+
+        Returns:
+            dict: size, limits, TTLs and per-kind hit/miss statistics.
+        """
+        return self.cache.stats()
+
+    def get_call_stats(self, slowest=10):
+        """
+        Reports per-endpoint statistics of the Proxmox API calls.
+
+        Args:
+            slowest (int): Number of slowest recent calls to list with their arguments.
+
+        Returns:
+            dict: 'endpoints' (calls, errors, bytes, p50/p95/max and mean connect/server/
+                  transfer/decode/total time per path template) and 'slowest'.
+        """
+        return self.call_stats.snapshot(slowest)
+
+    async def poll_tasks(self):
+        """
+        Refreshes the status of every running tracked task in as few API calls as possible.
+
+        One /cluster/tasks call covers the whole cluster; UPIDs it does not list
+        (too recent, or pushed out of the list) are looked up with one
+        nodes/{node}/tasks call per node. Polls closer together than the
+        tracker's poll interval are skipped.
+
+        Returns:
+            list: Records of the tasks that finished during this poll.
+        """
+        pending = self.tasks.pending()
+        if not pending or not self.tasks.claim_poll():
+            return []
+
+        listed = set()
+        finished = []
+        try:
+            entries = await self.api.cluster.tasks.get()
+            listed = {e.get('upid') for e in entries}
+            finished += self.tasks.apply(entries)
+        except Exception as e:
+            logger.warning(f"/cluster/tasks unavailable, polling nodes ({e})")
+
+        since = {}
+        for task in pending:
+            if task['upid'] not in listed:
+                since[task['node']] = min(since.get(task['node'], task['starttime']), task['starttime'])
+        fetched = await self.fanout.run(
+            lambda node, _: self.api.nodes(node).tasks.get(source='all', since=since[node]),
+            [(node, 'tasks') for node in since]
+        )
+        for _, _, entries in fetched:
+            finished += self.tasks.apply(entries)
+        self._log_failures("poll_tasks", fetched.failures)
+
+        if finished:
+            self.locations.settle(finished)
+            self.cache.invalidate(
+                nodes={t['node'] for t in finished},
+                vmids={int(t['id']) for t in finished if t['id'].isdigit()}
+            )
+        return finished
+
+    async def get_task_status(self, upid):
+        """
+        Returns the current state of a task, tracking it if it was not issued by this client.
+
+        Args:
+            upid (str): Task identifier returned by a mutating call.
+
+        Returns:
+            dict: upid, node, type, id, user, starttime, status ('running' or 'stopped'),
+                  exitstatus, endtime, duration (seconds) and success.
+        """
+        task = self.tasks.track(upid)
+        if task['status'] == 'running':
+            await self.poll_tasks()
+            task = self.tasks.get(upid)
+        return task
+
+    async def wait_for_task(self, upid, timeout=300):
+        """
+        Waits until a task finishes, polling with exponential backoff.
+
+        Args:
+            upid (str): Task identifier.
+            timeout (float): Maximum wait in seconds.
+
+        Returns:
+            dict: The task record (see get_task_status). Its status is still
+                  'running' if the timeout expired first.
+        """
+        self.tasks.track(upid)
+        deadline = time.monotonic() + timeout
+        delays = self.tasks.backoff()
+        while True:
+            await self.poll_tasks()
+            task = self.tasks.get(upid)
+            remaining = deadline - time.monotonic()
+            if task['status'] != 'running' or remaining <= 0:
+                return task
+            await asyncio.sleep(min(next(delays), remaining))
+
+    def _log_failures(self, operation, failures):
+        for failure in failures:
+            logger.warning(f"{operation}: {failure['resource']} on {failure['node']} skipped ({failure['reason']}: {failure['error']})")
+
+    @invalidates_cache
+    @tracks_task
+    async def set_machine_state(self, node, vmid, machine_type, action):
+        """Changes the state of a machine ('start', 'stop', 'shutdown', 'reboot'). Returns the task ID."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).status.post(action)
+        elif machine_type == 'lxc':
+            return await self.api.nodes(node).lxc(vmid).status.post(action)
+        else:
+            raise ValueError("machine_type doit être 'qemu' ou 'lxc'")
+
+    @invalidates_cache
+    @tracks_task
+    async def _power_node_guests(self, node, endpoint, vms):
+        """Starts ('startall') or shuts down ('stopall') the listed guests of a node in one task."""
+        params = {'vms': ",".join(str(v) for v in vms)}
+        if endpoint == 'startall':
+            # Without force, startall skips the guests that are not flagged onboot
+            params['force'] = 1
+        return await getattr(self.api.nodes(node), endpoint).post(**params)
+
+    async def bulk_set_machine_state(self, action, vmids=None, tag=None, name_pattern=None, use_node_endpoints=True):
+        """
+        Changes the state of every machine matching a selection.
+
+        Status calls are sent concurrently, at most PROXMOX_BULK_PER_NODE at a
+        time on each node. A node whose every guest is selected gets a single
+        startall/stopall call for 'start'/'shutdown' instead.
+
+        A call that was sent but got no answer (fan-out deadline, read timeout)
+        may still have been executed: its guests are reported with status
+        'unknown' rather than as errors, so callers do not blindly retry.
+
+        Args:
+            action (str): 'start', 'stop', 'shutdown' or 'reboot'.
+            vmids (list, optional): Machine IDs.
+            tag (str, optional): Tag the machines must carry.
+            name_pattern (str, optional): Shell-style pattern on the name (e.g. 'web-*').
+            use_node_endpoints (bool): Allow startall/stopall for whole nodes.
+
+        Returns:
+            PartialResult: One row per guest (see bulk.bulk_rows), with the
+                           nodes missing from the inventory in `failures`.
+
+        Raises:
+            ValueError: If no selection criterion is given.
+        """
+        inventory = await self.get_all_machines()
+        selected = select_machines(inventory, vmids, tag, name_pattern)
+        jobs = plan_bulk_action(selected, inventory, action, use_node_endpoints)
+        by_key = {(node, endpoint or int(machines[0]['vmid'])): (endpoint, machines) for node, endpoint, machines in jobs}
+        limits = {node: asyncio.Semaphore(self.bulk_per_node) for node, _, _ in jobs}
+        sent, unanswered = set(), set()
+
+        async def dispatch(node, key):
+            endpoint, machines = by_key[(node, key)]
+            async with limits[node]:
+                sent.add((node, key))
+                try:
+                    if endpoint:
+                        return await self._power_node_guests(node, endpoint, [m['vmid'] for m in machines])
+                    return await self.set_machine_state(node, machines[0]['vmid'], machines[0]['type'], action)
+                except (httpx.ReadTimeout, httpx.WriteTimeout):
+                    unanswered.add((node, key))
+                    raise
+
+        fetched = await self.fanout.run(dispatch, list(by_key))
+        self._log_failures(f"bulk_set_machine_state({action})", fetched.failures)
+        # Past the fan-out deadline, only the calls still waiting for a node slot were surely not sent
+        unanswered |= {(f['node'], f['resource']) for f in fetched.failures if f['reason'] == 'timeout'} & sent
+        missing = {int(v) for v in vmids or []} - {int(m['vmid']) for m in selected}
+        rows = bulk_rows(jobs, {(node, key): upid for node, key, upid in fetched}, fetched.failures, sorted(missing), unanswered)
+        return PartialResult(rows, inventory.failures)
+
+    async def get_node_resources(self, node):
+        """Retrieves resource usage statistics for a specific node."""
+        return await self._cached(('node_status', node), lambda: self.api.nodes(node).status.get(), tags=[('node', node)])
+
+    async def get_storage_status(self, node):
+        """Retrieves storage status for a specific node."""
+        return await self._cached(('storage', node), lambda: self.api.nodes(node).storage.get(), tags=[('node', node)])
+
+    async def get_machine_config(self, node, vmid, machine_type):
+        """Retrieves the detailed configuration of a machine."""
+        return await self._cached(
+            ('config', node, int(vmid), machine_type),
+            lambda: (self.api.nodes(node).qemu(vmid) if machine_type == 'qemu' else self.api.nodes(node).lxc(vmid)).config.get(),
+            tags=[('vmid', int(vmid))]
+        )
+
+    async def list_snapshots(self, node, vmid, machine_type):
+        """Lists snapshots for a specific machine."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).snapshot.get()
+        return await self.api.nodes(node).lxc(vmid).snapshot.get()
+
+    @invalidates_cache
+    @tracks_task
+    async def create_snapshot(self, node, vmid, machine_type, snapname, description="Created via MCP"):
+        """Creates a new snapshot. Returns the task ID."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).snapshot.post(snapname=snapname, description=description)
+        return await self.api.nodes(node).lxc(vmid).snapshot.post(snapname=snapname, description=description)
+
+    @invalidates_cache
+    @tracks_task
+    async def rollback_snapshot(self, node, vmid, machine_type, snapname):
+        """Rolls back to a specific snapshot. Returns the task ID."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).snapshot(snapname).rollback.post()
+        return await self.api.nodes(node).lxc(vmid).snapshot(snapname).rollback.post()
+
+    @invalidates_cache
+    @tracks_task
+    async def clone_machine(self, node, vmid, newid, name, machine_type, target_node=None):
+        """Clones a machine (VM or LXC). Returns the task ID."""
+        params = {'newid': newid, 'name': name}
+        if target_node:
+            params['target'] = target_node
+
+        if machine_type == 'qemu':
+            upid = await self.api.nodes(node).qemu(vmid).clone.post(**params)
+        elif machine_type == 'lxc':
+            upid = await self.api.nodes(node).lxc(vmid).clone.post(**params)
+        else:
+            raise ValueError("machine_type doit être 'qemu' ou 'lxc'")
+
+        # Indexed once the clone task succeeded (poll_tasks); locate() refreshes on a miss until then
+        self.locations.expect(upid, newid, target_node or node, machine_type)
+        return upid
+
+    async def get_vm_agent_network(self, node, vmid):
+        """Retrieves internal network interfaces via QEMU Guest Agent."""
+        return await self.api.nodes(node).qemu(vmid).agent.network_get_interfaces.get()
+
+    async def exec_agent_command(self, node, vmid, command):
+        """Executes a simple command via QEMU Guest Agent."""
+        return await self.api.nodes(node).qemu(vmid).agent.exec.post(command=command)
+
+    async def list_backups(self, node, storage):
+        """Lists backups available on a specific storage."""
+        return await self.api.nodes(node).storage(storage).content.get(content='backup')
+
+    @invalidates_cache
+    @tracks_task
+    async def create_backup(self, node, vmid, storage, mode='snapshot', compress='zstd'):
+        """Creates a new backup for a machine."""
+        return await self.api.nodes(node).vzdump.post(vmid=vmid, storage=storage, mode=mode, compress=compress)
+
+    def get_console_url(self, node, vmid, machine_type):
+        """Constructs a direct link to the NoVNC console in the Proxmox Web UI (no API call)."""
+        base_url = os.getenv("PROXMOX_URL").rstrip('/')
+        return f"{base_url}/#v1:0:18:4:::::::{node}:{vmid}:novnc"
+
+    @invalidates_cache
+    @tracks_task
+    async def set_cloudinit_config(self, node, vmid, ciuser=None, cipassword=None, sshkeys=None, ipconfig0=None):
+        """Sets Cloud-Init configuration for a VM."""
+        params = {}
+        if ciuser: params['ciuser'] = ciuser
+        if cipassword: params['cipassword'] = cipassword
+        if sshkeys: params['sshkeys'] = sshkeys
+        if ipconfig0: params['ipconfig0'] = ipconfig0
+
+        if not params:
+            raise ValueError("Au moins un paramètre Cloud-Init doit être fourni.")
+
+        return await self.api.nodes(node).qemu(vmid).config.post(**params)
+
+    @invalidates_cache
+    @tracks_task
+    async def resize_machine_resources(self, node, vmid, machine_type, cores=None, memory=None):
+        """Resizes CPU cores and RAM (MB) for a VM or Container."""
+        params = {}
+        if cores: params['cores'] = cores
+        if memory: params['memory'] = memory
+
+        if not params:
+            raise ValueError("Au moins un paramètre (cores ou memory) doit être fourni.")
+
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).config.post(**params)
+        return await self.api.nodes(node).lxc(vmid).config.post(**params)
+
+    async def list_isos(self, node, storage):
+        """Lists ISO files available on a specific storage."""
+        return await self.api.nodes(node).storage(storage).content.get(content='iso')
+
+    @invalidates_cache
+    @tracks_task
+    async def download_iso(self, node, storage, url, filename):
+        """Downloads an ISO file from a URL to a specific storage. Returns the task ID."""
+        if not filename.endswith('.iso'):
+            raise ValueError("Le nom du fichier doit se terminer par .iso")
+
+        return await self.api.nodes(node).storage(storage).download_url.post(
+            content='iso',
+            filename=filename,
+            url=url
+        )
+
+    async def get_firewall_rules(self, node, vmid, machine_type):
+        """Lists firewall rules for a VM or LXC container."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).firewall.rules.get()
+        return await self.api.nodes(node).lxc(vmid).firewall.rules.get()
+
+    @invalidates_cache
+    @tracks_task
+    async def add_firewall_rule(self, node, vmid, machine_type, action, rule_type, proto=None, dport=None, sport=None, source=None, dest=None, enable=1):
+        """Adds a new firewall rule to a VM or LXC container."""
+        params = {
+            'action': action,
+            'type': rule_type,
+            'enable': enable
+        }
+        if proto: params['proto'] = proto
+        if dport: params['dport'] = dport
+        if sport: params['sport'] = sport
+        if source: params['source'] = source
+        if dest: params['dest'] = dest
+
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).firewall.rules.post(**params)
+        return await self.api.nodes(node).lxc(vmid).firewall.rules.post(**params)
+
+    @invalidates_cache
+    @tracks_task
+    async def migrate_machine(self, node, vmid, machine_type, target_node, online=False):
+        """Migrates a machine to another node. Returns the task ID."""
+        params = {'target': target_node}
+        if online:
+            params['online'] = 1
+            params['with-local-disks'] = 1
+
+        if machine_type == 'qemu':
+            upid = await self.api.nodes(node).qemu(vmid).migrate.post(**params)
+        elif machine_type == 'lxc':
+            upid = await self.api.nodes(node).lxc(vmid).migrate.post(**params)
+        else:
+            raise ValueError("machine_type doit être 'qemu' ou 'lxc'")
+
+        # The guest stays on the source node until the task succeeds (or for good if it fails)
+        self.locations.discard(vmid)
+        self.locations.expect(upid, vmid, target_node, machine_type)
+        return upid
+
+    @invalidates_cache
+    @tracks_task
+    async def delete_snapshot(self, node, vmid, machine_type, snapname):
+        """Deletes a specific snapshot."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).snapshot(snapname).delete()
+        return await self.api.nodes(node).lxc(vmid).snapshot(snapname).delete()
+
+    @invalidates_cache
+    @tracks_task
+    async def unlock_machine(self, node, vmid, machine_type=None):
+        """
+        Unlocks a VM/Container by removing the 'lock' property from its config.
+        Useful when a task (like backup) fails and leaves the machine locked.
+
+        Args:
+            node (str): Node name.
+            vmid (int): Machine ID.
+            machine_type (str, optional): 'qemu' or 'lxc'. Taken from the location
+                                          index if omitted.
+        """
+        if machine_type is None:
+            location = self.locations.get(vmid)
+            machine_type = location[1] if location else None
+
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).config.post(delete='lock')
+        if machine_type == 'lxc':
+            return await self.api.nodes(node).lxc(vmid).config.post(delete='lock')
+
+        # Unknown type: try QEMU first, then LXC
+        try:
+            return await self.api.nodes(node).qemu(vmid).config.post(delete='lock')
+        except ResourceException:
+            return await self.api.nodes(node).lxc(vmid).config.post(delete='lock')
+
+    async def get_cluster_log(self, max_lines=50):
+        """Retrieves global cluster logs."""
+        return await self.api.cluster.log.get(limit=max_lines)
+
+    async def get_cluster_tasks(self):
+        """Lists the cluster's recent tasks, running and finished (/cluster/tasks)."""
+        return await self.api.cluster.tasks.get()
+
+    async def get_machine_rrd_data(self, node, vmid, machine_type, timeframe="hour"):
+        """Retrieves RRD (performance) data for a machine ('hour', 'day', 'week', 'month', 'year')."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).rrddata.get(timeframe=timeframe)
+        return await self.api.nodes(node).lxc(vmid).rrddata.get(timeframe=timeframe)
+
+    async def get_node_rrd_data(self, node, timeframe="hour"):
+        """Retrieves RRD (performance) data for a node ('hour', 'day', 'week', 'month', 'year')."""
+        return await self.api.nodes(node).rrddata.get(timeframe=timeframe)
+
+    async def get_storage_rrd_data(self, node, storage, timeframe="hour"):
+        """Retrieves RRD data (used/total) for a storage as seen from a node."""
+        return await self.api.nodes(node).storage(storage).rrddata.get(timeframe=timeframe)
+
+    async def get_capacity_rrd_data(self, targets, timeframe="month"):
+        """
+        Retrieves node and storage RRD data concurrently through the fan-out.
+
+        Args:
+            targets (list): (node, storage) tuples; storage None for the node itself.
+            timeframe (str): 'hour', 'day', 'week', 'month', 'year'.
+
+        Returns:
+            PartialResult: (node, storage, rrddata) tuples, with failures as dicts
+                           {'node', 'resource': storage or 'node', 'reason', 'error'}.
+        """
+        fetched = await self.fanout.run(
+            lambda node, resource: self.get_node_rrd_data(node, timeframe) if resource is None
+            else self.get_storage_rrd_data(node, resource, timeframe),
+            targets
+        )
+        failures = [dict(f, resource=f['resource'] or 'node') for f in fetched.failures]
+        self._log_failures("get_capacity_rrd_data", failures)
+        return PartialResult(((node, storage, points or []) for node, storage, points in fetched), failures)
+
+    async def get_machines_rrd_data(self, machines, timeframe="hour"):
+        """
+        Retrieves the RRD data of many machines concurrently.
+
+        Calls go through the fan-out (at most PROXMOX_FANOUT_WORKERS at a
+        time), each bounded by PROXMOX_NODE_TIMEOUT; a guest that fails is
+        reported instead of failing the whole batch.
+
+        Args:
+            machines (list): Inventory entries with 'node', 'vmid' and 'type'.
+            timeframe (str): 'hour', 'day', 'week', 'month', 'year'.
+
+        Returns:
+            PartialResult: (vmid, rrddata) tuples, with failures as dicts
+                           {'node', 'resource': vmid, 'reason', 'error'}.
+        """
+        types = {int(m['vmid']): m['type'] for m in machines}
+        fetched = await self.fanout.run(
+            lambda node, vmid: self.get_machine_rrd_data(node, vmid, types[vmid], timeframe),
+            [(m['node'], int(m['vmid'])) for m in machines]
+        )
+        self._log_failures("get_machines_rrd_data", fetched.failures)
+        return PartialResult(((vmid, points or []) for _, vmid, points in fetched), fetched.failures)
+
+    async def list_lxc_templates(self, node):
+        """Lists available LXC templates (from Proxmox Appliance Manager)."""
+        return await self.api.nodes(node).aplinfo.get()
+
+    @invalidates_cache
+    @tracks_task
+    async def download_lxc_template(self, node, storage, template):
+        """Downloads a specific LXC template to storage."""
+        return await self.api.nodes(node).aplinfo.post(storage=storage, template=template)
+
+    @invalidates_cache
+    @tracks_task
+    async def set_machine_tags(self, node, vmid, machine_type, tags):
+        """Sets tags (comma separated) for a machine."""
+        if machine_type == 'qemu':
+            return await self.api.nodes(node).qemu(vmid).config.post(tags=tags)
+        return await self.api.nodes(node).lxc(vmid).config.post(tags=tags)
+
+_shared_client = None
+
+def get_async_client():
+    """
+    Returns the process-wide AsyncProxmoxClient, creating it on first use.
+
+    Every tool and endpoint goes through this client, so they all share one
+    keep-alive connection pool to pveproxy.
+    """
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncProxmoxClient()
+    return _shared_client
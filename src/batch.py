@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from pydantic import ValidationError
+from src.models import (
+    BatchOperation, MachineActionRequest, StopMachineRequest, SnapshotRequest, RollbackRequest,
+    CloneRequest, CreateBackupRequest, ResizeRequest,
+)
+
+logger = logging.getLogger("mcp-proxmox")
+
+# Batch action -> request model validating its parameters (the models of the single-action endpoints)
+BATCH_ACTIONS = {
+    'start': MachineActionRequest,
+    'stop': StopMachineRequest,
+    'reboot': MachineActionRequest,
+    'snapshot': SnapshotRequest,
+    'rollback': RollbackRequest,
+    'clone': CloneRequest,
+    'backup': CreateBackupRequest,
+    'resize': ResizeRequest,
+}
+
+def plan_batch(operations):
+    """
+    Validates a batch and orders it so every operation comes after its dependencies.
+
+    Args:
+        operations (list): BatchOperation models or dicts (action, params, id, depends_on).
+
+    Returns:
+        list: (position, BatchOperation, validated request model) tuples,
+              dependencies first, otherwise in the given order. Operations
+              without an id get their position ('0', '1'...).
+
+    Raises:
+        ValueError: For an empty batch, an unknown action, invalid parameters,
+                    a duplicate id, an unknown dependency or a dependency cycle.
+    """
+    if not operations:
+        raise ValueError("Le lot ne contient aucune opération.")
+    planned = {}
+    for position, op in enumerate(operations):
+        try:
+            op = op if isinstance(op, BatchOperation) else BatchOperation.model_validate(op)
+        except ValidationError as e:
+            raise ValueError(f"Opération {position} invalide : {e}")
+        op_id = op.id if op.id is not None else str(position)
+        if op_id in planned:
+            raise ValueError(f"Identifiant d'opération en double : '{op_id}'.")
+        model = BATCH_ACTIONS.get(op.action)
+        if model is None:
+            raise ValueError(f"Opération '{op_id}' : action inconnue '{op.action}' (parmi {', '.join(BATCH_ACTIONS)}).")
+        try:
+            request = model.model_validate(op.params)
+        except ValidationError as e:
+            raise ValueError(f"Opération '{op_id}' ({op.action}) : paramètres invalides : {e}")
+        planned[op_id] = (position, op.model_copy(update={'id': op_id}), request)
+
+    for op_id, (_, op, _) in planned.items():
+        unknown = [d for d in op.depends_on if d not in planned]
+        if unknown:
+            raise ValueError(f"Opération '{op_id}' : dépendance(s) inconnue(s) {', '.join(unknown)}.")
+
+    # Kahn's algorithm, keeping the given order among ready operations
+    ordered, done = [], set()
+    while len(ordered) < len(planned):
+        ready = [i for i, (_, op, _) in planned.items() if i not in done and all(d in done for d in op.depends_on)]
+        if not ready:
+            cycle = sorted(set(planned) - done)
+            raise ValueError(f"Dépendances circulaires entre les opérations {', '.join(cycle)}.")
+        for op_id in ready:
+            done.add(op_id)
+            ordered.append(planned[op_id])
+    return ordered
+
+async def _dispatch(client, action, req):
+    """Sends one batch operation; returns what the client call returned (a UPID for task-backed actions)."""
+    if action in ('start', 'reboot'):
+        return await client.set_machine_state(req.node, req.vmid, req.type, action)
+    if action == 'stop':
+        return await client.set_machine_state(req.node, req.vmid, req.type, "stop" if req.force else "shutdown")
+    if action == 'snapshot':
+        if req.description is None:
+            return await client.create_snapshot(req.node, req.vmid, req.type, req.snapname)
+        return await client.create_snapshot(req.node, req.vmid, req.type, req.snapname, req.description)
+    if action == 'rollback':
+        return await client.rollback_snapshot(req.node, req.vmid, req.type, req.snapname)
+    if action == 'clone':
+        return await client.clone_machine(req.node, req.vmid, req.newid, req.name, req.type, req.target_node)
+    if action == 'backup':
+        return await client.create_backup(req.node, req.vmid, req.storage, req.mode)
+    return await client.resize_machine_resources(req.node, req.vmid, req.type, req.cores, req.memory_mb)
+
+async def run_batch(client, operations, wait=False, timeout=300, per_node=None):
+    """
+    Runs a batch of heterogeneous operations concurrently.
+
+    Every operation starts as soon as its dependencies are done; the calls
+    sending them are bounded to `per_node` at a time on each node. An
+    operation others depend on is waited for until its task finishes, and
+    its dependents are skipped unless it succeeded.
+
+    Args:
+        client (AsyncProxmoxClient): Client running the operations.
+        operations (list): BatchOperation models or dicts (see plan_batch).
+        wait (bool): Wait for every task, not only those with dependents.
+        timeout (float): Maximum wait per task, in seconds.
+        per_node (int, optional): Concurrent calls per node (default: PROXMOX_BULK_PER_NODE).
+
+    Returns:
+        list: One row per operation, in the given order: id, action, vmid, node,
+              status ('ok', 'error', 'skipped' or 'timeout'), upid, task (final
+              task record when waited for) and error.
+
+    Raises:
+        ValueError: If the batch is invalid (see plan_batch); nothing is run then.
+    """
+    plan = plan_batch(operations)
+    needed = {d for _, op, _ in plan for d in op.depends_on}
+    per_node = per_node or client.bulk_per_node
+    limits = {}
+    runs = {}
+
+    async def execute(op, req):
+        row = {'id': op.id, 'action': op.action, 'vmid': req.vmid, 'node': req.node,
+               'status': 'ok', 'upid': None, 'task': None, 'error': None}
+        deps = [await runs[d] for d in op.depends_on]
+        blocking = [d['id'] for d in deps if d['status'] != 'ok']
+        if blocking:
+            row.update(status='skipped', error=f"dépendance(s) en échec : {', '.join(blocking)}")
+            return row
+        try:
+            if not req.node or not getattr(req, 'type', True):
+                # Node (and type) omitted: resolved from the vmid location index
+                node, machine_type = await client.locate(req.vmid)
+                update = {'node': req.node or node}
+                if hasattr(req, 'type'):
+                    update['type'] = req.type or machine_type
+                req = req.model_copy(update=update)
+                row['node'] = req.node
+            async with limits.setdefault(req.node, asyncio.Semaphore(per_node)):
+                result = await _dispatch(client, op.action, req)
+            if isinstance(result, str) and result.startswith("UPID:"):
+                row['upid'] = result
+                if wait or op.id in needed:
+                    task = row['task'] = await client.wait_for_task(result, timeout)
+                    if task['status'] == 'running':
+                        row.update(status='timeout', error=f"tâche toujours en cours après {timeout}s")
+                    elif not task.get('success'):
+                        row.update(status='error', error=task.get('exitstatus') or "tâche en échec")
+        except Exception as e:
+            logger.warning(f"Batch operation {op.id} ({op.action} {req.vmid}) failed: {e}")
+            row.update(status='error', error=str(e))
+        return row
+
+    for _, op, req in plan:
+        runs[op.id] = asyncio.ensure_future(execute(op, req))
+    await asyncio.gather(*runs.values())
+    return [runs[op.id].result() for _, op, _ in sorted(plan, key=lambda p: p[0])]
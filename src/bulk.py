@@ -0,0 +1,124 @@
+import re
+import fnmatch
+from collections import defaultdict
+
+# Node-level endpoints able to act on several guests of a node in one task
+NODE_ENDPOINTS = {'start': 'startall', 'shutdown': 'stopall'}
+
+def machine_tags(machine):
+    """set: Tags of a machine (Proxmox separates them with ';', clients often use ',')."""
+    return {t for t in re.split(r"[;,\s]+", machine.get('tags') or "") if t}
+
+def select_machines(machines, vmids=None, tag=None, name_pattern=None):
+    """
+    Filters an inventory down to the guests matching every given criterion.
+
+    Templates are never selected: they cannot be powered on.
+
+    Args:
+        machines (list): Machine dictionaries (get_all_machines).
+        vmids (list, optional): Explicit machine IDs.
+        tag (str, optional): Tag the machines must carry.
+        name_pattern (str, optional): Shell-style pattern on the name (e.g. 'web-*').
+
+    Returns:
+        list: The matching machines.
+
+    Raises:
+        ValueError: If no criterion is given (refuses to act on the whole cluster).
+    """
+    if not vmids and not tag and not name_pattern:
+        raise ValueError("Indiquez au moins une liste de vmids, un tag ou un motif de nom.")
+    wanted = {int(v) for v in vmids} if vmids else None
+    selected = []
+    for m in machines:
+        if m.get('template'):
+            continue
+        if wanted is not None and int(m['vmid']) not in wanted:
+            continue
+        if tag and tag not in machine_tags(m):
+            continue
+        if name_pattern and not fnmatch.fnmatchcase(m.get('name') or "", name_pattern):
+            continue
+        selected.append(m)
+    return selected
+
+def plan_bulk_action(selected, inventory, action, use_node_endpoints=True):
+    """
+    Splits a bulk power action into API calls.
+
+    A node whose every (non-template) guest is selected is handled with a single
+    startall/stopall call when the action has a node-level endpoint; every other
+    guest gets its own status call.
+
+    Args:
+        selected (list): Machines to act on (select_machines).
+        inventory (PartialResult): Full machine inventory the selection came from.
+        action (str): 'start', 'stop', 'shutdown' or 'reboot'.
+        use_node_endpoints (bool): Allow startall/stopall for whole nodes.
+
+    Returns:
+        list: (node, endpoint, machines) jobs; endpoint is None for a per-guest call.
+    """
+    endpoint = NODE_ENDPOINTS.get(action) if use_node_endpoints else None
+    incomplete = {f['node'] for f in getattr(inventory, 'failures', [])}
+    guests_per_node = defaultdict(int)
+    for m in inventory:
+        if not m.get('template'):
+            guests_per_node[m['node']] += 1
+
+    selected_per_node = defaultdict(list)
+    for m in selected:
+        selected_per_node[m['node']].append(m)
+
+    jobs = []
+    for node, machines in selected_per_node.items():
+        whole_node = len(machines) > 1 and len(machines) == guests_per_node[node] and node not in incomplete
+        if endpoint and whole_node:
+            jobs.append((node, endpoint, machines))
+        else:
+            jobs.extend((node, None, [m]) for m in machines)
+    return jobs
+
+def bulk_rows(jobs, outcomes, failures, missing=(), unknown=()):
+    """
+    Builds the per-guest result table of a bulk action.
+
+    Args:
+        jobs (list): Jobs from plan_bulk_action.
+        outcomes (dict): UPID per job key (node, endpoint or vmid) that succeeded.
+        failures (list): Fan-out failures, keyed by 'node' and 'resource'.
+        missing (iterable): Requested vmids absent from the selection.
+        unknown (iterable): Keys of the failed jobs whose call was sent but got no
+                            answer in time: Proxmox may have run the action anyway.
+
+    Returns:
+        list: One dict per guest: vmid, name, node, type, via ('status', 'startall'
+              or 'stopall'), status ('ok', 'error' or 'unknown'), upid and error
+              (None on success).
+    """
+    errors = {(f['node'], f['resource']): f['error'] for f in failures}
+    unknown = set(unknown)
+    rows = []
+    for node, endpoint, machines in jobs:
+        for m in machines:
+            key = (node, endpoint or int(m['vmid']))
+            status, error = 'ok', errors.get(key)
+            if key in unknown:
+                status, error = 'unknown', f"envoyée sans réponse ({error}) : vérifiez l'état de la machine avant de relancer"
+            elif error:
+                status = 'error'
+            rows.append({
+                'vmid': int(m['vmid']),
+                'name': m.get('name'),
+                'node': node,
+                'type': m.get('type'),
+                'via': endpoint or 'status',
+                'status': status,
+                'upid': outcomes.get(key),
+                'error': error,
+            })
+    for vmid in missing:
+        rows.append({'vmid': int(vmid), 'name': None, 'node': None, 'type': None, 'via': None, 'status': 'error',
+                     'upid': None, 'error': "introuvable dans l'inventaire (ou template)"})
+    return sorted(rows, key=lambda r: r['vmid'])
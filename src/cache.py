@@ -0,0 +1,151 @@
+import os
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+# Default time-to-live (seconds) per kind of cached resource
+DEFAULT_TTLS = {
+    'nodes': 10,
+    'resources': 5,
+    'node_status': 5,
+    'storage': 15,
+    'config': 30,
+}
+
+CLUSTER_TAG = 'cluster'
+
+class TTLCache:
+    """
+    Bounded in-process cache with per-resource TTLs and LRU eviction.
+
+    Entries are tagged with the nodes/vmids they describe so mutating
+    operations can drop exactly what they may have changed. Cached values are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize=None, ttls=None):
+        """
+        Args:
+            maxsize (int, optional): Maximum number of entries (env: PROXMOX_CACHE_SIZE, default 256).
+                                     0 disables caching.
+            ttls (dict, optional): TTL in seconds per kind. Each default can be overridden
+                                   with PROXMOX_CACHE_TTL_<KIND> (e.g. PROXMOX_CACHE_TTL_CONFIG=60).
+        """
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv("PROXMOX_CACHE_SIZE", "256"))
+        self.ttls = {kind: float(os.getenv(f"PROXMOX_CACHE_TTL_{kind.upper()}", ttl)) for kind, ttl in DEFAULT_TTLS.items()}
+        self.ttls.update(ttls or {})
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, kind, counter):
+        stats = self._stats.setdefault(kind, {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0})
+        stats[counter] += 1
+
+    def get(self, key):
+        """
+        Looks up a key; the first element of the key is its kind.
+
+        Returns:
+            tuple: (hit, value). value is None on a miss.
+        """
+        kind = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._count(kind, 'expired')
+                entry = None
+            if entry is None:
+                self._count(kind, 'misses')
+                return False, None
+            self._entries.move_to_end(key)
+            self._count(kind, 'hits')
+            return True, entry[1]
+
+    def set(self, key, value, tags=(CLUSTER_TAG,)):
+        """
+        Stores a value under key, expiring after the TTL of its kind.
+
+        Args:
+            key (tuple): (kind, *identifiers), e.g. ('config', 'pve1', 100, 'qemu').
+            value: Value to cache.
+            tags (iterable): What the value describes: CLUSTER_TAG for cluster-wide
+                             listings, ('node', name) or ('vmid', id) otherwise.
+        """
+        kind = key[0]
+        ttl = self.ttls.get(kind, 0)
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._count(evicted[0], 'evictions')
+
+    def invalidate(self, nodes=(), vmids=()):
+        """
+        Drops cluster-wide entries and every entry tagged with one of the given nodes or vmids.
+
+        Returns:
+            int: Number of entries dropped.
+        """
+        tags = {CLUSTER_TAG} | {('node', n) for n in nodes} | {('vmid', int(v)) for v in vmids}
+        with self._lock:
+            stale = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in stale:
+                del self._entries[key]
+                self._count(key[0], 'invalidations')
+        return len(stale)
+
+    def clear(self):
+        """Drops every entry (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: size, maxsize, ttls and per-kind hits/misses/expired/evictions/invalidations
+                  with the resulting hit ratio.
+        """
+        with self._lock:
+            kinds = {}
+            for kind, counters in self._stats.items():
+                lookups = counters['hits'] + counters['misses']
+                kinds[kind] = dict(counters, hit_ratio=counters['hits'] / lookups if lookups else 0.0)
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttls': dict(self.ttls), 'kinds': kinds}
+
+def _touched(func, args, kwargs):
+    """Extracts the nodes and vmids a client method call acts on from its standard argument names."""
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    nodes = [bound.arguments[name] for name in ('node', 'target_node') if bound.arguments.get(name)]
+    vmids = [bound.arguments[name] for name in ('vmid', 'newid') if bound.arguments.get(name)]
+    return nodes, vmids
+
+def invalidates_cache(func):
+    """
+    Decorator for mutating client methods (sync or async).
+
+    Once the call succeeds, drops the cache entries for the nodes
+    (`node`, `target_node`) and vmids (`vmid`, `newid`) it received.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            result = await func(self, *args, **kwargs)
+            nodes, vmids = _touched(func, (self,) + args, kwargs)
+            self.cache.invalidate(nodes, vmids)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        result = func(self, *args, **kwargs)
+        nodes, vmids = _touched(func, (self,) + args, kwargs)
+        self.cache.invalidate(nodes, vmids)
+        return result
+    return wrapper
@@ -0,0 +1,151 @@
+import os
+import re
+import time
+import heapq
+import threading
+from collections import deque
+from src.metrics import path_template
+from src.rrd import percentile
+
+# Phases of an upstream call, in seconds:
+#   connect  - TCP connect + TLS handshake (0 when a pooled connection is reused)
+#   server   - request sent until the response headers arrive (Proxmox processing + RTT)
+#   transfer - response body download
+#   decode   - JSON decoding
+#   total    - whole call, as seen by the client
+PHASES = ('connect', 'server', 'transfer', 'decode', 'total')
+
+# Argument names whose value never appears in the statistics
+_SECRET = re.compile(r'pass|secret|token|key|cipassword', re.IGNORECASE)
+
+def redact(args):
+    """Copies call arguments, masking passwords, tokens and keys."""
+    return {k: ('***' if _SECRET.search(str(k)) else v) for k, v in (args or {}).items()}
+
+def trace_phases(marks):
+    """
+    Turns httpcore trace timestamps into call phases.
+
+    Args:
+        marks (dict): {event without its 'connection.'/'http11.' prefix: perf_counter()},
+                      e.g. {'connect_tcp.started': ..., 'receive_response_headers.complete': ...}.
+
+    Returns:
+        dict: connect, server and transfer durations (phases without events are left out).
+    """
+    if not marks:
+        return {}
+
+    def span(first, last):
+        if first in marks and last in marks:
+            return marks[last] - marks[first]
+        return None
+
+    phases = {
+        'connect': (span('connect_tcp.started', 'connect_tcp.complete') or 0.0)
+                   + (span('start_tls.started', 'start_tls.complete') or 0.0),
+        'server': span('send_request_headers.started', 'receive_response_headers.complete'),
+        'transfer': span('receive_response_body.started', 'receive_response_body.complete'),
+    }
+    return {k: v for k, v in phases.items() if v is not None}
+
+class CallStats:
+    """
+    Rolling per-endpoint statistics of the calls made to the Proxmox API.
+
+    Endpoints are keyed by method and path template (/nodes/{node}/qemu/{vmid}/config),
+    each keeping its latest `window` durations for percentiles, plus cumulated
+    counters. The latest `recent` calls are kept with their (redacted)
+    arguments to list the slowest ones.
+    """
+
+    def __init__(self, window=None, recent=None):
+        """
+        Args:
+            window (int, optional): Durations kept per endpoint (env: PROXMOX_CALL_STATS_WINDOW, default 200).
+            recent (int, optional): Latest calls kept with their arguments (env: PROXMOX_CALL_STATS_RECENT, default 500).
+        """
+        self.window = window or int(os.getenv("PROXMOX_CALL_STATS_WINDOW", "200"))
+        self._endpoints = {}
+        self._recent = deque(maxlen=recent or int(os.getenv("PROXMOX_CALL_STATS_RECENT", "500")))
+        self._lock = threading.Lock()
+
+    def record(self, method, path, status, timings, size=0, args=None):
+        """
+        Records one call.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Request path (API prefix optional).
+            status (int): HTTP status, 0 when no response was received.
+            timings (dict): Phase durations (see PHASES); 'total' is required.
+            size (int): Response size in bytes.
+            args (dict, optional): Query or form arguments.
+        """
+        template = path_template(path)
+        call = {
+            'time': time.time(),
+            'method': method,
+            'path': path,
+            'endpoint': template,
+            'status': status,
+            'size': size,
+            'args': redact(args),
+            **{phase: timings.get(phase) for phase in PHASES},
+        }
+        with self._lock:
+            stats = self._endpoints.get((method, template))
+            if stats is None:
+                stats = self._endpoints[(method, template)] = {
+                    'calls': 0, 'errors': 0, 'bytes': 0, 'durations': deque(maxlen=self.window),
+                    'phases': dict.fromkeys(PHASES, 0.0), 'timed': dict.fromkeys(PHASES, 0),
+                }
+            stats['calls'] += 1
+            stats['errors'] += not 200 <= status < 400
+            stats['bytes'] += size
+            stats['durations'].append(timings['total'])
+            for phase in PHASES:
+                if timings.get(phase) is not None:
+                    stats['phases'][phase] += timings[phase]
+                    stats['timed'][phase] += 1
+            self._recent.append(call)
+
+    def snapshot(self, slowest=10):
+        """
+        Summarizes the statistics.
+
+        Args:
+            slowest (int): Number of slowest recent calls to list.
+
+        Returns:
+            dict: 'endpoints' (method, path, calls, errors, bytes, p50/p95/max of the
+                  recent durations and the mean of each phase), busiest total time
+                  first, and 'slowest' (recent calls with their arguments).
+        """
+        with self._lock:
+            endpoints = []
+            for (method, template), stats in self._endpoints.items():
+                ordered = sorted(stats['durations'])
+                endpoints.append({
+                    'method': method,
+                    'path': template,
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'bytes': stats['bytes'],
+                    'p50': percentile(ordered, 0.50),
+                    'p95': percentile(ordered, 0.95),
+                    'max': ordered[-1],
+                    'mean': {
+                        phase: stats['phases'][phase] / stats['timed'][phase] if stats['timed'][phase] else None
+                        for phase in PHASES
+                    },
+                })
+            recent = list(self._recent)
+        endpoints.sort(key=lambda e: e['mean']['total'] * e['calls'], reverse=True)
+        return {'endpoints': endpoints, 'slowest': heapq.nlargest(slowest, recent, key=lambda c: c['total'])}
+
+    def reset(self):
+        """Drops every statistic."""
+        with self._lock:
+            self._endpoints.clear()
+            self._recent.clear()
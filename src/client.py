@@ -1,9 +1,17 @@
 import os
+import logging
+import threading
 from proxmoxer import ProxmoxAPI
-from dotenv import load_dotenv
-from urllib.parse import urlparse
+from proxmoxer.core import ResourceException
+from requests.adapters import HTTPAdapter
+from src.fanout import FanOut
+from src.settings import load_settings, load_pool_settings
+from src.resources import (
+    machines_from_resources, machines_from_nodes, storage_from_resources, add_node_storage,
+    node_status_from_resources, node_status_from_nodes
+)
 
-load_dotenv()
+logger = logging.getLogger("mcp-proxmox.client")
 
 class ProxmoxClient:
     """
@@ -11,6 +19,11 @@ class ProxmoxClient:
     
     Handles authentication via API Tokens and provides simplified methods
     for common operations like listing nodes, managing VMs/LXC, and snapshots.
+
+    This is the synchronous client, for scripts. The MCP server and the REST
+    API use AsyncProxmoxClient, which also carries the cache, the location
+    index, task tracking, bulk actions and call statistics; both clients
+    build their inventories with the helpers of src/resources.py.
     """
 
     def __init__(self):
@@ -20,33 +33,44 @@ class ProxmoxClient:
         Raises:
             ValueError: If required environment variables are missing.
         """
-        url = os.getenv("PROXMOX_URL")
-        if not url:
-            raise ValueError("PROXMOX_URL is not set in .env")
-            
-        parsed_url = urlparse(url)
-        host = parsed_url.hostname
-        port = parsed_url.port or 8006
-        
-        user = os.getenv("PROXMOX_USER")
-        token_id = os.getenv("PROXMOX_TOKEN_ID")
-        token_secret = os.getenv("PROXMOX_TOKEN_SECRET")
-        verify_ssl = os.getenv("PROXMOX_VERIFY_SSL", "false").lower() == "true"
-
-        if not all([user, token_id, token_secret]):
-            raise ValueError("Proxmox credentials (USER, TOKEN_ID, TOKEN_SECRET) are missing in .env")
-
-        # Debugging credentials (security-safe)
-        # print(f"DEBUG: Host={host}, User={user}, TokenID={token_id}")
+        settings = load_settings()
 
         self.api = ProxmoxAPI(
-            host,
-            user=user,
-            token_name=token_id,
-            token_value=token_secret,
-            verify_ssl=verify_ssl,
-            port=port
+            settings['host'],
+            user=settings['user'],
+            token_name=settings['token_id'],
+            token_value=settings['token_secret'],
+            verify_ssl=settings['verify_ssl'],
+            port=settings['port']
         )
+        self.fanout = FanOut()
+
+        # proxmoxer keeps a single requests session; give it a pool sized for
+        # the fan-out so concurrent calls reuse keep-alive connections.
+        self.pool_settings = load_pool_settings()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_settings['max_connections'])
+        self.api._store['session'].mount('https://', self.adapter)
+
+    def get_pool_stats(self):
+        """
+        Reports connection pool usage.
+
+        Returns:
+            dict: requests sent, new connections opened, pool hits (requests
+                  served on an already open connection) and pool limits.
+        """
+        requests_sent = new_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            requests_sent += pool.num_requests
+            new_connections += pool.num_connections
+        return {
+            'requests': requests_sent,
+            'new_connections': new_connections,
+            'pool_hits': requests_sent - new_connections,
+            'limits': self.pool_settings,
+        }
 
     def get_nodes(self):
         """
@@ -57,40 +81,105 @@ class ProxmoxClient:
         """
         return self.api.nodes.get()
 
+    def get_cluster_resources(self, resource_type=None):
+        """
+        Lists the whole cluster's resources in a single call (/cluster/resources).
+
+        Args:
+            resource_type (str, optional): 'vm', 'node' or 'storage'. Defaults to all resources.
+
+        Returns:
+            list: A list of resource dictionaries (guests, nodes, storages...).
+        """
+        return self.api.cluster.resources.get(type=resource_type)
+
+    def _try_cluster_resources(self, resource_type):
+        """Returns /cluster/resources entries, or None if the endpoint is unavailable."""
+        try:
+            return self.get_cluster_resources(resource_type)
+        except Exception as e:
+            logger.warning(f"/cluster/resources?type={resource_type} unavailable, falling back to per-node calls: {e}")
+            return None
+
     def get_all_machines(self):
         """
         Retrieves all VMs (QEMU) and Containers (LXC) across all nodes.
 
+        Uses /cluster/resources as primary source (one request for the whole
+        cluster). If it is unavailable, the per-node QEMU and LXC listings are
+        fetched concurrently, each node bounded by its own deadline.
+
         Returns:
-            list: A unified list of dictionaries for both VMs and LXCs,
-                  including an extra 'type' field ('qemu' or 'lxc').
-        """
-        machines = []
-        for node in self.get_nodes():
-            node_name = node['node']
-            # VMs (QEMU)
-            try:
-                vms = self.api.nodes(node_name).qemu.get()
-                for vm in vms:
-                    vm['node'] = node_name
-                    vm['type'] = 'qemu'
-                    machines.append(vm)
-            except Exception as e:
-                print(f"Erreur lors de la récupération des VMs sur {node_name}: {e}")
-
-            # Containers (LXC)
-            try:
-                lxcs = self.api.nodes(node_name).lxc.get()
-                for lxc in lxcs:
-                    lxc['node'] = node_name
-                    lxc['type'] = 'lxc'
-                    # Proxmox API LXC returns 'vmid', QEMU returns 'vmid' too, but let's be consistent
-                    machines.append(lxc)
-            except Exception as e:
-                print(f"Erreur lors de la récupération des containers sur {node_name}: {e}")
-        
+            PartialResult: A unified list of dictionaries for both VMs and LXCs,
+                           including an extra 'type' field ('qemu' or 'lxc').
+                           Skipped nodes are listed in its `failures` attribute.
+        """
+        resources = self._try_cluster_resources('vm')
+        if resources is not None:
+            return machines_from_resources(resources)
+
+        targets = [(node['node'], machine_type) for node in self.get_nodes() for machine_type in ('qemu', 'lxc')]
+        fetched = self.fanout.run(
+            lambda node, machine_type: getattr(self.api.nodes(node), machine_type).get(),
+            targets
+        )
+        machines = machines_from_nodes(fetched)
+        self._log_failures("get_all_machines", machines.failures)
         return machines
 
+    def get_all_storage(self, nodes=None):
+        """
+        Retrieves the storage status of several nodes.
+
+        Uses /cluster/resources as primary source. Nodes whose entries lack
+        the content types (older Proxmox versions), or all nodes if the
+        endpoint is unavailable, are queried concurrently per node.
+
+        Args:
+            nodes (list, optional): Node names to query. Defaults to every online node.
+
+        Returns:
+            PartialResult: Storage dictionaries, each including a 'node' field.
+                           Skipped nodes are listed in its `failures` attribute.
+        """
+        if nodes is None:
+            nodes = [n['node'] for n in self.get_nodes() if n.get('status') == 'online']
+
+        storages, missing = storage_from_resources(self._try_cluster_resources('storage'), nodes)
+        fetched = self.fanout.run(lambda node, _: self.get_storage_status(node), [(node, 'storage') for node in missing])
+        add_node_storage(storages, fetched)
+        self._log_failures("get_all_storage", storages.failures)
+        return storages
+
+    def get_all_node_resources(self, nodes=None):
+        """
+        Retrieves resource usage statistics of several nodes.
+
+        Uses /cluster/resources as primary source, falling back to concurrent
+        per-node status calls if it is unavailable.
+
+        Args:
+            nodes (list, optional): Node names to query. Defaults to every node in the cluster.
+
+        Returns:
+            PartialResult: Node status dictionaries (cpu, memory...), each including a 'node' field.
+                           Skipped or offline nodes are listed in its `failures` attribute.
+        """
+        resources = self._try_cluster_resources('node')
+        if resources is not None:
+            return node_status_from_resources(resources, nodes)
+
+        if nodes is None:
+            nodes = [n['node'] for n in self.get_nodes()]
+        fetched = self.fanout.run(lambda node, _: self.get_node_resources(node), [(node, 'status') for node in nodes])
+        resources = node_status_from_nodes(fetched)
+        self._log_failures("get_all_node_resources", resources.failures)
+        return resources
+
+    def _log_failures(self, operation, failures):
+        for failure in failures:
+            logger.warning(f"{operation}: {failure['resource']} on {failure['node']} skipped ({failure['reason']}: {failure['error']})")
+
     def set_machine_state(self, node, vmid, machine_type, action):
         """
         Changes the state of a specific machine.
@@ -167,7 +256,7 @@ class ProxmoxClient:
             list: List of snapshot dictionaries.
         """
         if machine_type == 'qemu':
-            return self.api.nodes(node).snapshot.get()
+            return self.api.nodes(node).qemu(vmid).snapshot.get()
         return self.api.nodes(node).lxc(vmid).snapshot.get()
 
     def create_snapshot(self, node, vmid, machine_type, snapname, description="Created via MCP"):
@@ -185,7 +274,7 @@ class ProxmoxClient:
             str: Task ID.
         """
         if machine_type == 'qemu':
-            return self.api.nodes(node).snapshot.post(snapname=snapname, description=description)
+            return self.api.nodes(node).qemu(vmid).snapshot.post(snapname=snapname, description=description)
         return self.api.nodes(node).lxc(vmid).snapshot.post(snapname=snapname, description=description)
 
     def rollback_snapshot(self, node, vmid, machine_type, snapname):
@@ -202,7 +291,7 @@ class ProxmoxClient:
             str: Task ID.
         """
         if machine_type == 'qemu':
-            return self.api.nodes(node).snapshot(snapname).rollback.post()
+            return self.api.nodes(node).qemu(vmid).snapshot(snapname).rollback.post()
         return self.api.nodes(node).lxc(vmid).snapshot(snapname).rollback.post()
 
     def clone_machine(self, node, vmid, newid, name, machine_type, target_node=None):
@@ -393,16 +482,25 @@ class ProxmoxClient:
             return self.api.nodes(node).qemu(vmid).snapshot(snapname).delete()
         return self.api.nodes(node).lxc(vmid).snapshot(snapname).delete()
 
-    def unlock_machine(self, node, vmid):
+    def unlock_machine(self, node, vmid, machine_type=None):
         """
         Unlocks a VM/Container by removing the 'lock' property from its config.
         Useful when a task (like backup) fails and leaves the machine locked.
+
+        Args:
+            node (str): Node name.
+            vmid (int): Machine ID.
+            machine_type (str, optional): 'qemu' or 'lxc'. Both are tried if omitted.
         """
-        # Try QEMU first
+        if machine_type == 'qemu':
+            return self.api.nodes(node).qemu(vmid).config.post(delete='lock')
+        if machine_type == 'lxc':
+            return self.api.nodes(node).lxc(vmid).config.post(delete='lock')
+
+        # Unknown type: try QEMU first, then LXC
         try:
             return self.api.nodes(node).qemu(vmid).config.post(delete='lock')
-        except:
-            # If not QEMU, try LXC
+        except ResourceException:
             return self.api.nodes(node).lxc(vmid).config.post(delete='lock')
 
     def get_cluster_log(self, max_lines=50):
@@ -451,3 +549,18 @@ class ProxmoxClient:
         if machine_type == 'qemu':
             return self.api.nodes(node).qemu(vmid).config.post(tags=tags)
         return self.api.nodes(node).lxc(vmid).config.post(tags=tags)
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Returns the process-wide ProxmoxClient, creating it on first use.
+
+    Sharing one client means sharing one connection pool across all callers.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = ProxmoxClient()
+        return _shared_client
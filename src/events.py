@@ -0,0 +1,242 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("mcp-proxmox")
+
+# Types of the events emitted by the watcher
+EVENT_TYPES = (
+    'guest_started', 'guest_stopped', 'guest_status', 'guest_migrated', 'guest_added', 'guest_removed',
+    'node_offline', 'node_online', 'storage_threshold', 'storage_recovered', 'task_finished',
+)
+
+def snapshot(resources, tasks=()):
+    """
+    Reduces a /cluster/resources listing (all types) and a /cluster/tasks
+    listing to the state the watcher diffs.
+
+    Shared storages are listed once per node by Proxmox; they are keyed by
+    their name alone so a crossing is reported once.
+
+    Returns:
+        dict: 'guests' {vmid: {name, node, type, status}}, 'nodes' {node: status},
+              'storages' {(node or None, storage): {used ratio, ...}} and
+              'tasks' {upid: finished task} (running tasks are left out).
+    """
+    guests, nodes, storages = {}, {}, {}
+    for r in resources:
+        kind = r.get('type')
+        if kind in ('qemu', 'lxc'):
+            if r.get('template'):
+                continue
+            guests[int(r['vmid'])] = {'name': r.get('name'), 'node': r.get('node'), 'type': kind, 'status': r.get('status')}
+        elif kind == 'node':
+            nodes[r.get('node')] = r.get('status')
+        elif kind == 'storage' and r.get('maxdisk'):
+            shared = bool(r.get('shared'))
+            storages[(None if shared else r.get('node'), r.get('storage'))] = {
+                'node': None if shared else r.get('node'),
+                'storage': r.get('storage'),
+                'used': (r.get('disk') or 0) / r['maxdisk'],
+            }
+    finished = {t['upid']: t for t in tasks if t.get('upid') and t.get('endtime')}
+    return {'guests': guests, 'nodes': nodes, 'storages': storages, 'tasks': finished}
+
+def diff_snapshots(before, after, threshold=None):
+    """
+    Lists the changes between two snapshots as events.
+
+    Args:
+        before (dict): Previous snapshot (see snapshot()).
+        after (dict): Current snapshot.
+        threshold (float, optional): Storage usage ratio whose upward crossing emits
+                                     'storage_threshold' (and downward 'storage_recovered').
+                                     Env: PROXMOX_EVENTS_STORAGE_THRESHOLD (percent, default 90).
+
+    Returns:
+        list: Event dicts with a 'type' (see EVENT_TYPES) and its details.
+    """
+    if threshold is None:
+        threshold = float(os.getenv("PROXMOX_EVENTS_STORAGE_THRESHOLD", "90")) / 100
+    events = []
+
+    for vmid, guest in after['guests'].items():
+        old = before['guests'].get(vmid)
+        details = {'vmid': vmid, 'name': guest['name'], 'node': guest['node'], 'machine_type': guest['type']}
+        if old is None:
+            events.append(dict(details, type='guest_added', status=guest['status']))
+            continue
+        if old['node'] != guest['node']:
+            events.append(dict(details, type='guest_migrated', source=old['node']))
+        if old['status'] != guest['status']:
+            if guest['status'] == 'running':
+                kind = 'guest_started'
+            elif guest['status'] == 'stopped':
+                kind = 'guest_stopped'
+            else:
+                kind = 'guest_status'
+            events.append(dict(details, type=kind, status=guest['status'], previous=old['status']))
+    for vmid in before['guests'].keys() - after['guests'].keys():
+        old = before['guests'][vmid]
+        events.append({'type': 'guest_removed', 'vmid': vmid, 'name': old['name'], 'node': old['node'], 'machine_type': old['type']})
+
+    for node, status in after['nodes'].items():
+        old = before['nodes'].get(node)
+        if old is None or old == status:
+            continue
+        if status != 'online':
+            events.append({'type': 'node_offline', 'node': node, 'status': status})
+        elif old != 'online':
+            events.append({'type': 'node_online', 'node': node, 'status': status})
+
+    for key, storage in after['storages'].items():
+        old = before['storages'].get(key)
+        if old is None:
+            continue
+        details = {'node': storage['node'], 'storage': storage['storage'], 'used': round(storage['used'], 4), 'threshold': threshold}
+        if old['used'] < threshold <= storage['used']:
+            events.append(dict(details, type='storage_threshold'))
+        elif storage['used'] < threshold <= old['used']:
+            events.append(dict(details, type='storage_recovered'))
+
+    for upid in after['tasks'].keys() - before['tasks'].keys():
+        task = after['tasks'][upid]
+        events.append({
+            'type': 'task_finished', 'upid': upid, 'node': task.get('node'), 'task_type': task.get('type'),
+            'task_id': task.get('id'), 'user': task.get('user'), 'status': task.get('status'), 'endtime': task.get('endtime'),
+        })
+    # Finished tasks in chronological order
+    events.sort(key=lambda e: e['endtime'] if e['type'] == 'task_finished' else 0)
+    return events
+
+class ClusterWatcher:
+    """
+    Polls the cluster on behalf of every event subscriber and broadcasts the changes.
+
+    One poll (/cluster/resources plus /cluster/tasks) per interval serves all
+    subscribers, however many are connected; the poller only runs while at
+    least one is. Events get increasing ids and the latest ones are kept, so a
+    subscriber reconnecting with the id of the last event it received gets the
+    ones it missed. A subscriber falling behind loses its oldest queued events.
+    """
+
+    def __init__(self, client, interval=None, threshold=None, backlog=None, queue_size=1000):
+        """
+        Args:
+            client (AsyncProxmoxClient): Client used for the polls.
+            interval (float, optional): Seconds between polls (env: PROXMOX_EVENTS_INTERVAL, default 5).
+            threshold (float, optional): Storage usage ratio (env: PROXMOX_EVENTS_STORAGE_THRESHOLD, percent, default 90).
+            backlog (int, optional): Latest events kept for reconnections (env: PROXMOX_EVENTS_BACKLOG, default 500).
+            queue_size (int): Events queued per subscriber before the oldest are dropped.
+        """
+        self.client = client
+        self.interval = interval or float(os.getenv("PROXMOX_EVENTS_INTERVAL", "5"))
+        self.threshold = threshold if threshold is not None else float(os.getenv("PROXMOX_EVENTS_STORAGE_THRESHOLD", "90")) / 100
+        self.queue_size = queue_size
+        self.polls = 0
+        self.dropped = 0
+        self._backlog = deque(maxlen=backlog or int(os.getenv("PROXMOX_EVENTS_BACKLOG", "500")))
+        self._subscribers = set()
+        self._snapshot = None
+        self._last_id = 0
+        self._task = None
+
+    @property
+    def subscribers(self):
+        """int: Number of connected subscribers."""
+        return len(self._subscribers)
+
+    async def poll(self):
+        """
+        Takes one snapshot of the cluster and broadcasts its differences with the previous one.
+
+        The first snapshot only sets the baseline.
+
+        Returns:
+            list: The events broadcast.
+        """
+        resources = await self.client.get_cluster_resources()
+        try:
+            tasks = await self.client.get_cluster_tasks()
+        except Exception as e:
+            logger.warning(f"/cluster/tasks unavailable, task events skipped ({e})")
+            tasks = list(self._snapshot['tasks'].values()) if self._snapshot else []
+        current = snapshot(resources, tasks)
+        self.polls += 1
+        previous, self._snapshot = self._snapshot, current
+        if previous is None:
+            return []
+        events = diff_snapshots(previous, current, self.threshold)
+        now = time.time()
+        for event in events:
+            self._last_id += 1
+            event['id'] = self._last_id
+            event['time'] = now
+            self._publish(event)
+        return events
+
+    def _publish(self, event):
+        self._backlog.append(event)
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Event poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    @asynccontextmanager
+    async def subscribe(self, last_event_id=None):
+        """
+        Registers a subscriber for the duration of the block, starting the poller if needed.
+
+        Args:
+            last_event_id (int, optional): Id of the last event already received;
+                                           the kept events after it are queued first.
+
+        Yields:
+            asyncio.Queue: The events, in order.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id is not None:
+            for event in self._backlog:
+                if event['id'] > last_event_id and not queue.full():
+                    queue.put_nowait(event)
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers:
+                # Not awaited: the subscriber itself may be being cancelled (client gone)
+                self._halt()
+
+    async def stop(self):
+        """
+        Stops the poller. The next subscriber starts it again from a fresh
+        baseline, so changes made while nobody listened are not replayed.
+        """
+        task = self._halt()
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _halt(self):
+        task, self._task = self._task, None
+        self._snapshot = None
+        if task is not None:
+            task.cancel()
+        return task
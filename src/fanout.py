@@ -0,0 +1,158 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class PartialResult(list):
+    """
+    A list of results that also carries the per-node failures met while building it.
+
+    Behaves exactly like a regular list so existing callers keep working, while
+    `failures` lets callers report which nodes were skipped and why.
+    """
+
+    def __init__(self, items=(), failures=None):
+        super().__init__(items)
+        self.failures = list(failures or [])
+
+    @property
+    def complete(self):
+        """bool: True if every node answered in time."""
+        return not self.failures
+
+
+class FanOut:
+    """
+    Runs per-node Proxmox calls concurrently on a bounded worker pool.
+
+    Each (node, resource) job gets its own deadline, counted from the moment a
+    worker picks it up. Jobs that fail or miss their deadline are reported in
+    `PartialResult.failures` instead of aborting the whole fan-out.
+    """
+
+    def __init__(self, max_workers=None, timeout=None):
+        """
+        Args:
+            max_workers (int, optional): Size of the worker pool (env: PROXMOX_FANOUT_WORKERS, default 8).
+            timeout (float, optional): Per-node deadline in seconds (env: PROXMOX_NODE_TIMEOUT, default 10).
+        """
+        self.max_workers = max_workers or int(os.getenv("PROXMOX_FANOUT_WORKERS", "8"))
+        self.timeout = timeout if timeout is not None else float(os.getenv("PROXMOX_NODE_TIMEOUT", "10"))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="proxmox-fanout")
+            return self._executor
+
+    def run(self, fetch, targets):
+        """
+        Calls `fetch(node, resource)` for every target concurrently.
+
+        Args:
+            fetch (callable): Function performing one blocking API call.
+            targets (list): List of (node, resource) tuples, e.g. [('pve1', 'qemu'), ('pve1', 'lxc')].
+
+        Returns:
+            PartialResult: (node, resource, value) tuples in target order, with
+                           failures as dicts {'node', 'resource', 'reason', 'error'}
+                           where reason is 'timeout' or 'error'.
+        """
+        targets = list(targets)
+        if not targets:
+            return PartialResult()
+
+        executor = self._get_executor()
+        started = {}
+
+        def job(target):
+            started[target] = time.monotonic()
+            return fetch(*target)
+
+        futures = {executor.submit(job, t): t for t in targets}
+        # Jobs still queued behind stuck workers are bounded by a global cap
+        waves = -(-len(targets) // self.max_workers)
+        hard_deadline = time.monotonic() + self.timeout * waves
+
+        outcomes = {}
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            for future in list(pending):
+                target = futures[future]
+                start = started.get(target)
+                expired = now >= hard_deadline or (start is not None and now - start >= self.timeout)
+                if expired and not future.done():
+                    future.cancel()
+                    outcomes[target] = ('timeout', f"no answer within {self.timeout:g}s")
+                    pending.discard(future)
+            if not pending:
+                break
+
+            deadlines = [started[futures[f]] + self.timeout for f in pending if futures[f] in started]
+            next_deadline = min(deadlines + [hard_deadline])
+            done, pending = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                target = futures[future]
+                error = future.exception()
+                outcomes[target] = ('error', str(error)) if error else ('ok', future.result())
+
+        result = PartialResult()
+        for target in targets:
+            status, value = outcomes[target]
+            node, resource = target
+            if status == 'ok':
+                result.append((node, resource, value))
+            else:
+                result.failures.append({'node': node, 'resource': resource, 'reason': status, 'error': value})
+        return result
+
+
+class AsyncFanOut:
+    """
+    Asyncio counterpart of FanOut: runs per-node coroutines concurrently,
+    at most `max_workers` at a time, each bounded by its own deadline.
+    """
+
+    def __init__(self, max_workers=None, timeout=None):
+        """
+        Args:
+            max_workers (int, optional): Maximum concurrent calls (env: PROXMOX_FANOUT_WORKERS, default 8).
+            timeout (float, optional): Per-node deadline in seconds (env: PROXMOX_NODE_TIMEOUT, default 10).
+        """
+        self.max_workers = max_workers or int(os.getenv("PROXMOX_FANOUT_WORKERS", "8"))
+        self.timeout = timeout if timeout is not None else float(os.getenv("PROXMOX_NODE_TIMEOUT", "10"))
+
+    async def run(self, fetch, targets):
+        """
+        Awaits `fetch(node, resource)` for every target concurrently.
+
+        Args:
+            fetch (callable): Coroutine function performing one API call.
+            targets (list): List of (node, resource) tuples.
+
+        Returns:
+            PartialResult: Same shape as FanOut.run.
+        """
+        targets = list(targets)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def job(node, resource):
+            async with semaphore:
+                return await asyncio.wait_for(fetch(node, resource), self.timeout)
+
+        outcomes = await asyncio.gather(*(job(*t) for t in targets), return_exceptions=True)
+
+        result = PartialResult()
+        for (node, resource), outcome in zip(targets, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                result.failures.append({'node': node, 'resource': resource, 'reason': 'timeout', 'error': f"no answer within {self.timeout:g}s"})
+            elif isinstance(outcome, Exception):
+                result.failures.append({'node': node, 'resource': resource, 'reason': 'error', 'error': str(outcome)})
+            else:
+                result.append((node, resource, outcome))
+        return result
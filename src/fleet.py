@@ -0,0 +1,121 @@
+from src.bulk import machine_tags
+from src.rrd import percentile
+
+# Metrics of guest rrddata that can be aggregated across the fleet
+FLEET_METRICS = ('cpu', 'mem', 'maxmem', 'diskread', 'diskwrite', 'netin', 'netout')
+GROUP_BY = ('node', 'tag')
+
+def select_fleet(machines, vmids=None, node=None, tag=None):
+    """
+    Filters an inventory down to the guests of a fleet query (templates excluded).
+
+    Unlike bulk selection, no criterion means the whole cluster.
+    """
+    wanted = {int(v) for v in vmids} if vmids else None
+    return [
+        m for m in machines
+        if not m.get('template')
+        and (wanted is None or int(m['vmid']) in wanted)
+        and (not node or m.get('node') == node)
+        and (not tag or tag in machine_tags(m))
+    ]
+
+def check_query(metric, group_by=None):
+    """
+    Raises:
+        ValueError: If the metric or the grouping is unknown.
+    """
+    if metric not in FLEET_METRICS:
+        raise ValueError(f"Métrique inconnue '{metric}' (valeurs possibles : {', '.join(FLEET_METRICS)}).")
+    if group_by and group_by not in GROUP_BY:
+        raise ValueError(f"Regroupement inconnu '{group_by}' (valeurs possibles : {', '.join(GROUP_BY)}).")
+
+def align(series, metric):
+    """
+    Aligns per-guest rrddata on the union of their timestamps.
+
+    Proxmox aligns RRD rows on the step of the timeframe, so guests of one
+    query share their timestamps; a guest missing a row gets None there.
+
+    Args:
+        series (dict): {vmid: rrddata points}.
+        metric (str): Metric to extract.
+
+    Returns:
+        tuple: (times, {vmid: values aligned with times}).
+    """
+    times = sorted({int(p['time']) for points in series.values() for p in points if p.get('time') is not None})
+    position = {t: i for i, t in enumerate(times)}
+    columns = {}
+    for vmid, points in series.items():
+        column = [None] * len(times)
+        for p in points:
+            value = p.get(metric)
+            # RRD gaps come as missing keys or NaN
+            if p.get('time') is not None and value is not None and value == value:
+                column[position[int(p['time'])]] = float(value)
+        columns[vmid] = column
+    return times, columns
+
+def aggregate(times, columns):
+    """
+    Computes fleet aggregates per timestamp across aligned columns.
+
+    Returns:
+        list: One dict per timestamp with time, count, sum, mean, p50, p95 and p99
+              (count 0 and None values where no guest reported).
+    """
+    rows = zip(*columns) if columns else ([] for _ in times)
+    points = []
+    for ts, row in zip(times, rows):
+        present = sorted(v for v in row if v is not None)
+        point = {'time': ts, 'count': len(present), 'sum': None, 'mean': None, 'p50': None, 'p95': None, 'p99': None}
+        if present:
+            total = sum(present)
+            point.update(
+                sum=total,
+                mean=total / len(present),
+                p50=percentile(present, 0.50),
+                p95=percentile(present, 0.95),
+                p99=percentile(present, 0.99),
+            )
+        points.append(point)
+    return points
+
+def fleet_summary(machines, series, metric='cpu', group_by=None):
+    """
+    Aggregates the RRD series of many guests, for the whole fleet or per group.
+
+    Args:
+        machines (list): Inventory entries of the guests in `series`.
+        series (dict): {vmid: rrddata points}.
+        metric (str): One of FLEET_METRICS.
+        group_by (str, optional): 'node' or 'tag' (a guest counts in each of its tags).
+
+    Returns:
+        dict: {metric, group_by, groups: {name: {'guests': [vmid, ...], 'points': [...]}}}.
+
+    Raises:
+        ValueError: If the metric or the grouping is unknown.
+    """
+    check_query(metric, group_by)
+    times, columns = align(series, metric)
+    members = {}
+    for m in machines:
+        vmid = int(m['vmid'])
+        if vmid not in columns:
+            continue
+        if group_by == 'node':
+            keys = [m.get('node')]
+        elif group_by == 'tag':
+            keys = sorted(machine_tags(m)) or ['(sans tag)']
+        else:
+            keys = ['all']
+        for key in keys:
+            members.setdefault(key, []).append(vmid)
+
+    groups = {
+        key: {'guests': sorted(vmids), 'points': aggregate(times, [columns[v] for v in vmids])}
+        for key, vmids in sorted(members.items())
+    }
+    return {'metric': metric, 'group_by': group_by, 'groups': groups}
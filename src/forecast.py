@@ -0,0 +1,151 @@
+import time
+from statistics import median
+
+DAY = 86400
+FORECAST_METHODS = ('theil-sen', 'linear')
+
+def linear_fit(xs, ys):
+    """
+    Ordinary least squares fit of y = slope * x + intercept.
+
+    Returns:
+        tuple: (slope, intercept); slope is 0 when all x are equal.
+    """
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0, mean_y
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+    return slope, mean_y - slope * mean_x
+
+def theil_sen(xs, ys, max_points=200):
+    """
+    Theil-Sen robust fit: median of the pairwise slopes.
+
+    A few outliers (a backup filling a disk for one night, a cleanup) barely
+    move the trend, unlike least squares. Series longer than max_points are
+    evenly thinned first to bound the O(n²) pairs.
+
+    Returns:
+        tuple: (slope, intercept).
+    """
+    if len(xs) > max_points:
+        step = len(xs) / max_points
+        keep = [int(i * step) for i in range(max_points)]
+        xs, ys = [xs[i] for i in keep], [ys[i] for i in keep]
+    slopes = [
+        (ys[j] - ys[i]) / (xs[j] - xs[i])
+        for i in range(len(xs)) for j in range(i + 1, len(xs))
+        if xs[j] != xs[i]
+    ]
+    if not slopes:
+        return 0.0, median(ys)
+    slope = median(slopes)
+    return slope, median(y - slope * x for x, y in zip(xs, ys))
+
+def forecast_usage(points, used_key, total_key, threshold=0.95, method='theil-sen', now=None):
+    """
+    Fits the usage trend of an RRD series and predicts when it crosses a threshold.
+
+    Args:
+        points (list): rrddata entries with 'time', used_key and total_key.
+        used_key (str): Used amount (e.g. 'memused', 'used').
+        total_key (str): Capacity (e.g. 'memtotal', 'total').
+        threshold (float): Usage ratio to predict (0-1).
+        method (str): 'theil-sen' (robust, default) or 'linear' (least squares).
+        now (float, optional): Reference time (defaults to now).
+
+    Returns:
+        dict: used, total, ratio (latest values), growth_per_day (bytes/day),
+              eta (timestamp the threshold is reached, None if usage is not growing)
+              days_left (0 if already above) and samples, or None without usable points.
+
+    Raises:
+        ValueError: If the method is unknown or the threshold not in (0, 1].
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Méthode inconnue '{method}' (valeurs possibles : {', '.join(FORECAST_METHODS)}).")
+    if not 0 < threshold <= 1:
+        raise ValueError("Le seuil doit être compris entre 0 et 100 %.")
+    usable = sorted(
+        (p for p in points
+         if p.get('time') is not None and p.get(used_key) is not None and p.get(total_key)
+         and p[used_key] == p[used_key] and p[total_key] == p[total_key]),
+        key=lambda p: p['time']
+    )
+    if not usable:
+        return None
+    now = now or time.time()
+    xs = [p['time'] / DAY for p in usable]
+    ys = [float(p[used_key]) for p in usable]
+    slope, intercept = (theil_sen if method == 'theil-sen' else linear_fit)(xs, ys)
+
+    latest = usable[-1]
+    total = float(latest[total_key])
+    used = float(latest[used_key])
+    result = {
+        'used': used,
+        'total': total,
+        'ratio': used / total,
+        'growth_per_day': slope,
+        'eta': None,
+        'days_left': None,
+        'samples': len(usable),
+    }
+    if used >= threshold * total:
+        result.update(eta=int(now), days_left=0.0)
+    elif slope > 0:
+        # Day at which the fitted line reaches the threshold (the capacity is assumed constant)
+        day = (threshold * total - intercept) / slope
+        result.update(eta=int(max(day * DAY, now)), days_left=max(0.0, day - now / DAY))
+    return result
+
+# RRD fields forecast for each kind of resource: (resource, used key, total key)
+NODE_RESOURCES = (('memory', 'memused', 'memtotal'), ('rootfs', 'rootused', 'roottotal'))
+STORAGE_RESOURCES = (('storage', 'used', 'total'),)
+
+def capacity_targets(nodes, storages, node=None, storage=None):
+    """
+    Lists the RRD series needed for a capacity forecast.
+
+    Args:
+        nodes (list): Online node names.
+        storages (list): Storage entries ('node', 'storage', 'active', 'shared').
+        node (str, optional): Only this node.
+        storage (str, optional): Only this storage (node series are skipped).
+
+    Returns:
+        list: (node, storage) tuples, storage None for the node's own series.
+              A shared storage is read once, from the first node reporting it.
+    """
+    targets = [] if storage else [(n, None) for n in nodes if not node or n == node]
+    shared = set()
+    for s in storages:
+        if not s.get('active') or (node and s['node'] != node) or (storage and s['storage'] != storage):
+            continue
+        if s.get('shared'):
+            if s['storage'] in shared:
+                continue
+            shared.add(s['storage'])
+        targets.append((s['node'], s['storage']))
+    return targets
+
+def capacity_forecasts(series, threshold=0.95, method='theil-sen', now=None):
+    """
+    Forecasts every resource of the fetched node and storage series.
+
+    Args:
+        series (list): (node, storage, rrddata) tuples (see get_capacity_rrd_data).
+
+    Returns:
+        list: forecast_usage dicts extended with node, storage and resource,
+              soonest threshold first (resources that are not growing last).
+    """
+    rows = []
+    for node, storage, points in series:
+        for resource, used_key, total_key in (NODE_RESOURCES if storage is None else STORAGE_RESOURCES):
+            result = forecast_usage(points, used_key, total_key, threshold, method, now)
+            if result:
+                rows.append(dict(result, node=node, storage=storage, resource=resource))
+    return sorted(rows, key=lambda r: (r['days_left'] is None, r['days_left'] or 0, -r['ratio']))
@@ -0,0 +1,252 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger("mcp-proxmox")
+
+# Metrics sampled from /cluster/resources ('cpu' is a 0-1 ratio, I/O are stored as bytes/s)
+METRICS = ('cpu', 'mem', 'maxmem', 'diskread', 'diskwrite', 'netin', 'netout')
+# Cumulative byte counters in /cluster/resources, turned into rates between two samples
+COUNTERS = ('diskread', 'diskwrite', 'netin', 'netout')
+
+TIMEFRAMES = {'hour': 3600, 'day': 86400, 'week': 7 * 86400, 'month': 30 * 86400, 'year': 365 * 86400}
+
+def _tiers():
+    """list: (resolution in seconds, retention in seconds), finest first; resolution 0 is the raw tier."""
+    return [
+        (0, float(os.getenv("PROXMOX_HISTORY_RAW_DAYS", "2")) * 86400),
+        (300, float(os.getenv("PROXMOX_HISTORY_5M_DAYS", "30")) * 86400),
+        (3600, float(os.getenv("PROXMOX_HISTORY_1H_DAYS", "400")) * 86400),
+    ]
+
+class HistoryStore:
+    """
+    Local time-series store of guest metrics, backed by SQLite.
+
+    Samples land in a raw tier; maintain() rolls them up into 5 minute and
+    1 hour tiers (count-weighted average plus maximum, so spikes survive the
+    rollup) and drops rows older than each tier's retention. Every tier has
+    the same columns: vmid, ts, count, then <metric> (average) and
+    <metric>_max for each metric.
+    """
+
+    def __init__(self, path, tiers=None):
+        """
+        Args:
+            path (str): SQLite database file (':memory:' for tests).
+            tiers (list, optional): (resolution, retention) pairs, finest first. Defaults to
+                                    PROXMOX_HISTORY_RAW_DAYS / _5M_DAYS / _1H_DAYS (2 / 30 / 400 days).
+        """
+        self.tiers = tiers or _tiers()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{m} REAL, {m}_max REAL" for m in METRICS)
+        with self._db:
+            for resolution, _ in self.tiers:
+                self._db.execute(
+                    f"CREATE TABLE IF NOT EXISTS samples_{resolution} "
+                    f"(vmid INTEGER, ts INTEGER, count INTEGER, {columns}, PRIMARY KEY (vmid, ts)) WITHOUT ROWID"
+                )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+
+    def record(self, ts, rows):
+        """
+        Appends one sample per guest to the raw tier.
+
+        Args:
+            ts (int): Sample timestamp (seconds).
+            rows (list): Dicts with 'vmid' and metric values (None when unknown).
+        """
+        columns = ", ".join(f"{m}, {m}_max" for m in METRICS)
+        marks = ", ".join("?" for _ in range(3 + 2 * len(METRICS)))
+        values = [
+            (int(r['vmid']), int(ts), 1, *(v for m in METRICS for v in (r.get(m), r.get(m))))
+            for r in rows
+        ]
+        with self._lock, self._db:
+            self._db.executemany(f"INSERT OR REPLACE INTO samples_0 (vmid, ts, count, {columns}) VALUES ({marks})", values)
+
+    def maintain(self, now=None):
+        """
+        Rolls completed buckets up into the coarser tiers, then applies retention.
+
+        Returns:
+            int: Number of rows deleted by retention.
+        """
+        now = int(now or time.time())
+        aggregates = ", ".join(
+            f"SUM({m} * count) / SUM(CASE WHEN {m} IS NOT NULL THEN count END), MAX({m}_max)" for m in METRICS
+        )
+        columns = ", ".join(f"{m}, {m}_max" for m in METRICS)
+        deleted = 0
+        with self._lock, self._db:
+            for (source, _), (resolution, _) in zip(self.tiers, self.tiers[1:]):
+                key = f"rollup_{resolution}"
+                row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                start = row[0] if row else 0
+                # Only buckets that can no longer receive samples are rolled up
+                end = now - now % resolution
+                if end <= start:
+                    continue
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO samples_{resolution} (vmid, ts, count, {columns}) "
+                    f"SELECT vmid, ts - ts % {resolution}, SUM(count), {aggregates} "
+                    f"FROM samples_{source} WHERE ts >= ? AND ts < ? GROUP BY vmid, ts - ts % {resolution}",
+                    (start, end),
+                )
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, end))
+            for resolution, retention in self.tiers:
+                deleted += self._db.execute(f"DELETE FROM samples_{resolution} WHERE ts < ?", (now - retention,)).rowcount
+        return deleted
+
+    def oldest(self, vmid):
+        """int: Timestamp of the oldest sample kept for a guest in any tier, or None."""
+        with self._lock:
+            found = [
+                self._db.execute(f"SELECT MIN(ts) FROM samples_{resolution} WHERE vmid = ?", (vmid,)).fetchone()[0]
+                for resolution, _ in self.tiers
+            ]
+        found = [ts for ts in found if ts is not None]
+        return min(found) if found else None
+
+    def query(self, vmid, start, end=None, now=None):
+        """
+        Returns the history of a guest, from the finest tier still covering start.
+
+        Args:
+            vmid (int): Guest ID.
+            start (int): Window start (seconds).
+            end (int, optional): Window end (seconds), defaults to now.
+
+        Returns:
+            list: rrddata-like dicts sorted by time ('time', metrics as averages, '<metric>_max').
+        """
+        now = int(now or time.time())
+        end = end or now
+        resolution = next((r for r, retention in self.tiers if now - retention <= start), self.tiers[-1][0])
+        names = ['time', 'count'] + [c for m in METRICS for c in (m, f"{m}_max")]
+        columns = ", ".join(f"{m}, {m}_max" for m in METRICS)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT ts, count, {columns} FROM samples_{resolution} WHERE vmid = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (vmid, int(start), int(end)),
+            ).fetchall()
+        return [dict(zip(names, row)) for row in rows]
+
+    def stats(self):
+        """dict: Row count per tier resolution."""
+        with self._lock:
+            return {r: self._db.execute(f"SELECT COUNT(*) FROM samples_{r}").fetchone()[0] for r, _ in self.tiers}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class HistoryCollector:
+    """
+    Background task sampling every guest from one /cluster/resources call.
+
+    Cumulative I/O counters are turned into rates between two consecutive
+    samples (a counter going down, e.g. after a guest restart, yields no rate).
+    Samples go to the history store and/or the anomaly detector.
+    """
+
+    def __init__(self, client, store=None, interval=None, detector=None):
+        """
+        Args:
+            client (AsyncProxmoxClient): Client used for /cluster/resources.
+            store (HistoryStore, optional): Destination of the samples.
+            interval (float, optional): Seconds between samples (env: PROXMOX_HISTORY_INTERVAL, default 60).
+            detector (AnomalyDetector, optional): Fed with every sample.
+        """
+        self.client = client
+        self.store = store
+        self.detector = detector
+        self.interval = interval or float(os.getenv("PROXMOX_HISTORY_INTERVAL", "60"))
+        self._counters = {}
+        self._task = None
+
+    def rows(self, ts, resources):
+        """list: Store rows for the guests in a /cluster/resources listing."""
+        rows = []
+        for r in resources:
+            if r.get('type') not in ('qemu', 'lxc') or r.get('template'):
+                continue
+            vmid = int(r['vmid'])
+            row = {'vmid': vmid, 'status': r.get('status'), 'cpu': r.get('cpu'), 'mem': r.get('mem'), 'maxmem': r.get('maxmem')}
+            previous = self._counters.get(vmid)
+            counters = {m: r.get(m) for m in COUNTERS}
+            for m in COUNTERS:
+                if previous and ts > previous[0] and counters[m] is not None and previous[1][m] is not None \
+                        and counters[m] >= previous[1][m]:
+                    row[m] = (counters[m] - previous[1][m]) / (ts - previous[0])
+            self._counters[vmid] = (ts, counters)
+            rows.append(row)
+        return rows
+
+    def counters(self):
+        """dict: {vmid: (ts, counters)} of the last sample, to turn I/O counters into current rates."""
+        return dict(self._counters)
+
+    async def sample(self):
+        """
+        Takes one sample of the cluster, stores it (applying rollups and
+        retention) and feeds it to the anomaly detector.
+
+        Returns:
+            int: Number of guests recorded.
+        """
+        resources = await self.client.get_cluster_resources('vm')
+        ts = int(time.time())
+        rows = self.rows(ts, resources)
+        if self.store:
+            await asyncio.to_thread(self.store.record, ts, rows)
+            await asyncio.to_thread(self.store.maintain, ts)
+        if self.detector:
+            self.detector.observe_rows(ts, [r for r in rows if r['status'] == 'running'])
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                count = await self.sample()
+                logger.debug(f"History sample: {count} guests")
+            except Exception as e:
+                logger.warning(f"History sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Starts sampling in the background of the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Stops the background sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+_shared_store = None
+
+def get_history_store():
+    """
+    Returns the process-wide HistoryStore, or None when PROXMOX_HISTORY_DB is not set
+    (the local history is optional).
+    """
+    global _shared_store
+    path = os.getenv("PROXMOX_HISTORY_DB")
+    if not path:
+        return None
+    if _shared_store is None:
+        _shared_store = HistoryStore(path)
+    return _shared_store
@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger("mcp-proxmox")
+
+class LazyClient:
+    """
+    Stand-in for a Proxmox client that builds it on first use.
+
+    The entry points create one at import time instead of the client itself,
+    so startup neither reads the connection settings nor opens anything. A
+    failed construction (missing or wrong settings) is retried on a later use,
+    at most once per `retry_interval`, instead of leaving the process without
+    a client until it restarts.
+
+    Truth testing builds the client (`if not proxmox:` stays the readiness
+    check of the tools and endpoints); any other attribute is looked up on
+    the built client.
+    """
+
+    def __init__(self, factory, retry_interval=None):
+        """
+        Args:
+            factory (callable): Returns the client; raises if it cannot be built.
+            retry_interval (float, optional): Seconds between construction attempts after a
+                                              failure (env: PROXMOX_CLIENT_RETRY_INTERVAL, default 10).
+        """
+        self._factory = factory
+        self.retry_interval = retry_interval if retry_interval is not None else float(os.getenv("PROXMOX_CLIENT_RETRY_INTERVAL", "10"))
+        self.error = None
+        self._client = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self):
+        """bool: Whether the client exists (without trying to build it)."""
+        return self._client is not None
+
+    def get(self):
+        """
+        Returns the client, building it if needed.
+
+        Returns:
+            object: The client, or None if it cannot be built (yet); `error` holds the reason.
+        """
+        if self._client is not None:
+            return self._client
+        with self._lock:
+            if self._client is None and (self._failed_at is None or time.monotonic() - self._failed_at >= self.retry_interval):
+                start = time.perf_counter()
+                try:
+                    self._client = self._factory()
+                except Exception as e:
+                    self.error = e
+                    self._failed_at = time.monotonic()
+                    logger.error(f"Erreur d'initialisation du client Proxmox (nouvel essai dans {self.retry_interval:g}s) : {e}")
+                else:
+                    self.error = None
+                    logger.info(f"Client Proxmox initialisé en {(time.perf_counter() - start) * 1000:.0f} ms.")
+        return self._client
+
+    def __bool__(self):
+        return self.get() is not None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            # Private attributes are looked up before __init__ ran (copy, pickle)
+            raise AttributeError(name)
+        client = self.get()
+        if client is None:
+            raise RuntimeError(f"Client Proxmox non configuré : {self.error}")
+        return getattr(client, name)
+
+    async def aclose(self):
+        """Closes the client if it was built."""
+        if self._client is not None:
+            await self._client.aclose()
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+
+class LocationIndex:
+    """
+    In-memory index from vmid to its current (node, type).
+
+    Fed by every cluster inventory the client fetches, and by the clones and
+    migrations the client starts once their task succeeded, so tools can
+    resolve a vmid without a full cluster scan.
+    """
+
+    def __init__(self, max_age=None):
+        """
+        Args:
+            max_age (float, optional): Seconds after which the index is considered stale
+                                       and refreshed before a lookup (env: PROXMOX_INDEX_MAX_AGE, default 60).
+        """
+        self.max_age = max_age if max_age is not None else float(os.getenv("PROXMOX_INDEX_MAX_AGE", "60"))
+        self._locations = {}
+        # UPID -> (vmid, node, type) the machine will have once the task succeeds
+        self._expected = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def stale(self):
+        """bool: True if the index was never refreshed or is older than max_age."""
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.max_age
+
+    def refresh(self, machines, complete=True):
+        """
+        Applies a cluster inventory to the index, touching only the entries that changed.
+
+        Args:
+            machines (list): Machine dictionaries with 'vmid', 'node' and 'type'.
+            complete (bool): True if the inventory covers every node; vmids absent
+                             from a complete inventory are dropped.
+
+        Returns:
+            int: Number of entries added, moved or removed.
+        """
+        seen = set()
+        changes = 0
+        with self._lock:
+            for m in machines:
+                vmid = int(m['vmid'])
+                location = (m['node'], m['type'])
+                seen.add(vmid)
+                if self._locations.get(vmid) != location:
+                    self._locations[vmid] = location
+                    changes += 1
+            if complete:
+                for vmid in self._locations.keys() - seen:
+                    del self._locations[vmid]
+                    changes += 1
+                self._refreshed_at = time.monotonic()
+        return changes
+
+    def get(self, vmid):
+        """
+        Returns:
+            tuple: (node, type) for the vmid, or None if unknown.
+        """
+        return self._locations.get(int(vmid))
+
+    def set(self, vmid, node, machine_type):
+        """Records the location of a machine."""
+        with self._lock:
+            self._locations[int(vmid)] = (node, machine_type)
+
+    def discard(self, vmid):
+        """Forgets a machine; the next lookup refreshes the index from the inventory."""
+        with self._lock:
+            self._locations.pop(int(vmid), None)
+
+    def expect(self, upid, vmid, node, machine_type):
+        """
+        Records where a machine will be once a task (clone, migration) succeeds.
+
+        Until settle() sees the task finish, lookups of the vmid go through the
+        inventory, which still shows the machine where it is.
+        """
+        if isinstance(upid, str):
+            with self._lock:
+                self._expected[upid] = (int(vmid), node, machine_type)
+
+    def settle(self, tasks):
+        """
+        Applies the expected locations of finished tasks (see expect).
+
+        Args:
+            tasks (list): Finished task records, with 'upid' and 'success'.
+
+        Returns:
+            int: Number of locations recorded (failed tasks record none).
+        """
+        settled = 0
+        with self._lock:
+            for task in tasks:
+                expected = self._expected.pop(task['upid'], None)
+                if expected and task.get('success'):
+                    vmid, node, machine_type = expected
+                    self._locations[vmid] = (node, machine_type)
+                    settled += 1
+        return settled
+
+    def __len__(self):
+        return len(self._locations)
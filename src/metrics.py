@@ -0,0 +1,302 @@
+import os
+import re
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("mcp-proxmox.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Latency buckets (seconds): pveproxy answers in a few ms, fan-outs and task waits take seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self):
+        """list: (suffix, label values, extra labels, value) tuples of the exposition."""
+        with self._lock:
+            return [("", key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. requests in flight)."""
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets, exposed as _bucket/_sum/_count."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    samples.append(("_bucket", key, (("le", _number(bound)),), cumulative))
+                samples.append(("_sum", key, (), total))
+                samples.append(("_count", key, (), cumulative))
+        return samples
+
+class Callback(_Metric):
+    """Metric read at scrape time from a function returning {label values tuple: value}."""
+
+    def __init__(self, name, help, labels, func, kind="counter"):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.func = func
+
+    def samples(self):
+        try:
+            values = self.func()
+        except Exception as e:
+            logger.warning(f"Metric {self.name} unavailable: {e}")
+            return []
+        return [("", tuple(str(v) for v in key), (), value) for key, value in sorted(values.items())]
+
+class Registry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Adds a metric, replacing one of the same name (e.g. a callback bound to a new client)."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        """str: Text exposition (format 0.0.4) of every metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+TOOL_DURATION = REGISTRY.histogram(
+    "proxmox_mcp_tool_duration_seconds", "Latency of MCP tool calls.", ("tool", "status"))
+ENDPOINT_DURATION = REGISTRY.histogram(
+    "proxmox_api_request_duration_seconds", "Latency of REST API requests.", ("method", "route", "status"))
+IN_FLIGHT = REGISTRY.gauge(
+    "proxmox_in_flight_requests", "Tool calls, REST requests and upstream Proxmox calls in progress.", ("side",))
+ERRORS = REGISTRY.counter(
+    "proxmox_errors_total", "Tool calls, REST requests and upstream calls that failed, by exception type.", ("side", "error"))
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "proxmox_upstream_requests_total", "Proxmox API calls by path template and status code.", ("method", "path", "status"))
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "proxmox_upstream_request_duration_seconds", "Latency of Proxmox API calls.", ("method", "path"))
+UPSTREAM_BYTES = REGISTRY.counter(
+    "proxmox_upstream_response_bytes_total", "Bytes received from the Proxmox API.", ("method", "path"))
+
+# Path segments followed by an identifier, replaced by a placeholder so
+# /nodes/pve1/qemu/100/status/current counts as /nodes/{node}/qemu/{vmid}/status/current
+_PLACEHOLDERS = {
+    'nodes': '{node}', 'qemu': '{vmid}', 'lxc': '{vmid}', 'storage': '{storage}', 'tasks': '{upid}',
+    'snapshot': '{snapname}', 'content': '{volume}', 'pools': '{poolid}', 'backup': '{id}',
+}
+_PREFIX = re.compile(r'^(https?://[^/]+)?(/api2/json)?')
+
+def path_template(path):
+    """
+    Turns a Proxmox API path into a low-cardinality template.
+
+    Args:
+        path (str): Request path or URL (with or without /api2/json).
+
+    Returns:
+        str: The path with node names, vmids, storages, UPIDs... replaced by placeholders.
+    """
+    parts = _PREFIX.sub('', path.split('?', 1)[0]).strip('/').split('/')
+    template = []
+    for i, part in enumerate(parts):
+        parent = parts[i - 1] if i else None
+        if parent in _PLACEHOLDERS and template[-1] == parent:
+            template.append(_PLACEHOLDERS[parent])
+            if parent == 'content':
+                # Volume IDs may contain slashes (local:iso/debian.iso)
+                break
+        elif part.isdigit():
+            template.append('{id}')
+        else:
+            template.append(part)
+    return '/' + '/'.join(template)
+
+def observe_upstream(method, path, status, seconds, size):
+    """Records one Proxmox API call (status 0 when no response was received)."""
+    path = path_template(path)
+    UPSTREAM_REQUESTS.inc(method=method, path=path, status=status)
+    UPSTREAM_DURATION.observe(seconds, method=method, path=path)
+    if size:
+        UPSTREAM_BYTES.inc(size, method=method, path=path)
+
+@contextmanager
+def track(side, histogram, **labels):
+    """
+    Times a block, counting it in flight and recording its latency.
+
+    Yields the dict of labels of the observation, 'status' defaulting to 'ok';
+    the block can update them (e.g. an HTTP status, a route only known once
+    matched). An exception sets the status to 'error', is counted in
+    proxmox_errors_total and is re-raised.
+    """
+    IN_FLIGHT.inc(side=side)
+    start = time.perf_counter()
+    outcome = dict(labels, status="ok")
+    try:
+        yield outcome
+    except BaseException as e:
+        outcome['status'] = "error"
+        ERRORS.inc(side=side, error=type(e).__name__)
+        raise
+    finally:
+        IN_FLIGHT.dec(side=side)
+        histogram.observe(time.perf_counter() - start, **outcome)
+
+def watch_client(client):
+    """
+    Exposes the cache and connection pool counters of a Proxmox client.
+
+    They are read from the client at scrape time, so the hot path pays nothing.
+    """
+    def cache_lookups():
+        values = {}
+        for kind, counters in client.cache.stats()['kinds'].items():
+            for result in ('hits', 'misses', 'expired', 'evictions', 'invalidations'):
+                values[(kind, result)] = counters[result]
+        return values
+
+    def pool():
+        stats = client.get_pool_stats()
+        return {(k,): v for k, v in stats.items() if isinstance(v, int)}
+
+    REGISTRY.register(Callback(
+        "proxmox_cache_events_total", "Inventory cache hits, misses, expirations, evictions and invalidations.",
+        ("kind", "event"), cache_lookups))
+    REGISTRY.register(Callback(
+        "proxmox_pool_events_total", "HTTP connection pool requests, new connections and reuses.",
+        ("event",), pool))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def start_http_server(port=None, host=None):
+    """
+    Serves /metrics on a sidecar port from a daemon thread (for the stdio MCP
+    server, which has no HTTP listener of its own).
+
+    Args:
+        port (int, optional): Port (env: PROXMOX_METRICS_PORT); unset or 0 disables the sidecar.
+        host (str, optional): Bind address (env: PROXMOX_METRICS_HOST, default 127.0.0.1).
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it), or None when disabled.
+    """
+    port = port if port is not None else int(os.getenv("PROXMOX_METRICS_PORT", "0"))
+    if not port:
+        return None
+    host = host or os.getenv("PROXMOX_METRICS_HOST", "127.0.0.1")
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Metrics served on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class MachineActionRequest(BaseModel):
+    vmid: int
+    node: Optional[str] = None  # resolved from the vmid if omitted
+    type: Optional[str] = None  # 'qemu' or 'lxc', resolved from the vmid if omitted
+
+class StopMachineRequest(MachineActionRequest):
+    force: bool = False
+
+class SnapshotRequest(MachineActionRequest):
+    snapname: str
+    description: Optional[str] = None
+
+class RollbackRequest(MachineActionRequest):
+    snapname: str
+
+class CloneRequest(MachineActionRequest):
+    newid: int
+    name: str
+    target_node: Optional[str] = None
+
+class ResizeRequest(MachineActionRequest):
+    cores: Optional[int] = None
+    memory_mb: Optional[int] = None
+
+class BulkActionRequest(BaseModel):
+    action: str  # 'start', 'stop', 'shutdown' or 'reboot'
+    vmids: Optional[List[int]] = None
+    tag: Optional[str] = None
+    name_pattern: Optional[str] = None  # shell-style, e.g. 'web-*'
+    use_node_endpoints: bool = True
+
+class CreateBackupRequest(BaseModel):
+    vmid: int
+    node: Optional[str] = None
+    storage: str
+    mode: str = "snapshot"
+
+class FirewallRuleRequest(MachineActionRequest):
+    action: str
+    direction: str # 'in' or 'out'
+    proto: Optional[str] = None
+    port: Optional[str] = None
+
+class BatchOperation(BaseModel):
+    action: str  # 'start', 'stop', 'reboot', 'snapshot', 'rollback', 'clone', 'backup' or 'resize'
+    params: dict = {}  # fields of the action's request model (vmid, node, snapname...)
+    id: Optional[str] = None  # defaults to the operation's position in the batch
+    depends_on: List[str] = []  # ids of operations whose task must succeed first
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    wait: bool = False  # wait for every task, not only those other operations depend on
+    timeout: int = 300  # maximum wait per task (seconds)
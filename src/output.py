@@ -0,0 +1,51 @@
+import os
+import json
+from mcp.types import CallToolResult, TextContent
+
+OUTPUT_FORMATS = ('text', 'json')
+
+def output_format(requested=None):
+    """
+    Resolves the output format of a tool call.
+
+    Args:
+        requested (str, optional): Format asked by the caller ('text' or 'json').
+
+    Returns:
+        str: The requested format, else PROXMOX_OUTPUT_FORMAT (default 'text').
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    fmt = (requested or os.getenv("PROXMOX_OUTPUT_FORMAT", "text")).lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Format de sortie inconnu '{fmt}' (valeurs possibles : {', '.join(OUTPUT_FORMATS)}).")
+    return fmt
+
+def structured(data):
+    """
+    Wraps records as an MCP tool result with structured content.
+
+    The text block carries the same content as compact JSON for clients that
+    ignore structured content. Lists are wrapped as {"result": [...]} since
+    structured content must be an object.
+
+    Returns:
+        CallToolResult: Result returned as-is by FastMCP.
+    """
+    content = data if isinstance(data, dict) else {'result': data}
+    text = json.dumps(content, separators=(',', ':'), ensure_ascii=False, default=str)
+    return CallToolResult(content=[TextContent(type='text', text=text)], structuredContent=content)
+
+def render(data, text_renderer, output=None):
+    """
+    Returns records as structured content, or through their text renderer.
+
+    Args:
+        data (dict | list): JSON-serializable records built by the tool.
+        text_renderer (callable): Builds the human-readable answer from data.
+        output (str, optional): 'text' or 'json'; defaults to PROXMOX_OUTPUT_FORMAT.
+    """
+    if output_format(output) == 'json':
+        return structured(data)
+    return text_renderer(data)
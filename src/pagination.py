@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import base64
+import secrets
+import threading
+from collections import OrderedDict, namedtuple
+
+# Machine fields accepted as sort keys ('-' prefix for descending order)
+SORT_KEYS = ('vmid', 'name', 'node', 'status', 'type', 'cpu', 'mem', 'maxmem', 'uptime',
+             'maxcpu', 'disk', 'maxdisk', 'netin', 'netout', 'diskread', 'diskwrite')
+
+Page = namedtuple('Page', 'items next_cursor total offset')
+
+def sort_machines(machines, sort='vmid'):
+    """
+    Sorts machines on one field, ties broken by vmid so the order is total.
+
+    Args:
+        machines (list): Machine dictionaries.
+        sort (str): One of SORT_KEYS, optionally prefixed with '-' for descending order.
+
+    Raises:
+        ValueError: If the sort key is unknown.
+    """
+    field = sort.lstrip('-')
+    if field not in SORT_KEYS:
+        raise ValueError(f"Clé de tri inconnue '{field}' (valeurs possibles : {', '.join(SORT_KEYS)}).")
+
+    def key(m):
+        value = m[field]
+        return (value.lower() if isinstance(value, str) else value, int(m.get('vmid', 0)))
+
+    # Machines missing the field always come last, whatever the direction
+    present = [m for m in machines if m.get(field) is not None]
+    absent = [m for m in machines if m.get(field) is None]
+    ordered = sorted(present, key=key, reverse=sort.startswith('-'))
+    return ordered + sorted(absent, key=lambda m: int(m.get('vmid', 0)))
+
+def encode_cursor(snapshot_id, offset):
+    """str: Opaque cursor pointing at offset in a snapshot."""
+    raw = json.dumps({'s': snapshot_id, 'o': offset}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (snapshot_id, offset).
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(data['s']), int(data['o'])
+    except Exception:
+        raise ValueError("Curseur invalide.")
+
+class SnapshotPager:
+    """
+    Cursor pagination over frozen copies of a listing.
+
+    The first page of a query stores the full (filtered, sorted) listing as a
+    snapshot; the cursors handed out only reference that snapshot and an
+    offset, so later pages stay consistent even if guests are created, moved
+    or deleted meanwhile. Snapshots expire after `ttl` seconds and at most
+    `max_snapshots` are kept (least recently used dropped first).
+    """
+
+    def __init__(self, ttl=None, max_snapshots=None):
+        """
+        Args:
+            ttl (float, optional): Snapshot lifetime in seconds (env: PROXMOX_SNAPSHOT_TTL, default 300).
+            max_snapshots (int, optional): Snapshots kept at once (env: PROXMOX_SNAPSHOT_MAX, default 32).
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("PROXMOX_SNAPSHOT_TTL", "300"))
+        self.max_snapshots = max_snapshots or int(os.getenv("PROXMOX_SNAPSHOT_MAX", "32"))
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def page(self, limit, cursor=None, query=None, items=None):
+        """
+        Returns one page of a listing.
+
+        Args:
+            limit (int): Maximum number of items in the page; None for everything left.
+            cursor (str, optional): Cursor from a previous page; None for the first page.
+            query (hashable, optional): Filters and sort of the request. A cursor is
+                                        only valid for the query that created it.
+            items (list, optional): Full listing, required for the first page (ignored with a cursor).
+
+        Returns:
+            Page: items, next_cursor (None on the last page), total and offset.
+
+        Raises:
+            ValueError: If the cursor is invalid, expired or belongs to another query.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError("limit doit être >= 1.")
+        if cursor:
+            snapshot_id, offset = decode_cursor(cursor)
+            items = self._resume(snapshot_id, query)
+        else:
+            items = list(items or [])
+            offset = 0
+            if limit is None or len(items) <= limit:
+                # Single page: nothing to resume, no snapshot kept
+                return Page(items, None, len(items), 0)
+            snapshot_id = self._store(items, query)
+
+        end = len(items) if limit is None else offset + limit
+        next_cursor = encode_cursor(snapshot_id, end) if end < len(items) else None
+        return Page(items[offset:end], next_cursor, len(items), offset)
+
+    def _store(self, items, query):
+        snapshot_id = secrets.token_urlsafe(8)
+        with self._lock:
+            self._snapshots[snapshot_id] = (time.monotonic() + self.ttl, items, query)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot_id
+
+    def _resume(self, snapshot_id, query):
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._snapshots[snapshot_id]
+                entry = None
+            if entry is None:
+                raise ValueError("Curseur expiré : relancez la requête sans curseur.")
+            if entry[2] != query:
+                raise ValueError("Ce curseur a été créé pour d'autres filtres ou un autre tri.")
+            self._snapshots.move_to_end(snapshot_id)
+            return entry[1]
@@ -0,0 +1,175 @@
+import re
+import operator
+from functools import lru_cache
+from src.bulk import machine_tags
+from src.pagination import sort_machines
+
+# Inventory fields (/cluster/resources) usable in a query, by kind
+NUMERIC_FIELDS = ('vmid', 'cpu', 'maxcpu', 'mem', 'maxmem', 'disk', 'maxdisk', 'uptime',
+                  'netin', 'netout', 'diskread', 'diskwrite', 'template')
+TEXT_FIELDS = ('name', 'node', 'type', 'status', 'tags', 'lock', 'pool', 'hastate')
+QUERY_FIELDS = NUMERIC_FIELDS + TEXT_FIELDS
+
+# Columns returned when the caller does not pick them; ALL_FIELDS asks for the full rows
+DEFAULT_FIELDS = ('vmid', 'name', 'node', 'type', 'status', 'uptime')
+ALL_FIELDS = '*'
+
+# '==' and the two-character operators before their one-character prefixes
+_CONDITION = re.compile(r'^\s*([a-z_]+)\s*(==|!=|>=|<=|=|>|<|~)\s*(.*?)\s*$')
+_OPERATORS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne, '>': operator.gt,
+              '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+# Binary size suffixes for memory/disk values (mem>4G), '%' for ratios (cpu>50%)
+_SUFFIXES = {'k': 1024, 'm': 1024**2, 'g': 1024**3, 't': 1024**4, '%': 0.01}
+
+def parse_number(text):
+    """
+    Parses a numeric query value, with an optional K/M/G/T (binary) or % suffix.
+
+    Raises:
+        ValueError: If the value is not a number.
+    """
+    value = text.strip().lower()
+    if len(value) > 2 and value[-1] == 'b' and value[-2] in 'kmgt':
+        value = value[:-1]  # 4GB reads as 4G
+    scale = 1
+    if value and value[-1] in _SUFFIXES:
+        value, scale = value[:-1], _SUFFIXES[value[-1]]
+    try:
+        return float(value) * scale
+    except ValueError:
+        raise ValueError(f"Valeur numérique invalide '{text}'.")
+
+def compile_condition(condition):
+    """
+    Compiles one condition into a predicate on a machine dictionary.
+
+    Syntax: <field><op><value>, op among = != > >= < <= (numeric fields) and
+    = != ~ (text fields, ~ being a case-insensitive substring match). The
+    pseudo-field 'tag' tests one tag of the machine (tag=prod, tag!=dev).
+
+    Returns:
+        callable: machine -> bool (False when the machine lacks the field).
+
+    Raises:
+        ValueError: For a malformed condition, an unknown field or an operator
+                    that does not apply to the field.
+    """
+    match = _CONDITION.match(condition)
+    if not match:
+        raise ValueError(f"Condition invalide '{condition}' (attendu : champ, opérateur, valeur, ex. mem>4G).")
+    field, op, raw = match.groups()
+
+    if field == 'tag':
+        if op not in ('=', '==', '!='):
+            raise ValueError(f"Condition '{condition}' : seuls = et != s'appliquent à tag.")
+        wanted = op != '!='
+        return lambda m: (raw in machine_tags(m)) is wanted
+
+    if field in NUMERIC_FIELDS:
+        if op == '~':
+            raise ValueError(f"Condition '{condition}' : ~ ne s'applique qu'aux champs texte.")
+        compare, value = _OPERATORS[op], parse_number(raw)
+
+        def numeric(m):
+            actual = m.get(field)
+            return actual is not None and compare(actual, value)
+        return numeric
+
+    if field in TEXT_FIELDS:
+        if op == '~':
+            needle = raw.lower()
+            return lambda m: needle in (m.get(field) or '').lower()
+        if op in ('=', '=='):
+            return lambda m: m.get(field) == raw
+        if op == '!=':
+            return lambda m: m.get(field) != raw
+        raise ValueError(f"Condition '{condition}' : {op} ne s'applique qu'aux champs numériques.")
+
+    raise ValueError(f"Champ inconnu '{field}' (valeurs possibles : tag, {', '.join(QUERY_FIELDS)}).")
+
+class MachineQuery:
+    """
+    Filter, sort and projection of the machine inventory, compiled once.
+
+    The conditions become predicates tested in a single pass over the
+    inventory; only the requested columns are copied out of the rows that
+    are actually returned (the full rows only when asked for with '*').
+    Build instances with compile_query(), which keeps the recently used
+    ones compiled.
+    """
+
+    def __init__(self, where=(), fields=None, sort='vmid'):
+        """
+        Args:
+            where (tuple): Conditions (see compile_condition), all required.
+            fields (tuple, optional): Columns to return (default: DEFAULT_FIELDS), or ('*',)
+                for the full inventory rows.
+            sort (str): Sort field, '-' prefix for descending order.
+
+        Raises:
+            ValueError: For an invalid condition, column or sort field.
+        """
+        self.where = tuple(where)
+        fields = tuple(fields) if fields else DEFAULT_FIELDS
+        self.fields = None if ALL_FIELDS in fields else fields
+        unknown = [f for f in self.fields or () if f not in QUERY_FIELDS]
+        if unknown:
+            raise ValueError(f"Colonne(s) inconnue(s) {', '.join(unknown)} (valeurs possibles : {', '.join(QUERY_FIELDS)}).")
+        self.sort = sort
+        sort_machines([], sort)  # validates the sort key
+        self._predicates = tuple(compile_condition(c) for c in self.where)
+
+    @property
+    def key(self):
+        """tuple: Identity of the query (pagination cursors are only valid for the same key)."""
+        return (self.where, self.fields, self.sort)
+
+    def matches(self, machine):
+        for predicate in self._predicates:
+            if not predicate(machine):
+                return False
+        return True
+
+    def select(self, machines):
+        """list: The matching machines, sorted (full rows, for pagination snapshots)."""
+        if self._predicates:
+            machines = [m for m in machines if self.matches(m)]
+        return sort_machines(machines, self.sort)
+
+    def project(self, machines):
+        """list: Only the requested columns of each machine (copies of the full rows for '*')."""
+        fields = self.fields
+        if fields is None:
+            return [dict(m) for m in machines]
+        return [{f: m.get(f) for f in fields} for m in machines]
+
+    def run(self, machines):
+        """list: Selected, sorted and projected machines."""
+        return self.project(self.select(machines))
+
+@lru_cache(maxsize=128)
+def compile_query(where=(), fields=None, sort='vmid'):
+    """
+    Returns the compiled MachineQuery for these arguments (tuples), reusing
+    it while it stays among the 128 most recently used.
+    """
+    return MachineQuery(where, fields, sort)
+
+def build_query(where=None, fields=None, sort='vmid', name=None, status=None, machine_type=None, node=None, tag=None):
+    """
+    Compiles a query from the list_machines arguments, the shorthand filters
+    (name substring, status, type, node, tag) being turned into conditions.
+
+    Returns:
+        MachineQuery: The compiled query.
+
+    Raises:
+        ValueError: For an invalid condition, column or sort field.
+    """
+    conditions = list(where or [])
+    if name:
+        conditions.append(f"name~{name}")
+    for field, value in (('status', status), ('type', machine_type), ('node', node), ('tag', tag)):
+        if value:
+            conditions.append(f"{field}={value}")
+    return compile_query(tuple(conditions), tuple(fields) if fields else None, sort)
@@ -0,0 +1,116 @@
+from src.fanout import PartialResult
+
+def _storage_from_resource(resource):
+    """Maps a /cluster/resources storage entry to the /nodes/{node}/storage format."""
+    used = resource.get('disk', 0)
+    total = resource.get('maxdisk', 0)
+    return {
+        'storage': resource.get('storage'),
+        'node': resource.get('node'),
+        'type': resource.get('plugintype'),
+        'content': resource.get('content', ''),
+        'shared': resource.get('shared', 0),
+        'active': 1 if resource.get('status') == 'available' else 0,
+        'enabled': 1,
+        'used': used,
+        'total': total,
+        'avail': max(total - used, 0),
+        'used_fraction': used / total if total else 0,
+    }
+
+def _node_status_from_resource(resource):
+    """Maps a /cluster/resources node entry to the /nodes/{node}/status format."""
+    return {
+        'node': resource['node'],
+        'status': resource.get('status'),
+        'cpu': resource.get('cpu', 0),
+        'cpuinfo': {'cpus': resource.get('maxcpu', 0)},
+        'memory': {'used': resource.get('mem', 0), 'total': resource.get('maxmem', 0), 'free': resource.get('maxmem', 0) - resource.get('mem', 0)},
+        'rootfs': {'used': resource.get('disk', 0), 'total': resource.get('maxdisk', 0)},
+        'uptime': resource.get('uptime', 0),
+    }
+
+def machines_from_resources(resources):
+    """PartialResult: The guests (QEMU and LXC) of a /cluster/resources listing."""
+    return PartialResult(r for r in resources if r.get('type') in ('qemu', 'lxc'))
+
+def machines_from_nodes(fetched):
+    """
+    Merges per-node guest listings into one inventory.
+
+    Args:
+        fetched (PartialResult): (node, machine_type, guests) fan-out results.
+
+    Returns:
+        PartialResult: The guests, each tagged with its 'node' and 'type', and
+                       the fan-out failures.
+    """
+    machines = PartialResult(failures=fetched.failures)
+    for node_name, machine_type, guests in fetched:
+        for guest in guests:
+            guest['node'] = node_name
+            guest['type'] = machine_type
+            machines.append(guest)
+    return machines
+
+def storage_from_resources(resources, nodes):
+    """
+    Maps the storage entries of some nodes from a /cluster/resources listing.
+
+    Args:
+        resources (list): /cluster/resources storage entries, or None if the endpoint is unavailable.
+        nodes (list): Node names wanted.
+
+    Returns:
+        tuple: (PartialResult of storages in the /nodes/{node}/storage format,
+               nodes to query one by one). Nodes whose entries lack the content
+               types (older Proxmox versions), or every node without a listing,
+               are left to the per-node calls.
+    """
+    if resources is None:
+        return PartialResult(), list(nodes)
+    wanted = set(nodes)
+    entries = [r for r in resources if r.get('node') in wanted]
+    incomplete = {r['node'] for r in entries if 'content' not in r}
+    storages = PartialResult(_storage_from_resource(r) for r in entries if r['node'] not in incomplete)
+    return storages, [node for node in nodes if node in incomplete]
+
+def add_node_storage(storages, fetched):
+    """Appends (node, 'storage', storages) fan-out results and their failures to `storages`."""
+    storages.failures.extend(fetched.failures)
+    for node_name, _, node_storages in fetched:
+        for storage in node_storages:
+            storage['node'] = node_name
+            storages.append(storage)
+    return storages
+
+def node_status_from_resources(resources, nodes=None):
+    """
+    Maps the node entries of a /cluster/resources listing to the /nodes/{node}/status format.
+
+    Args:
+        resources (list): /cluster/resources node entries.
+        nodes (list, optional): Node names wanted. Defaults to every node.
+
+    Returns:
+        PartialResult: Status of the online nodes; the others are listed in
+                       `failures` with reason 'offline'.
+    """
+    wanted = set(nodes) if nodes is not None else None
+    result = PartialResult()
+    for r in resources:
+        if r.get('type') != 'node' or (wanted is not None and r['node'] not in wanted):
+            continue
+        if r.get('status') == 'online':
+            result.append(_node_status_from_resource(r))
+        else:
+            result.failures.append({'node': r['node'], 'resource': 'status', 'reason': 'offline', 'error': f"node is {r.get('status', 'unknown')}"})
+    return result
+
+def node_status_from_nodes(fetched):
+    """PartialResult: (node, 'status', status) fan-out results, each status tagged with its 'node'."""
+    resources = PartialResult(failures=fetched.failures)
+    for node_name, _, status in fetched:
+        status['node'] = node_name
+        resources.append(status)
+    return resources
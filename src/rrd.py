@@ -0,0 +1,166 @@
+import math
+
+# RRD metrics summarized for guests ('cpu' is a 0-1 ratio, the others are bytes or bytes/s)
+METRICS = ('cpu', 'mem', 'diskread', 'diskwrite', 'netin', 'netout')
+
+def columns(points, metrics=METRICS):
+    """
+    Splits RRD points into columns, dropping points without a timestamp.
+
+    Args:
+        points (list): rrddata entries (dicts with 'time' and metric keys).
+        metrics (tuple): Metric keys to extract.
+
+    Returns:
+        tuple: (times, {metric: values}) where missing or NaN values are None.
+    """
+    rows = sorted((p for p in points if p.get('time') is not None), key=lambda p: p['time'])
+    times = [int(p['time']) for p in rows]
+    cols = {}
+    for metric in metrics:
+        values = [p.get(metric) for p in rows]
+        # Proxmox leaves gaps as missing keys, some versions as NaN
+        cols[metric] = [None if v is None or v != v else float(v) for v in values]
+    return times, cols
+
+def percentile(ordered, q):
+    """Value at quantile q (0-1) of an already sorted, non-empty list, by nearest rank."""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+def stats(values, peaks=None):
+    """
+    Args:
+        values (list): Metric values, None when missing.
+        peaks (list, optional): Per-point maxima of pre-aggregated points (e.g. rollups),
+                                used for 'max' so spikes survive the aggregation.
+
+    Returns:
+        dict: min/avg/max/p95 of the non-missing values (p95 by nearest rank), or None if there are none.
+    """
+    present = sorted(v for v in values if v is not None)
+    if not present:
+        return None
+    highest = max((v for v in peaks or () if v is not None), default=present[-1])
+    return {
+        'min': present[0],
+        'avg': sum(present) / len(present),
+        'max': max(present[-1], highest),
+        'p95': percentile(present, 0.95),
+    }
+
+def bucketize(times, cols, buckets, peaks=None):
+    """
+    Aggregates columns into at most `buckets` contiguous time buckets.
+
+    Every point lands in exactly one bucket, so a spike always shows up in
+    the max/p95 of its bucket instead of being skipped by sampling.
+
+    Args:
+        times (list): Sorted timestamps.
+        cols (dict): {metric: values} aligned with times.
+        buckets (int): Maximum number of buckets.
+        peaks (dict, optional): {metric: per-point maxima} aligned with times.
+
+    Returns:
+        list: One dict per bucket with start, end, count and {metric: stats}.
+    """
+    if buckets < 1:
+        raise ValueError("Le nombre de points doit être >= 1.")
+    n = len(times)
+    buckets = min(buckets, n)
+    result = []
+    for b in range(buckets):
+        lo, hi = b * n // buckets, (b + 1) * n // buckets
+        bucket = {'start': times[lo], 'end': times[hi - 1], 'count': hi - lo}
+        for metric, values in cols.items():
+            bucket[metric] = stats(values[lo:hi], peaks and peaks[metric][lo:hi])
+        result.append(bucket)
+    return result
+
+def lttb(times, values, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, in each bucket in between, the point
+    forming the largest triangle with the previously kept point and the average
+    of the next bucket, which preserves peaks and the overall shape of the curve.
+
+    Args:
+        times (list): Sorted timestamps.
+        values (list): Values aligned with times (None values are skipped).
+        threshold (int): Number of points to keep.
+
+    Returns:
+        list: Indices of the kept points, in increasing order.
+    """
+    index = [i for i, v in enumerate(values) if v is not None]
+    if threshold >= len(index):
+        return index
+    if threshold < 3:
+        return [index[0], index[-1]][:threshold]
+
+    kept = [index[0]]
+    every = (len(index) - 2) / (threshold - 2)
+    a = index[0]
+    for b in range(threshold - 2):
+        start, end = int(b * every) + 1, int((b + 1) * every) + 1
+        nxt_start, nxt_end = end, min(int((b + 2) * every) + 1, len(index))
+        nxt = index[nxt_start:nxt_end] or index[-1:]
+        avg_t = sum(times[i] for i in nxt) / len(nxt)
+        avg_v = sum(values[i] for i in nxt) / len(nxt)
+
+        ta, va = times[a], values[a]
+        best, best_area = index[start], -1.0
+        for i in index[start:end]:
+            area = abs((ta - avg_t) * (values[i] - va) - (ta - times[i]) * (avg_v - va))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+        a = best
+    kept.append(index[-1])
+    return kept
+
+def summarize(points, buckets=12, method='buckets', metric='cpu', metrics=METRICS):
+    """
+    Reduces RRD points to a small summary that keeps spikes visible.
+
+    Args:
+        points (list): rrddata entries; '<metric>_max' keys (local history rollups) feed the maxima.
+        buckets (int): Number of buckets (or points kept with LTTB).
+        method (str): 'buckets' (min/avg/max/p95 per bucket) or 'lttb' (shape-preserving sample).
+        metric (str): Metric driving the LTTB selection.
+        metrics (tuple): Metrics to report.
+
+    Returns:
+        dict: {method, count, start, end, overall: {metric: stats}, points: [...]}.
+              With 'buckets', points are bucket dicts; with 'lttb', the kept raw points.
+
+    Raises:
+        ValueError: If buckets < 1, or the method or the LTTB metric is unknown.
+    """
+    if buckets < 1:
+        raise ValueError("Le nombre de points doit être >= 1.")
+    if method not in ('buckets', 'lttb'):
+        raise ValueError(f"Méthode inconnue '{method}' (valeurs possibles : buckets, lttb).")
+    if method == 'lttb' and metric not in metrics:
+        raise ValueError(f"Métrique inconnue '{metric}' (valeurs possibles : {', '.join(metrics)}).")
+    times, cols = columns(points, metrics)
+    peaks = None
+    if any(f"{metrics[0]}_max" in p for p in points):
+        _, maxima = columns(points, tuple(f"{m}_max" for m in metrics))
+        peaks = {m: maxima[f"{m}_max"] for m in metrics}
+    summary = {
+        'method': method,
+        'count': len(times),
+        'start': times[0] if times else None,
+        'end': times[-1] if times else None,
+        'overall': {m: stats(values, peaks and peaks[m]) for m, values in cols.items()},
+    }
+    if method == 'buckets':
+        summary['points'] = bucketize(times, cols, buckets, peaks)
+    else:
+        summary['points'] = [
+            dict({'time': times[i]}, **{m: cols[m][i] for m in metrics})
+            for i in lttb(times, cols[metric], buckets)
+        ]
+    return summary
@@ -1,442 +1,827 @@
 import os
+import time
+import asyncio
 import logging
-from typing import Literal, Optional
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 from mcp.server.fastmcp import FastMCP
-from src.client import ProxmoxClient
+from src.lazy import LazyClient
+from src.settings import load_env
+from src.pagination import SnapshotPager
+from src.query import build_query
+from src.output import render
+from src.rrd import summarize
+from src.history import TIMEFRAMES, HistoryCollector, get_history_store
+from src.top import top_consumers as top_consumers_of
+from src.fleet import check_query, select_fleet, fleet_summary
+from src.forecast import capacity_targets, capacity_forecasts
+from src.anomaly import AnomalyDetector, detect_from_rrd, annotate
+from src.batch import run_batch
+from src.metrics import TOOL_DURATION, ERRORS, track, watch_client, start_http_server
 
-# Configuration du Logging
 LOG_DIR = "logs"
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(LOG_DIR, "mcp_audit.log"))
-    ]
-)
 logger = logging.getLogger("mcp-proxmox")
 
+def setup_logging():
+    """
+    Sends the logs to stderr and to the audit file (logs/mcp_audit.log).
+
+    Called by main() only, so that importing the module (tests, benchmarks,
+    other entry points) neither creates the directory nor writes to the file.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(os.path.join(LOG_DIR, "mcp_audit.log"))
+        ]
+    )
+
+@asynccontextmanager
+async def lifespan(server):
+    """
+    Runs the optional history/anomaly collector and the optional /metrics
+    sidecar (PROXMOX_METRICS_PORT) for as long as the MCP server is up.
+    """
+    if collector:
+        # The SQLite history is opened here rather than at import
+        collector.store = get_history_store()
+        collector.start()
+    metrics_server = start_http_server()
+    try:
+        yield
+    finally:
+        if collector:
+            await collector.stop()
+        if metrics_server:
+            metrics_server.shutdown()
+
+# Réponse de tous les outils quand le client Proxmox n'a pas pu être construit (panne, configuration)
+NOT_CONFIGURED = "Client Proxmox non configuré."
+
+def _tool_error(text):
+    """
+    Classifies a tool's text reply.
+
+    Returns:
+        str | None: Error label for proxmox_errors_total ('ClientUnavailable'
+        for NOT_CONFIGURED, 'ToolError' for a reply starting with "Erreur"),
+        None for a successful reply.
+    """
+    if text == NOT_CONFIGURED:
+        return 'ClientUnavailable'
+    if text.startswith("Erreur"):
+        return 'ToolError'
+    return None
+
+class InstrumentedMCP(FastMCP):
+    """FastMCP recording the latency and outcome of every tool call (see src/metrics.py)."""
+
+    async def call_tool(self, name, arguments):
+        with track('tool', TOOL_DURATION, tool=name) as outcome:
+            result = await super().call_tool(name, arguments)
+            # Tools report failures as a text reply rather than an exception
+            blocks = result[0] if isinstance(result, tuple) else result
+            text = getattr(blocks[0], 'text', '') if isinstance(blocks, list) and blocks else ''
+            error = _tool_error(text)
+            if error:
+                outcome['status'] = 'error'
+                ERRORS.inc(side='tool', error=error)
+            return result
+
 # Initialisation du serveur MCP
-mcp = FastMCP("Proxmox Manager")
+mcp = InstrumentedMCP("Proxmox Manager", lifespan=lifespan)
+
+# Variables du fichier .env, avant toute lecture de la configuration
+load_env()
+
+def _connect():
+    """Builds the shared Proxmox client (httpx is only imported here, on first use)."""
+    from src.async_client import get_async_client
+    client = get_async_client()
+    watch_client(client)
+    return client
+
+# Client Proxmox construit au premier appel d'outil (et reconstruit plus tard en cas d'échec),
+# pour que le lancement du serveur stdio ne paie ni la configuration ni les imports du client
+proxmox = LazyClient(_connect)
+
+# Instantanés d'inventaire servant la pagination de list_machines
+pager = SnapshotPager()
+
+# Historique local optionnel (PROXMOX_HISTORY_DB) et détection d'anomalies, alimentés en tâche de fond ;
+# la base SQLite n'est ouverte qu'au démarrage du collecteur ou au premier appel d'outil
+detector = AnomalyDetector()
+watch = bool(os.getenv("PROXMOX_HISTORY_DB")) or os.getenv("PROXMOX_ANOMALY_WATCH", "false").lower() == "true"
+collector = HistoryCollector(proxmox, detector=detector) if watch else None
+
+def _format_failures(failures):
+    """Renders the nodes skipped by a cluster-wide fan-out as a warning block."""
+    if not failures:
+        return ""
+    lines = ["", "⚠️ Résultats partiels, nœuds non joignables :"]
+    lines.extend(f"  - {f['node']} ({f['resource']}) : {f['reason']} - {f['error']}" for f in failures)
+    return "\n".join(lines) + "\n"
+
+def _task_line(upid):
+    """Points the agent to the task started by a command so it can wait for it."""
+    if isinstance(upid, str) and upid.startswith('UPID:'):
+        return f"\nTâche : {upid} (suivi avec wait_for_task)"
+    return ""
+
+def _reply(message, **fields):
+    """
+    Answer of an action tool: the message in text mode, or the message with
+    the fields (vmid, node, upid...) as structured content in json mode.
+    """
+    return render(dict(fields, message=message), lambda d: d['message'] + _task_line(d.get('upid')))
+
+def _format_task(task):
+    """Renders a task record returned by get_task_status / wait_for_task."""
+    lines = [f"Tâche {task['type']} ({task['id'] or '-'}) sur {task['node']} par {task['user']} :"]
+    if task.get('timed_out'):
+        lines.insert(0, f"Délai de {task['timeout']}s dépassé, la tâche est toujours en cours.")
+    if task['status'] == 'running':
+        lines.append(f"  - 🔄 En cours depuis {int(time.time()) - task['starttime']}s")
+    else:
+        icon = "✅" if task['success'] else "❌"
+        lines.append(f"  - {icon} Terminée : {task['exitstatus']} | Durée : {task['duration']}s")
+    return "\n".join(lines) + "\n"
+
+def _format_bulk(data):
+    """Renders the per-guest table of a bulk power action."""
+    results = data['results']
+    if not results and not data['failures']: return "Aucune machine ne correspond à la sélection."
+    ok = sum(1 for r in results if r['status'] == 'ok')
+    lines = [f"{data['label']} : {ok}/{len(results)} commande(s) envoyée(s)"]
+    for r in results:
+        target = f"{r['vmid']} ({r['name']}) sur {r['node']}" if r['node'] else str(r['vmid'])
+        if r['status'] == 'unknown':
+            lines.append(f"  - ❓ {target} : {r['error']}")
+        elif r['error']:
+            lines.append(f"  - ❌ {target} : {r['error']}")
+        else:
+            lines.append(f"  - ✅ {target} via {r['via']} | Tâche : {r['upid']}")
+    return "\n".join(lines) + "\n" + _format_failures(data['failures'])
+
+_BATCH_ICONS = {'ok': "✅", 'error': "❌", 'skipped': "⏭️", 'timeout': "⏳"}
+
+def _format_batch(data):
+    """Renders the per-operation results of a batch."""
+    results = data['results']
+    ok = sum(1 for r in results if r['status'] == 'ok')
+    lines = [f"Lot de {len(results)} opération(s) : {ok} réussie(s)"]
+    for r in results:
+        target = f"{r['vmid']} sur {r['node']}" if r['node'] else str(r['vmid'])
+        line = f"  - {_BATCH_ICONS[r['status']]} [{r['id']}] {r['action']} {target}"
+        if r['error']:
+            line += f" : {r['error']}"
+        elif r['upid']:
+            line += f" | Tâche : {r['upid']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+async def _bulk_power(action, label, vmids, tag, name_pattern, use_node_endpoints=True, output=None):
+    """Runs a bulk power action and returns one record per guest."""
+    results = await proxmox.bulk_set_machine_state(action, vmids, tag, name_pattern, use_node_endpoints)
+    data = {'action': action, 'label': label, 'results': list(results), 'failures': results.failures}
+    return render(data, _format_bulk, output)
+
 
-# Initialisation du client Proxmox
-try:
-    proxmox = ProxmoxClient()
-    logger.info("Client Proxmox initialisé avec succès.")
-except Exception as e:
-    logger.error(f"Erreur d'initialisation du client Proxmox: {e}")
-    proxmox = None
+async def _locate(vmid, node=None, machine_type=None):
+    """Fills in the node and type the caller omitted from the vmid location index."""
+    if node and machine_type:
+        return node, machine_type
+    located_node, located_type = await proxmox.locate(vmid)
+    return node or located_node, machine_type or located_type
 
 @mcp.tool()
-def list_infrastructure():
+async def list_infrastructure(output: Optional[Literal['text', 'json']] = None):
     """
     Lists all nodes in the Proxmox cluster with their CPU and RAM usage.
-    
+
+    Args:
+        output (str, optional): 'text' (default) or 'json' for structured records.
+
     Returns:
         str: A formatted string summarizing the infrastructure status.
     """
     logger.info("Tool called: list_infrastructure")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        nodes = proxmox.get_nodes()
-        result = "Infrastucture Proxmox :\n"
-        for n in nodes:
-            # Check node status first
-            status = n.get('status', 'unknown')
-            if status != 'online':
-                result += f"- Nœud: {n['node']} | Statut: {status} (Hors ligne)\n"
-                continue
-                
-            cpu = n.get('cpu', 0) * 100
-            ram = (n.get('mem', 0) / n.get('maxmem', 1)) * 100
-            result += f"- Nœud: {n['node']} | Statut: {status} | CPU: {cpu:.1f}% | RAM: {ram:.1f}%\n"
-        return result
+        nodes = await proxmox.get_nodes()
+        data = [{'node': n['node'], 'status': n.get('status', 'unknown'), 'cpu': n.get('cpu', 0),
+                 'mem': n.get('mem', 0), 'maxmem': n.get('maxmem', 0)} for n in nodes]
+        return render(data, _format_infrastructure, output)
     except Exception as e:
         logger.error(f"Error in list_infrastructure: {e}")
         return f"Erreur lors de la récupération de l'infrastructure : {e}"
 
+def _format_infrastructure(nodes):
+    lines = ["Infrastucture Proxmox :"]
+    for n in nodes:
+        # Check node status first
+        if n['status'] != 'online':
+            lines.append(f"- Nœud: {n['node']} | Statut: {n['status']} (Hors ligne)")
+            continue
+        ram = (n['mem'] / (n['maxmem'] or 1)) * 100
+        lines.append(f"- Nœud: {n['node']} | Statut: {n['status']} | CPU: {n['cpu'] * 100:.1f}% | RAM: {ram:.1f}%")
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def list_machines(name_filter: Optional[str] = None, status_filter: Optional[Literal['running', 'stopped']] = None, type_filter: Optional[Literal['qemu', 'lxc']] = None):
+async def list_machines(name_filter: Optional[str] = None, status_filter: Optional[Literal['running', 'stopped']] = None, type_filter: Optional[Literal['qemu', 'lxc']] = None, node: Optional[str] = None, tag: Optional[str] = None, where: Optional[List[str]] = None, fields: Optional[List[str]] = None, sort_by: str = 'vmid', limit: int = 100, cursor: Optional[str] = None, output: Optional[Literal['text', 'json']] = None):
     """
-    Lists all VMs and Containers (LXC) with optional filtering.
+    Lists all VMs and Containers (LXC) with optional filtering, one page at a time.
 
     Args:
         name_filter (str, optional): Filter by name substring (case-insensitive).
         status_filter (str, optional): Filter by status ('running' or 'stopped').
         type_filter (str, optional): Filter by type ('qemu' or 'lxc').
+        node (str, optional): Only machines on this node.
+        tag (str, optional): Only machines carrying this tag.
+        where (list[str], optional): Extra conditions, all required, e.g. ['mem>4G', 'cpu>=50%', 'name~web', 'tag!=dev'].
+                                     Operators: = != > >= < <= on numbers (K/M/G/T and % suffixes), = != ~ (contains) on text.
+        fields (list[str], optional): Columns to return (default vmid, name, type, status, node; ['*'] for every column), among
+                                      vmid, name, node, type, status, tags, cpu, maxcpu, mem, maxmem, disk, maxdisk, uptime...
+        sort_by (str): Sort key: 'vmid' (default), 'name', 'node', 'status', 'type', 'cpu', 'mem',
+                       'maxmem', 'uptime', 'disk'... Prefix with '-' for descending order (e.g., '-mem').
+        limit (int): Maximum number of machines per page (default 100).
+        cursor (str, optional): Cursor returned by the previous page, with the same filters and sort.
+        output (str, optional): 'text' (default) or 'json' for structured records.
 
     Returns:
         str: A formatted list of machines matching the criteria.
     """
-    logger.info(f"Tool called: list_machines(name={name_filter}, status={status_filter}, type={type_filter})")
-    if not proxmox: return "Client Proxmox non configuré."
-    try:
-        machines = proxmox.get_all_machines()
-        if not machines:
-            return "Aucune machine trouvée."
-        
-        # Application des filtres
-        if name_filter:
-            machines = [m for m in machines if name_filter.lower() in m.get('name', '').lower()]
-        if status_filter:
-            machines = [m for m in machines if m.get('status') == status_filter.lower()]
-        if type_filter:
-            machines = [m for m in machines if m.get('type') == type_filter.lower()]
-
-        if not machines:
-            return "Aucune machine ne correspond aux filtres."
-
-        result = f"Liste des machines ({len(machines)}) :\n"
-        for m in machines:
-            vmid = m.get('vmid')
-            name = m.get('name')
-            status = m.get('status')
-            node = m.get('node')
-            m_type = m.get('type')
-            result += f"[{m_type.upper()}] ID: {vmid} | Nom: {name} | Statut: {status} | Nœud: {node}\n"
-        return result
+    logger.info(f"Tool called: list_machines(name={name_filter}, status={status_filter}, type={type_filter}, node={node}, tag={tag}, where={where}, fields={fields}, sort={sort_by}, limit={limit}, cursor={cursor})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        query = build_query(where, fields or _MACHINE_FIELDS, sort_by, name_filter, status_filter, type_filter, node, tag)
+        selected, machines_failures = None, []
+        if not cursor:
+            machines = await proxmox.get_all_machines()
+            machines_failures = machines.failures
+            selected = query.select(machines)
+
+        page = pager.page(limit, cursor, query.key, selected)
+        data = {
+            'machines': query.project(page.items),
+            'fields': list(query.fields) if query.fields else None,
+            'total': page.total,
+            'offset': page.offset,
+            'next_cursor': page.next_cursor,
+            'filtered': bool(query.where),
+            'failures': machines_failures,
+        }
+        return render(data, _format_machines, output)
     except Exception as e:
         logger.error(f"Error in list_machines: {e}")
         return f"Erreur lors de la récupération des machines : {e}"
 
+# Default columns of list_machines (and of its summary line)
+_MACHINE_FIELDS = ('vmid', 'name', 'type', 'status', 'node')
+
+def _format_machines(data):
+    machines = data['machines']
+    if not machines:
+        message = "Aucune machine ne correspond aux filtres." if data['filtered'] else "Aucune machine trouvée."
+        return message + _format_failures(data['failures'])
+    if data['total'] > len(machines):
+        lines = [f"Liste des machines ({data['offset'] + 1}-{data['offset'] + len(machines)} sur {data['total']}) :"]
+    else:
+        lines = [f"Liste des machines ({data['total']}) :"]
+    fields = data['fields'] or _MACHINE_FIELDS
+    summary = all(f in fields for f in _MACHINE_FIELDS)
+    # Columns picked by the caller beyond the usual summary, in their order
+    extra = [f for f in fields if f not in _MACHINE_FIELDS] if summary else fields
+    for m in machines:
+        line = f"[{m['type'].upper()}] ID: {m['vmid']} | Nom: {m['name']} | Statut: {m['status']} | Nœud: {m['node']}" if summary else ""
+        columns = " | ".join(f"{f}: {m[f]}" for f in extra)
+        lines.append(" | ".join(p for p in (line, columns) if p))
+    if data['next_cursor']:
+        lines.append(f"\nPage suivante : list_machines(cursor='{data['next_cursor']}') avec les mêmes filtres et tri.")
+    return "\n".join(lines) + "\n" + _format_failures(data['failures'])
+
 @mcp.tool()
-def list_storage(content_filter: Optional[str] = None):
+async def list_storage(content_filter: Optional[str] = None, output: Optional[Literal['text', 'json']] = None):
     """
     Displays the storage status for all nodes.
 
     Args:
         content_filter (str, optional): Filter by content type (e.g., 'iso', 'backup', 'images').
-    
+        output (str, optional): 'text' (default) or 'json' for structured records.
+
     Returns:
         str: A formatted string showing used/total space and capabilities for each storage.
     """
     logger.info(f"Tool called: list_storage(filter={content_filter})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        nodes = proxmox.get_nodes()
-        result = "État des stockages :\n"
+        nodes = await proxmox.get_nodes()
+        online = [n['node'] for n in nodes if n.get('status') == 'online']
+        storages = await proxmox.get_all_storage(online)
+        by_node = {}
+        for s in storages:
+            by_node.setdefault(s['node'], []).append(s)
+        failures = {f['node']: f for f in storages.failures}
+
+        data = {'content_filter': content_filter, 'nodes': []}
         for n in nodes:
             node_name = n['node']
-            if n.get('status') != 'online':
-                result += f"\nNœud: {node_name} (Hors ligne - Stockage inaccessible)\n"
-                continue
-
-            result += f"\nNœud: {node_name}\n"
-            try:
-                storages = proxmox.get_storage_status(node_name)
-                found_on_node = False
-                for s in storages:
-                    if s.get('active'):
-                        content = s.get('content', '')
-                        
-                        # Application du filtre
-                        if content_filter and content_filter.lower() not in content.lower():
-                            continue
-                            
-                        found_on_node = True
-                        used = (s.get('used', 0) / s.get('total', 1)) * 100
-                        free_gb = s.get('avail', 0) / (1024**3)
-                        shared = " (Partagé)" if s.get('shared') else ""
-                        result += f"  - {s['storage']} ({s['type']}){shared} : {used:.1f}% utilisé ({free_gb:.1f} GB libres) | Contenu: {content}\n"
-                
-                if not found_on_node and content_filter:
-                    result += f"  - Aucun stockage avec le contenu '{content_filter}' trouvé sur ce nœud.\n"
-            except Exception as e:
-                logger.warning(f"Impossible de lire le stockage sur {node_name}: {e}")
-                result += f"  - Erreur de lecture stockage: {e}\n"
-        return result
+            entry = {'node': node_name, 'status': n.get('status'), 'error': None, 'storages': []}
+            data['nodes'].append(entry)
+            if node_name in failures:
+                failure = failures[node_name]
+                entry['error'] = {'reason': failure['reason'], 'message': failure['error']}
+            for s in by_node.get(node_name, []):
+                if not s.get('active'):
+                    continue
+                content = s.get('content', '')
+                # Application du filtre
+                if content_filter and content_filter.lower() not in content.lower():
+                    continue
+                entry['storages'].append({
+                    'storage': s['storage'], 'type': s['type'], 'shared': bool(s.get('shared')), 'content': content,
+                    'used': s.get('used', 0), 'total': s.get('total', 0), 'avail': s.get('avail', 0),
+                })
+        return render(data, _format_storage, output)
     except Exception as e:
         logger.error(f"Error in list_storage: {e}")
         return f"Erreur lors de la récupération des stockages : {e}"
 
+def _format_storage(data):
+    lines = ["État des stockages :"]
+    for n in data['nodes']:
+        if n['status'] != 'online':
+            lines.append(f"\nNœud: {n['node']} (Hors ligne - Stockage inaccessible)")
+            continue
+        lines.append(f"\nNœud: {n['node']}")
+        if n['error']:
+            lines.append(f"  - Erreur de lecture stockage ({n['error']['reason']}): {n['error']['message']}")
+            continue
+        for s in n['storages']:
+            used = (s['used'] / (s['total'] or 1)) * 100
+            free_gb = s['avail'] / (1024**3)
+            shared = " (Partagé)" if s['shared'] else ""
+            lines.append(f"  - {s['storage']} ({s['type']}){shared} : {used:.1f}% utilisé ({free_gb:.1f} GB libres) | Contenu: {s['content']}")
+        if not n['storages'] and data['content_filter']:
+            lines.append(f"  - Aucun stockage avec le contenu '{data['content_filter']}' trouvé sur ce nœud.")
+    return "\n".join(lines) + "\n"
+
+@mcp.tool()
+async def top_consumers(metric: Literal['cpu', 'mem', 'mem_ratio', 'diskread', 'diskwrite', 'netin', 'netout'] = 'cpu', limit: int = 10, node: Optional[str] = None, tag: Optional[str] = None, output: Optional[Literal['text', 'json']] = None):
+    """
+    Lists the running guests consuming the most of a resource right now, cluster-wide, in one call.
+
+    Args:
+        metric (str): 'cpu' (default), 'mem' (bytes), 'mem_ratio' (mem / maxmem),
+                      'diskread', 'diskwrite', 'netin' or 'netout' (bytes/s).
+        limit (int): Number of guests to return (default 10).
+        node (str, optional): Only guests on this node.
+        tag (str, optional): Only guests carrying this tag.
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: top_consumers(metric={metric}, limit={limit}, node={node}, tag={tag})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        machines = await proxmox.get_all_machines()
+        previous = collector.counters() if collector else None
+        data = {
+            'metric': metric,
+            'machines': top_consumers_of(machines, metric, limit, node, tag, previous),
+            'failures': machines.failures,
+        }
+        return render(data, _format_top, output)
+    except Exception as e:
+        logger.error(f"Error in top_consumers: {e}")
+        return f"Erreur lors du classement des machines : {e}"
+
+def _format_top(data):
+    if not data['machines']: return "Aucune machine en cours d'exécution ne correspond." + _format_failures(data['failures'])
+    metric = data['metric']
+    lines = [f"Top {len(data['machines'])} des machines par {metric} :"]
+    for rank, m in enumerate(data['machines'], 1):
+        if metric == 'mem_ratio':
+            value = f"{m['value'] * 100:.1f}%"
+        elif metric == 'mem':
+            value = f"{m['value'] / (1024**3):.2f} GB"
+        else:
+            value = _fmt_metric(metric, m['value'])
+        lines.append(f"  {rank}. {m['vmid']} ({m['name']}) sur {m['node']} : {value}")
+    return "\n".join(lines) + "\n" + _format_failures(data['failures'])
+
 @mcp.tool()
-def start_machine(vmid: int, node: str, type: Literal['qemu', 'lxc']):
+async def start_machine(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None):
     """
     Starts a specific machine.
 
     Args:
         vmid (int): Machine ID (e.g., 100).
-        node (str): Node name (e.g., 'pve').
-        type (str): 'qemu' (VM) or 'lxc' (Container).
+        node (str, optional): Node name (e.g., 'pve'). Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' (VM) or 'lxc' (Container). Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: start_machine(vmid={vmid}, node={node}, type={type})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
     
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.set_machine_state(node, vmid, type, 'start')
-        return f"Commande de démarrage envoyée pour la machine {vmid} ({type}) sur le nœud {node}."
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.set_machine_state(node, vmid, type, 'start')
+        return _reply(f"Commande de démarrage envoyée pour la machine {vmid} ({type}) sur le nœud {node}.", vmid=vmid, node=node, type=type, upid=upid)
     except Exception as e:
         logger.error(f"Error in start_machine: {e}")
         return f"Erreur lors du démarrage : {e}"
 
 @mcp.tool()
-def stop_machine(vmid: int, node: str, type: Literal['qemu', 'lxc'], force: bool = False):
+async def stop_machine(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, force: bool = False):
     """
     Stops a specific machine.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
         force (bool): If True, forces a hard stop. If False (default), attempts a graceful shutdown.
     """
     logger.info(f"Tool called: stop_machine(vmid={vmid}, node={node}, type={type}, force={force})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
 
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     action = 'stop' if force else 'shutdown'
     try:
-        proxmox.set_machine_state(node, vmid, type, action)
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.set_machine_state(node, vmid, type, action)
         mode = "forcé" if force else "propre"
-        return f"Commande d'arrêt {mode} envoyée pour la machine {vmid} ({type}) sur le nœud {node}."
+        return _reply(f"Commande d'arrêt {mode} envoyée pour la machine {vmid} ({type}) sur le nœud {node}.", vmid=vmid, node=node, type=type, force=force, upid=upid)
     except Exception as e:
         logger.error(f"Error in stop_machine: {e}")
         return f"Erreur lors de l'arrêt : {e}"
 
 @mcp.tool()
-def reboot_machine(vmid: int, node: str, type: Literal['qemu', 'lxc']):
+async def reboot_machine(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None):
     """
     Reboots a specific machine.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: reboot_machine(vmid={vmid}, node={node}, type={type})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
 
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.set_machine_state(node, vmid, type, 'reboot')
-        return f"Commande de redémarrage envoyée pour la machine {vmid} ({type}) sur le nœud {node}."
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.set_machine_state(node, vmid, type, 'reboot')
+        return _reply(f"Commande de redémarrage envoyée pour la machine {vmid} ({type}) sur le nœud {node}.", vmid=vmid, node=node, type=type, upid=upid)
     except Exception as e:
         logger.error(f"Error in reboot_machine: {e}")
         return f"Erreur lors du redémarrage : {e}"
 
 @mcp.tool()
-def get_machine_config(vmid: int, node: str, type: Literal['qemu', 'lxc']):
+async def bulk_start_machines(vmids: Optional[List[int]] = None, tag: Optional[str] = None, name_pattern: Optional[str] = None, use_node_endpoints: bool = True, output: Optional[Literal['text', 'json']] = None):
+    """
+    Starts many machines at once, selected by ID list, tag and/or name pattern.
+    Commands run concurrently (bounded per node); a node whose every guest is
+    selected is started with a single 'startall' task.
+
+    Args:
+        vmids (list[int], optional): Machine IDs (e.g., [100, 101]).
+        tag (str, optional): Only machines carrying this tag (e.g., 'prod').
+        name_pattern (str, optional): Shell-style name pattern (e.g., 'web-*').
+        use_node_endpoints (bool): Allow node-level 'startall' for whole nodes (default True).
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: bulk_start_machines(vmids={vmids}, tag={tag}, name_pattern={name_pattern})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        return await _bulk_power('start', "Démarrage groupé", vmids, tag, name_pattern, use_node_endpoints, output)
+    except Exception as e:
+        logger.error(f"Error in bulk_start_machines: {e}")
+        return f"Erreur lors du démarrage groupé : {e}"
+
+@mcp.tool()
+async def bulk_stop_machines(vmids: Optional[List[int]] = None, tag: Optional[str] = None, name_pattern: Optional[str] = None, force: bool = False, use_node_endpoints: bool = True, output: Optional[Literal['text', 'json']] = None):
+    """
+    Stops many machines at once, selected by ID list, tag and/or name pattern.
+    Commands run concurrently (bounded per node); for a graceful shutdown, a node
+    whose every guest is selected is handled with a single 'stopall' task.
+
+    Args:
+        vmids (list[int], optional): Machine IDs (e.g., [100, 101]).
+        tag (str, optional): Only machines carrying this tag (e.g., 'dev').
+        name_pattern (str, optional): Shell-style name pattern (e.g., 'test-*').
+        force (bool): If True, forces a hard stop. If False (default), attempts a graceful shutdown.
+        use_node_endpoints (bool): Allow node-level 'stopall' for whole nodes (default True).
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: bulk_stop_machines(vmids={vmids}, tag={tag}, name_pattern={name_pattern}, force={force})")
+    if not proxmox: return NOT_CONFIGURED
+    action = 'stop' if force else 'shutdown'
+    try:
+        mode = "forcé" if force else "propre"
+        return await _bulk_power(action, f"Arrêt {mode} groupé", vmids, tag, name_pattern, use_node_endpoints, output)
+    except Exception as e:
+        logger.error(f"Error in bulk_stop_machines: {e}")
+        return f"Erreur lors de l'arrêt groupé : {e}"
+
+@mcp.tool()
+async def bulk_reboot_machines(vmids: Optional[List[int]] = None, tag: Optional[str] = None, name_pattern: Optional[str] = None, output: Optional[Literal['text', 'json']] = None):
+    """
+    Reboots many machines at once, selected by ID list, tag and/or name pattern.
+
+    Args:
+        vmids (list[int], optional): Machine IDs (e.g., [100, 101]).
+        tag (str, optional): Only machines carrying this tag.
+        name_pattern (str, optional): Shell-style name pattern (e.g., 'web-*').
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: bulk_reboot_machines(vmids={vmids}, tag={tag}, name_pattern={name_pattern})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        return await _bulk_power('reboot', "Redémarrage groupé", vmids, tag, name_pattern, output=output)
+    except Exception as e:
+        logger.error(f"Error in bulk_reboot_machines: {e}")
+        return f"Erreur lors du redémarrage groupé : {e}"
+
+@mcp.tool()
+async def run_batch_operations(operations: List[dict], wait: bool = False, timeout: int = 300, output: Optional[Literal['text', 'json']] = None):
+    """
+    Runs many operations of different kinds in one call, concurrently
+    (bounded per node), e.g. snapshot several machines then back them up.
+
+    Each operation is {"action": ..., "params": {...}, "id": ..., "depends_on": [...]}:
+      - action: 'start', 'stop', 'reboot', 'snapshot', 'rollback', 'clone', 'backup' or 'resize'.
+      - params: vmid plus the action's fields (node/type resolved from the vmid if omitted):
+        stop: force; snapshot: snapname, description; rollback: snapname;
+        clone: newid, name, target_node; backup: storage, mode; resize: cores, memory_mb.
+      - id (optional): name referenced by depends_on (defaults to the position, '0', '1'...).
+      - depends_on (optional): ids whose task must succeed first; otherwise the operation is skipped.
+
+    Args:
+        operations (list[dict]): The operations, as described above.
+        wait (bool): Wait for every task to finish (default False: only those others depend on).
+        timeout (int): Maximum wait per task in seconds (default 300).
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: run_batch_operations({len(operations)} operations, wait={wait})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        results = await run_batch(proxmox, operations, wait, timeout)
+        return render({'results': results}, _format_batch, output)
+    except Exception as e:
+        logger.error(f"Error in run_batch_operations: {e}")
+        return f"Erreur lors de l'exécution du lot : {e}"
+
+@mcp.tool()
+async def get_machine_config(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, output: Optional[Literal['text', 'json']] = None):
     """
     Retrieves the detailed configuration (CPU, RAM, Disks, etc.) of a machine.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: get_machine_config(vmid={vmid}, node={node}, type={type})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
 
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        config = proxmox.get_machine_config(node, vmid, type)
-        result = f"Configuration de la machine {vmid} ({type}) :\n"
-        for key, value in config.items():
-            result += f"  - {key}: {value}\n"
-        return result
+        node, type = await _locate(vmid, node, type)
+        config = await proxmox.get_machine_config(node, vmid, type)
+        data = {'vmid': vmid, 'node': node, 'type': type, 'config': config}
+        return render(data, _format_config, output)
     except Exception as e:
         logger.error(f"Error in get_machine_config: {e}")
         return f"Erreur lors de la récupération de la config : {e}"
 
+def _format_config(data):
+    lines = [f"Configuration de la machine {data['vmid']} ({data['type']}) :"]
+    lines.extend(f"  - {key}: {value}" for key, value in data['config'].items())
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def list_snapshots(vmid: int, node: str, type: Literal['qemu', 'lxc']):
+async def list_snapshots(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, output: Optional[Literal['text', 'json']] = None):
     """
     Lists available snapshots for a machine.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: list_snapshots(vmid={vmid}, node={node}, type={type})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
 
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        snaps = proxmox.list_snapshots(node, vmid, type)
-        if not snaps: return "Aucun snapshot trouvé."
-        result = f"Snapshots pour la machine {vmid} :\n"
-        for s in snaps:
-            desc = s.get('description', 'Sans description')
-            result += f"  - {s['name']} (Date: {s.get('snaptime', 'Inconnue')}) | {desc}\n"
-        return result
+        node, type = await _locate(vmid, node, type)
+        snaps = await proxmox.list_snapshots(node, vmid, type)
+        data = {'vmid': vmid, 'node': node, 'snapshots': [
+            {'name': s['name'], 'snaptime': s.get('snaptime'), 'description': s.get('description')} for s in snaps or []
+        ]}
+        return render(data, _format_snapshots, output)
     except Exception as e:
         logger.error(f"Error in list_snapshots: {e}")
         return f"Erreur lors de la récupération des snapshots : {e}"
 
+def _format_snapshots(data):
+    if not data['snapshots']: return "Aucun snapshot trouvé."
+    lines = [f"Snapshots pour la machine {data['vmid']} :"]
+    for s in data['snapshots']:
+        lines.append(f"  - {s['name']} (Date: {s['snaptime'] or 'Inconnue'}) | {s['description'] or 'Sans description'}")
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def create_snapshot(vmid: int, node: str, type: Literal['qemu', 'lxc'], snapname: str, description: str = None):
+async def create_snapshot(vmid: int, snapname: str, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, description: str = None):
     """
     Creates a snapshot for a machine.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
         snapname (str): Name of the snapshot (no spaces recommended).
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
         description (str, optional): Short description.
     """
     logger.info(f"Tool called: create_snapshot(vmid={vmid}, node={node}, name={snapname})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
 
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.create_snapshot(node, vmid, type, snapname, description)
-        return f"Snapshot '{snapname}' en cours de création pour la machine {vmid}."
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.create_snapshot(node, vmid, type, snapname, description)
+        return _reply(f"Snapshot '{snapname}' en cours de création pour la machine {vmid}.", vmid=vmid, node=node, snapname=snapname, upid=upid)
     except Exception as e:
         logger.error(f"Error in create_snapshot: {e}")
         return f"Erreur lors de la création du snapshot : {e}"
 
 @mcp.tool()
-def rollback_snapshot(vmid: int, node: str, type: Literal['qemu', 'lxc'], snapname: str):
+async def rollback_snapshot(vmid: int, snapname: str, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None):
     """
     Rolls back a machine to a previous snapshot.
     WARNING: Current state will be lost.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
         snapname (str): Name of the snapshot to restore.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: rollback_snapshot(vmid={vmid}, node={node}, name={snapname})")
     if vmid < 100: return "Erreur: L'ID de la machine doit être >= 100."
 
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.rollback_snapshot(node, vmid, type, snapname)
-        return f"Restauration du snapshot '{snapname}' lancée pour la machine {vmid}."
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.rollback_snapshot(node, vmid, type, snapname)
+        return _reply(f"Restauration du snapshot '{snapname}' lancée pour la machine {vmid}.", vmid=vmid, node=node, snapname=snapname, upid=upid)
     except Exception as e:
         logger.error(f"Error in rollback_snapshot: {e}")
         return f"Erreur lors de la restauration : {e}"
 
 @mcp.tool()
-def clone_machine(vmid: int, node: str, type: Literal['qemu', 'lxc'], newid: int, name: str, target_node: Optional[str] = None):
+async def clone_machine(vmid: int, newid: int, name: str, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, target_node: Optional[str] = None):
     """
     Clones a machine (usually a template) to create a new one.
 
     Args:
         vmid (int): ID of the source machine/template.
-        node (str): Node where the source machine is located.
-        type (str): 'qemu' or 'lxc'.
         newid (int): ID for the new machine (must be unique and > 100).
         name (str): Name for the new machine.
+        node (str, optional): Node where the source machine is located. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
         target_node (str, optional): Target node for the new machine (if different).
     """
     logger.info(f"Tool called: clone_machine(source={vmid}, newid={newid}, name={name})")
     if vmid < 100 or newid < 100: return "Erreur: Les IDs doivent être >= 100."
     
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.clone_machine(node, vmid, newid, name, type, target_node)
-        return f"Clonage de {vmid} vers {newid} ({name}) lancé avec succès."
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.clone_machine(node, vmid, newid, name, type, target_node)
+        return _reply(f"Clonage de {vmid} vers {newid} ({name}) lancé avec succès.", vmid=vmid, newid=newid, node=node, upid=upid)
     except Exception as e:
         logger.error(f"Error in clone_machine: {e}")
         return f"Erreur lors du clonage : {e}"
 
 @mcp.tool()
-def get_vm_agent_network(vmid: int, node: str):
+async def get_vm_agent_network(vmid: int, node: Optional[str] = None, output: Optional[Literal['text', 'json']] = None):
     """
     Retrieves internal network information (IP addresses) from a VM.
     Requires QEMU Guest Agent to be installed and enabled.
 
     Args:
         vmid (int): VM ID.
-        node (str): Node name.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: get_vm_agent_network(vmid={vmid}, node={node})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        data = proxmox.get_vm_agent_network(node, vmid)
+        if not node: node, _ = await proxmox.locate(vmid)
+        data = await proxmox.get_vm_agent_network(node, vmid)
         if not data: return "Aucune donnée réseau reçue (l'agent est-il activé ?)."
-        
-        result = f"Interfaces réseau internes pour VM {vmid} :\n"
-        for interface in data.get('result', []):
-            name = interface.get('name')
-            ips = [addr.get('ip-address') for addr in interface.get('ip-addresses', [])]
-            result += f"  - {name}: {', '.join(ips)}\n"
-        return result
+
+        interfaces = [
+            {'name': i.get('name'), 'ips': [addr.get('ip-address') for addr in i.get('ip-addresses', [])]}
+            for i in data.get('result', [])
+        ]
+        return render({'vmid': vmid, 'node': node, 'interfaces': interfaces}, _format_agent_network, output)
     except Exception as e:
         logger.error(f"Error in get_vm_agent_network: {e}")
         return f"Erreur lors de la communication avec l'agent : {e}. Assurez-vous que l'agent QEMU est actif sur la VM."
 
+def _format_agent_network(data):
+    lines = [f"Interfaces réseau internes pour VM {data['vmid']} :"]
+    lines.extend(f"  - {i['name']}: {', '.join(i['ips'])}" for i in data['interfaces'])
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def list_backups(node: str, storage: str):
+async def list_backups(node: str, storage: str, output: Optional[Literal['text', 'json']] = None):
     """
     Lists backups available on a specific storage.
 
     Args:
         node (str): Node name.
         storage (str): Storage name (e.g., 'local', 'nas').
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: list_backups(node={node}, storage={storage})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        backups = proxmox.list_backups(node, storage)
-        if not backups: return f"Aucune sauvegarde trouvée sur {storage}."
-        
-        result = f"Sauvegardes sur {storage} ({len(backups)}) :\n"
-        for b in backups:
-            size_gb = b.get('size', 0) / (1024**3)
-            result += f"  - {b['volid']} ({size_gb:.2f} GB) | Date: {b.get('ctime', 'Inconnue')}\n"
-        return result
+        backups = await proxmox.list_backups(node, storage)
+        data = {'node': node, 'storage': storage, 'backups': [
+            {'volid': b['volid'], 'vmid': b.get('vmid'), 'size': b.get('size', 0), 'ctime': b.get('ctime')} for b in backups or []
+        ]}
+        return render(data, _format_backups, output)
     except Exception as e:
         logger.error(f"Error in list_backups: {e}")
         return f"Erreur lors de la récupération des sauvegardes : {e}"
 
+def _format_backups(data):
+    if not data['backups']: return f"Aucune sauvegarde trouvée sur {data['storage']}."
+    lines = [f"Sauvegardes sur {data['storage']} ({len(data['backups'])}) :"]
+    for b in data['backups']:
+        lines.append(f"  - {b['volid']} ({b['size'] / (1024**3):.2f} GB) | Date: {b['ctime'] or 'Inconnue'}")
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def create_backup(vmid: int, node: str, storage: str, mode: Literal['snapshot', 'suspend', 'stop'] = 'snapshot'):
+async def create_backup(vmid: int, storage: str, node: Optional[str] = None, mode: Literal['snapshot', 'suspend', 'stop'] = 'snapshot'):
     """
     Creates a new backup for a machine.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
         storage (str): Target storage for the backup.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
         mode (str): Backup mode ('snapshot' is default and recommended).
     """
     logger.info(f"Tool called: create_backup(vmid={vmid}, node={node}, storage={storage})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.create_backup(node, vmid, storage, mode)
-        return f"Tâche de sauvegarde lancée pour la machine {vmid} vers le stockage {storage}."
+        if not node: node, _ = await proxmox.locate(vmid)
+        upid = await proxmox.create_backup(node, vmid, storage, mode)
+        return _reply(f"Tâche de sauvegarde lancée pour la machine {vmid} vers le stockage {storage}.", vmid=vmid, node=node, storage=storage, upid=upid)
     except Exception as e:
         logger.error(f"Error in create_backup: {e}")
         return f"Erreur lors du lancement de la sauvegarde : {e}"
 
 @mcp.tool()
-def get_console_url(vmid: int, node: str, type: Literal['qemu', 'lxc']):
+async def get_console_url(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None):
     """
     Generates a direct link to the NoVNC console in the Proxmox Web UI.
     Requires the user to be logged into the Proxmox Web interface.
 
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: get_console_url(vmid={vmid}, node={node})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
+        node, type = await _locate(vmid, node, type)
         url = proxmox.get_console_url(node, vmid, type)
-        return f"Lien vers la console NoVNC pour la machine {vmid} :\n{url}"
+        return _reply(f"Lien vers la console NoVNC pour la machine {vmid} :\n{url}", vmid=vmid, node=node, url=url)
     except Exception as e:
         logger.error(f"Error in get_console_url: {e}")
         return f"Erreur lors de la génération du lien : {e}"
 
 @mcp.tool()
-def set_cloudinit_config(vmid: int, node: str, user: str = None, password: str = None, ssh_keys: str = None, ip_config: str = "ip=dhcp"):
+async def set_cloudinit_config(vmid: int, node: Optional[str] = None, user: str = None, password: str = None, ssh_keys: str = None, ip_config: str = "ip=dhcp"):
     """
     Configures Cloud-Init parameters for a VM.
     
     Args:
         vmid (int): VM ID.
-        node (str): Node name.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
         user (str, optional): Cloud-Init username.
         password (str, optional): Cloud-Init password.
         ssh_keys (str, optional): Public SSH key(s).
@@ -444,64 +829,68 @@ def set_cloudinit_config(vmid: int, node: str, user: str = None, password: str =
     """
     pwd_log = "****" if password else "None"
     logger.info(f"Tool called: set_cloudinit_config(vmid={vmid}, node={node}, user={user}, password={pwd_log})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.set_cloudinit_config(node, vmid, user, password, ssh_keys, ip_config)
-        return f"Configuration Cloud-Init appliquée pour la machine {vmid}. (Redémarrage nécessaire pour prise en compte)"
+        if not node: node, _ = await proxmox.locate(vmid)
+        await proxmox.set_cloudinit_config(node, vmid, user, password, ssh_keys, ip_config)
+        return _reply(f"Configuration Cloud-Init appliquée pour la machine {vmid}. (Redémarrage nécessaire pour prise en compte)", vmid=vmid, node=node)
     except Exception as e:
         logger.error(f"Error in set_cloudinit_config: {e}")
         return f"Erreur lors de la configuration Cloud-Init : {e}"
 
 @mcp.tool()
-def resize_resources(vmid: int, node: str, type: Literal['qemu', 'lxc'], cores: Optional[int] = None, memory_mb: Optional[int] = None):
+async def resize_resources(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, cores: Optional[int] = None, memory_mb: Optional[int] = None):
     """
     Adjusts the number of CPU cores and/or RAM of a machine.
     
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
         cores (int, optional): New number of CPU cores.
         memory_mb (int, optional): New RAM size in MB (e.g., 2048 for 2GB).
     """
     logger.info(f"Tool called: resize_resources(vmid={vmid}, node={node}, cores={cores}, mem={memory_mb})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.resize_machine_resources(node, vmid, type, cores, memory_mb)
+        node, type = await _locate(vmid, node, type)
+        await proxmox.resize_machine_resources(node, vmid, type, cores, memory_mb)
         changes = []
         if cores: changes.append(f"{cores} cœurs")
         if memory_mb: changes.append(f"{memory_mb} MB RAM")
-        return f"Ressources mises à jour pour la machine {vmid} : {', '.join(changes)}."
+        return _reply(f"Ressources mises à jour pour la machine {vmid} : {', '.join(changes)}.", vmid=vmid, node=node, cores=cores, memory_mb=memory_mb)
     except Exception as e:
         logger.error(f"Error in resize_resources: {e}")
         return f"Erreur lors du redimensionnement : {e}"
 
 @mcp.tool()
-def list_isos(node: str, storage: str):
+async def list_isos(node: str, storage: str, output: Optional[Literal['text', 'json']] = None):
     """
     Lists available ISO files on a storage.
     
     Args:
         node (str): Node name.
         storage (str): Storage ID (e.g., 'local').
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: list_isos(node={node}, storage={storage})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        isos = proxmox.list_isos(node, storage)
-        if not isos: return f"Aucun ISO trouvé sur {storage}."
-        
-        result = f"ISOs disponibles sur {storage} ({len(isos)}) :\n"
-        for iso in isos:
-            size_gb = iso.get('size', 0) / (1024**3)
-            result += f"  - {iso['volid']} ({size_gb:.2f} GB)\n"
-        return result
+        isos = await proxmox.list_isos(node, storage)
+        data = {'node': node, 'storage': storage, 'isos': [{'volid': i['volid'], 'size': i.get('size', 0)} for i in isos or []]}
+        return render(data, _format_isos, output)
     except Exception as e:
         logger.error(f"Error in list_isos: {e}")
         return f"Erreur lors de la récupération des ISOs : {e}"
 
+def _format_isos(data):
+    if not data['isos']: return f"Aucun ISO trouvé sur {data['storage']}."
+    lines = [f"ISOs disponibles sur {data['storage']} ({len(data['isos'])}) :"]
+    lines.extend(f"  - {iso['volid']} ({iso['size'] / (1024**3):.2f} GB)" for iso in data['isos'])
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def download_iso(node: str, storage: str, url: str, filename: str):
+async def download_iso(node: str, storage: str, url: str, filename: str):
     """
     Downloads an ISO file from a URL directly to Proxmox storage.
     
@@ -512,214 +901,430 @@ def download_iso(node: str, storage: str, url: str, filename: str):
         filename (str): Name of the file on disk (must end with .iso).
     """
     logger.info(f"Tool called: download_iso(node={node}, storage={storage}, url={url})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.download_iso(node, storage, url, filename)
-        return f"Téléchargement de '{filename}' lancé depuis {url} vers {storage}."
+        upid = await proxmox.download_iso(node, storage, url, filename)
+        return _reply(f"Téléchargement de '{filename}' lancé depuis {url} vers {storage}.", node=node, storage=storage, filename=filename, upid=upid)
     except Exception as e:
         logger.error(f"Error in download_iso: {e}")
         return f"Erreur lors du téléchargement : {e}"
 
 @mcp.tool()
-def list_firewall_rules(vmid: int, node: str, type: Literal['qemu', 'lxc']):
+async def list_firewall_rules(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, output: Optional[Literal['text', 'json']] = None):
     """
     Lists all firewall rules for a specific machine.
     
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: list_firewall_rules(vmid={vmid}, node={node})")
-    if not proxmox: return "Client Proxmox non configuré."
-    try:
-        rules = proxmox.get_firewall_rules(node, vmid, type)
-        if not rules: return f"Aucune règle de pare-feu trouvée pour la machine {vmid}."
-        
-        result = f"Règles Firewall pour {vmid} ({type}) :\n"
-        for r in rules:
-            status = "ON" if r.get('enable') else "OFF"
-            action = r.get('action')
-            direction = r.get('type') # 'in' or 'out'
-            proto = r.get('proto', 'any')
-            dport = r.get('dport', 'any')
-            result += f"  - [{status}] {direction.upper()} {action} | Proto: {proto} | Port: {dport}\n"
-        return result
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        node, type = await _locate(vmid, node, type)
+        rules = await proxmox.get_firewall_rules(node, vmid, type)
+        data = {'vmid': vmid, 'node': node, 'type': type, 'rules': [
+            {
+                'pos': r.get('pos'),
+                'enable': bool(r.get('enable')),
+                'direction': r.get('type'),  # 'in' or 'out'
+                'action': r.get('action'),
+                'proto': r.get('proto'),
+                'dport': r.get('dport'),
+            } for r in rules or []
+        ]}
+        return render(data, _format_firewall_rules, output)
     except Exception as e:
         logger.error(f"Error in list_firewall_rules: {e}")
         return f"Erreur lors de la récupération des règles : {e}"
 
+def _format_firewall_rules(data):
+    if not data['rules']: return f"Aucune règle de pare-feu trouvée pour la machine {data['vmid']}."
+    lines = [f"Règles Firewall pour {data['vmid']} ({data['type']}) :"]
+    for r in data['rules']:
+        status = "ON" if r['enable'] else "OFF"
+        lines.append(f"  - [{status}] {r['direction'].upper()} {r['action']} | Proto: {r['proto'] or 'any'} | Port: {r['dport'] or 'any'}")
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def add_firewall_rule(vmid: int, node: str, type: Literal['qemu', 'lxc'], action: Literal['ACCEPT', 'DROP', 'REJECT'], direction: Literal['in', 'out'], proto: Optional[str] = None, port: Optional[str] = None):
+async def add_firewall_rule(vmid: int, action: Literal['ACCEPT', 'DROP', 'REJECT'], direction: Literal['in', 'out'], node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, proto: Optional[str] = None, port: Optional[str] = None):
     """
     Adds a firewall rule to a machine.
     
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
         action (str): 'ACCEPT', 'DROP' or 'REJECT'.
         direction (str): 'in' for inbound or 'out' for outbound.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
         proto (str, optional): Protocol (e.g., 'tcp', 'udp', 'icmp').
         port (str, optional): Destination port (e.g., '80', '22', '1000:2000').
     """
     logger.info(f"Tool called: add_firewall_rule(vmid={vmid}, action={action}, proto={proto})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.add_firewall_rule(node, vmid, type, action, direction, proto=proto, dport=port)
-        return f"Règle de pare-feu ({action} {direction} {proto or ''}) ajoutée avec succès pour la machine {vmid}."
+        node, type = await _locate(vmid, node, type)
+        await proxmox.add_firewall_rule(node, vmid, type, action, direction, proto=proto, dport=port)
+        return _reply(f"Règle de pare-feu ({action} {direction} {proto or ''}) ajoutée avec succès pour la machine {vmid}.", vmid=vmid, node=node, action=action, direction=direction, proto=proto, dport=port)
     except Exception as e:
         logger.error(f"Error in add_firewall_rule: {e}")
         return f"Erreur lors de l'ajout de la règle : {e}"
 
 @mcp.tool()
-def migrate_machine(vmid: int, node: str, type: Literal['qemu', 'lxc'], target_node: str, online: bool = False):
+async def migrate_machine(vmid: int, target_node: str, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, online: bool = False):
     """
     Migrates a machine to another node in the cluster.
     
     Args:
         vmid (int): Machine ID.
-        node (str): Source node name.
-        type (str): 'qemu' or 'lxc'.
         target_node (str): Destination node name.
+        node (str, optional): Source node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
         online (bool): If True, attempts a live migration (no downtime).
     """
     logger.info(f"Tool called: migrate_machine(vmid={vmid}, from={node}, to={target_node}, online={online})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.migrate_machine(node, vmid, type, target_node, online)
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.migrate_machine(node, vmid, type, target_node, online)
         mode = "à chaud (online)" if online else "à froid (offline)"
-        return f"Migration {mode} de la machine {vmid} vers le nœud {target_node} lancée."
+        return _reply(f"Migration {mode} de la machine {vmid} vers le nœud {target_node} lancée.", vmid=vmid, node=node, target_node=target_node, upid=upid)
     except Exception as e:
         logger.error(f"Error in migrate_machine: {e}")
         return f"Erreur lors de la migration : {e}"
 
 @mcp.tool()
-def delete_snapshot(vmid: int, node: str, type: Literal['qemu', 'lxc'], snapname: str):
+async def delete_snapshot(vmid: int, snapname: str, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None):
     """
     Deletes a specific snapshot to free up storage space.
     
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
         snapname (str): Name of the snapshot to delete.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: delete_snapshot(vmid={vmid}, snapname={snapname})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.delete_snapshot(node, vmid, type, snapname)
-        return f"Suppression du snapshot '{snapname}' lancée pour la machine {vmid}."
+        node, type = await _locate(vmid, node, type)
+        upid = await proxmox.delete_snapshot(node, vmid, type, snapname)
+        return _reply(f"Suppression du snapshot '{snapname}' lancée pour la machine {vmid}.", vmid=vmid, node=node, snapname=snapname, upid=upid)
     except Exception as e:
         logger.error(f"Error in delete_snapshot: {e}")
         return f"Erreur lors de la suppression du snapshot : {e}"
 
 @mcp.tool()
-def unlock_machine(vmid: int, node: str):
+async def unlock_machine(vmid: int, node: Optional[str] = None):
     """
     Unlocks a machine if it is stuck in a 'locked' state (e.g., after a failed backup).
     
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
+        node (str, optional): Node name. Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: unlock_machine(vmid={vmid}, node={node})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.unlock_machine(node, vmid)
-        return f"Commande de déverrouillage envoyée pour la machine {vmid}."
+        type = None
+        if not node: node, type = await proxmox.locate(vmid)
+        await proxmox.unlock_machine(node, vmid, type)
+        return _reply(f"Commande de déverrouillage envoyée pour la machine {vmid}.", vmid=vmid, node=node)
     except Exception as e:
         logger.error(f"Error in unlock_machine: {e}")
         return f"Erreur lors du déverrouillage : {e}"
 
 @mcp.tool()
-def get_cluster_logs(max_lines: int = 20):
+async def get_cluster_logs(max_lines: int = 20, output: Optional[Literal['text', 'json']] = None):
     """
     Retrieves the latest global cluster logs to diagnose issues.
     
     Args:
         max_lines (int): Number of log lines to retrieve (default: 20).
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
     logger.info(f"Tool called: get_cluster_logs(limit={max_lines})")
-    if not proxmox: return "Client Proxmox non configuré."
-    try:
-        logs = proxmox.get_cluster_log(max_lines)
-        if not logs: return "Aucun log trouvé."
-        
-        result = f"Derniers logs du cluster ({len(logs)}) :\n"
-        for l in logs:
-            # Proxmox logs have fields like 't' (text), 'u' (user), 'time', 'node'
-            time_str = l.get('time', '')
-            node = l.get('node', '?')
-            user = l.get('user', '?')
-            msg = l.get('msg', l.get('t', ''))
-            result += f"[{time_str}] ({node}) {user}: {msg}\n"
-        return result
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        logs = await proxmox.get_cluster_log(max_lines)
+        # Proxmox logs have fields like 't' (text), 'u' (user), 'time', 'node'
+        data = [{'time': l.get('time'), 'node': l.get('node'), 'user': l.get('user'), 'msg': l.get('msg', l.get('t', ''))} for l in logs or []]
+        return render(data, _format_cluster_logs, output)
     except Exception as e:
         logger.error(f"Error in get_cluster_logs: {e}")
         return f"Erreur lors de la récupération des logs : {e}"
 
+def _format_cluster_logs(logs):
+    if not logs: return "Aucun log trouvé."
+    lines = [f"Derniers logs du cluster ({len(logs)}) :"]
+    lines.extend(f"[{l['time'] or ''}] ({l['node'] or '?'}) {l['user'] or '?'}: {l['msg']}" for l in logs)
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def get_machine_performance_history(vmid: int, node: str, type: Literal['qemu', 'lxc'], timeframe: Literal['hour', 'day', 'week'] = 'hour'):
+async def get_machine_performance_history(vmid: int, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None, timeframe: Literal['hour', 'day', 'week', 'month', 'year'] = 'hour', points: int = 12, method: Literal['buckets', 'lttb'] = 'buckets', source: Literal['auto', 'local', 'proxmox'] = 'auto', output: Optional[Literal['text', 'json']] = None):
     """
-    Retrieves performance history (CPU, RAM) for a machine (RRD data).
-    Useful for diagnosing past issues.
-    
+    Retrieves performance history (CPU, RAM, disk and network I/O) for a machine (RRD data).
+    Useful for diagnosing past issues: every measure is accounted for, so short spikes stay visible.
+
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
-        timeframe (str): Period to analyze ('hour', 'day', 'week').
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
+        timeframe (str): Period to analyze ('hour', 'day', 'week', 'month', 'year').
+        points (int): Number of intervals (or points) in the summary (default 12).
+        method (str): 'buckets' (default): min/avg/max/p95 per interval.
+                      'lttb': sample of real measures keeping the shape of the CPU curve.
+        source (str): 'auto' (default): local history when it covers the period, else Proxmox RRD.
+                      'local': local history only. 'proxmox': Proxmox RRD only.
+        output (str, optional): 'text' (default) or 'json' for structured records.
     """
-    logger.info(f"Tool called: get_machine_performance_history(vmid={vmid}, time={timeframe})")
-    if not proxmox: return "Client Proxmox non configuré."
+    logger.info(f"Tool called: get_machine_performance_history(vmid={vmid}, time={timeframe}, points={points}, method={method}, source={source})")
+    if not proxmox: return NOT_CONFIGURED
+    history = get_history_store()
+    if source == 'local' and not history: return "Historique local désactivé (définissez PROXMOX_HISTORY_DB)."
     try:
-        data = proxmox.get_machine_rrd_data(node, vmid, type, timeframe)
+        now = int(time.time())
+        start = now - TIMEFRAMES[timeframe]
+        if source == 'auto' and history:
+            oldest = await asyncio.to_thread(history.oldest, vmid)
+            # The local history must reach back to the start of the period (give or take one sample)
+            source = 'local' if oldest is not None and oldest <= start + collector.interval else 'proxmox'
+
+        if source == 'local':
+            data = await asyncio.to_thread(history.query, vmid, start, None, now)
+        else:
+            node, type = await _locate(vmid, node, type)
+            data = await proxmox.get_machine_rrd_data(node, vmid, type, timeframe)
         if not data: return "Aucune donnée historique disponible."
-        
-        # Summarize data to avoid token explosion
-        # Take 1 point every N points depending on total length
-        step = max(1, len(data) // 10) 
-        sampled = data[::step]
-        
-        result = f"Historique Performance (Résumé 10 points - {timeframe}) :\n"
-        for point in sampled:
-            # RRD data format might vary, but usually has 'time', 'cpu', 'mem', 'maxmem'
-            ts = point.get('time', 0)
-            cpu = point.get('cpu', 0) * 100 # Often 0-1 float
-            # Depending on Proxmox version, keys might differ (e.g. 'netin', 'netout')
-            result += f"  - Time: {ts} | CPU: {cpu:.1f}%\n"
-        return result
+
+        summary = summarize(data, points, method)
+        summary.update(vmid=vmid, node=node, timeframe=timeframe, source='local' if source == 'local' else 'proxmox')
+        return render(summary, _format_performance_history, output)
     except Exception as e:
         logger.error(f"Error in get_machine_performance_history: {e}")
         return f"Erreur lors de la récupération de l'historique : {e}"
 
+def _fmt_metric(metric, value):
+    """Human-readable value of an RRD metric (CPU ratio, memory bytes, I/O bytes/s)."""
+    if value is None:
+        return "-"
+    if metric == 'cpu':
+        return f"{value * 100:.1f}%"
+    if metric in ('mem', 'maxmem'):
+        return f"{value / (1024**2):.0f} MB"
+    return f"{value / 1024:.1f} KB/s"
+
+def _fmt_time(ts):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))
+
+def _format_performance_history(data):
+    if not data['count']: return "Aucune donnée historique disponible."
+    labels = {'cpu': 'CPU', 'mem': 'RAM', 'diskread': 'Disque lu', 'diskwrite': 'Disque écrit', 'netin': 'Réseau in', 'netout': 'Réseau out'}
+    origin = "historique local" if data['source'] == 'local' else "RRD Proxmox"
+    lines = [f"Historique Performance de {data['vmid']} ({data['timeframe']}, {origin}, {data['count']} mesures du {_fmt_time(data['start'])} au {_fmt_time(data['end'])}) :"]
+    for metric, label in labels.items():
+        s = data['overall'].get(metric)
+        if s:
+            lines.append(f"  - {label} : moy {_fmt_metric(metric, s['avg'])} | p95 {_fmt_metric(metric, s['p95'])} | max {_fmt_metric(metric, s['max'])}")
+
+    if data['method'] == 'buckets':
+        lines.append("\nPar intervalle (moy / max) :")
+        for b in data['points']:
+            parts = [f"{label} {_fmt_metric(m, b[m]['avg'])} / {_fmt_metric(m, b[m]['max'])}" for m, label in labels.items() if b.get(m)]
+            lines.append(f"  - {_fmt_time(b['start'])} → {_fmt_time(b['end'])} | " + " | ".join(parts))
+    else:
+        lines.append("\nMesures représentatives (LTTB) :")
+        for p in data['points']:
+            parts = [f"{label} {_fmt_metric(m, p[m])}" for m, label in labels.items() if p.get(m) is not None]
+            lines.append(f"  - {_fmt_time(p['time'])} | " + " | ".join(parts))
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def list_available_lxc_templates(node: str):
+async def get_fleet_performance(metric: Literal['cpu', 'mem', 'maxmem', 'diskread', 'diskwrite', 'netin', 'netout'] = 'cpu', timeframe: Literal['hour', 'day', 'week', 'month', 'year'] = 'hour', group_by: Optional[Literal['node', 'tag']] = None, node: Optional[str] = None, tag: Optional[str] = None, vmids: Optional[List[int]] = None, output: Optional[Literal['text', 'json']] = None):
+    """
+    Aggregates the performance history of many guests at once (capacity reviews):
+    sum, mean and p50/p95/p99 across guests at each RRD timestamp, for the whole fleet
+    or per node / per tag. RRD data is fetched concurrently for all selected guests.
+
+    Args:
+        metric (str): 'cpu' (default), 'mem', 'maxmem', 'diskread', 'diskwrite', 'netin' or 'netout'.
+        timeframe (str): Period to analyze ('hour', 'day', 'week', 'month', 'year').
+        group_by (str, optional): 'node' or 'tag' (a guest counts in each of its tags).
+        node (str, optional): Only guests on this node.
+        tag (str, optional): Only guests carrying this tag.
+        vmids (list[int], optional): Only these guests.
+        output (str, optional): 'text' (default, summary per group) or 'json' (series per timestamp).
+    """
+    logger.info(f"Tool called: get_fleet_performance(metric={metric}, timeframe={timeframe}, group_by={group_by}, node={node}, tag={tag})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        check_query(metric, group_by)
+        inventory = await proxmox.get_all_machines()
+        selected = select_fleet(inventory, vmids, node, tag)
+        if not selected: return "Aucune machine ne correspond à la sélection." + _format_failures(inventory.failures)
+        fetched = await proxmox.get_machines_rrd_data(selected, timeframe)
+        data = fleet_summary(selected, dict(fetched), metric, group_by)
+        data.update(timeframe=timeframe, failures=inventory.failures + fetched.failures)
+        return render(data, _format_fleet, output)
+    except Exception as e:
+        logger.error(f"Error in get_fleet_performance: {e}")
+        return f"Erreur lors de l'agrégation des performances : {e}"
+
+def _format_fleet(data):
+    metric = data['metric']
+    lines = [f"Performance de la flotte ({metric}, {data['timeframe']}) :"]
+    for name, group in data['groups'].items():
+        points = [p for p in group['points'] if p['count']]
+        label = "Toutes les machines" if name == 'all' else name
+        if not points:
+            lines.append(f"  - {label} ({len(group['guests'])} machines) : aucune donnée")
+            continue
+        peak = max(points, key=lambda p: p['sum'])
+        mean = sum(p['mean'] for p in points) / len(points)
+        lines.append(
+            f"  - {label} ({len(group['guests'])} machines) : moyenne {_fmt_metric(metric, mean)}"
+            f" | p95 max {_fmt_metric(metric, max(p['p95'] for p in points))}"
+            f" | p99 max {_fmt_metric(metric, max(p['p99'] for p in points))}"
+            f" | total max {_fmt_metric(metric, peak['sum'])} à {_fmt_time(peak['time'])}"
+        )
+    return "\n".join(lines) + "\n" + _format_failures(data['failures'])
+
+@mcp.tool()
+async def forecast_capacity(node: Optional[str] = None, storage: Optional[str] = None, threshold: float = 95, timeframe: Literal['week', 'month', 'year'] = 'month', method: Literal['theil-sen', 'linear'] = 'theil-sen', output: Optional[Literal['text', 'json']] = None):
+    """
+    Predicts when node RAM, node root disks and storages will reach a usage threshold,
+    by fitting the trend of their RRD history. Use it to plan hardware ahead of time.
+
+    Args:
+        node (str, optional): Only this node (default: every online node).
+        storage (str, optional): Only this storage (node RAM/root disk are then skipped).
+        threshold (float): Usage threshold in percent (default 95).
+        timeframe (str): History the trend is fitted on ('week', 'month' (default), 'year').
+        method (str): 'theil-sen' (default, robust to one-off peaks) or 'linear' (least squares).
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: forecast_capacity(node={node}, storage={storage}, threshold={threshold}, timeframe={timeframe}, method={method})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        nodes = [n['node'] for n in await proxmox.get_nodes() if n.get('status') == 'online']
+        storages = await proxmox.get_all_storage(nodes)
+        targets = capacity_targets(nodes, storages, node, storage)
+        if not targets: return "Aucun nœud ou stockage ne correspond." + _format_failures(storages.failures)
+        series = await proxmox.get_capacity_rrd_data(targets, timeframe)
+        data = {
+            'threshold': threshold,
+            'timeframe': timeframe,
+            'method': method,
+            'forecasts': capacity_forecasts(series, threshold / 100, method),
+            'failures': storages.failures + series.failures,
+        }
+        return render(data, _format_forecasts, output)
+    except Exception as e:
+        logger.error(f"Error in forecast_capacity: {e}")
+        return f"Erreur lors de la prévision de capacité : {e}"
+
+def _format_forecasts(data):
+    if not data['forecasts']: return "Aucune donnée historique disponible." + _format_failures(data['failures'])
+    labels = {'memory': "RAM", 'rootfs': "Disque système"}
+    lines = [f"Prévision de capacité (seuil {data['threshold']:g}%, tendance {data['timeframe']}, {data['method']}) :"]
+    for f in data['forecasts']:
+        target = f"{f['node']} {labels[f['resource']]}" if f['resource'] in labels else f"Stockage {f['storage']} ({f['node']})"
+        growth = f"{f['growth_per_day'] / (1024**3):+.2f} GB/jour"
+        if f['days_left'] == 0:
+            outlook = "⚠️ seuil déjà atteint"
+        elif f['eta'] is None:
+            outlook = "stable ou en baisse"
+        else:
+            outlook = f"seuil dans ~{f['days_left']:.0f} jours ({time.strftime('%Y-%m-%d', time.localtime(f['eta']))})"
+        lines.append(f"  - {target} : {f['ratio'] * 100:.1f}% utilisé ({f['used'] / (1024**3):.1f}/{f['total'] / (1024**3):.1f} GB), {growth} → {outlook}")
+    return "\n".join(lines) + "\n" + _format_failures(data['failures'])
+
+@mcp.tool()
+async def list_anomalies(metric: Optional[Literal['cpu', 'mem', 'diskread', 'diskwrite', 'netin', 'netout']] = None, active_only: bool = False, since_minutes: int = 60, node: Optional[str] = None, tag: Optional[str] = None, source: Literal['auto', 'live', 'rrd'] = 'auto', output: Optional[Literal['text', 'json']] = None):
+    """
+    Lists guests whose CPU, memory, disk or network I/O deviates from their own baseline
+    (EWMA z-score), with the time windows that were abnormal.
+
+    Args:
+        metric (str, optional): Only this metric ('cpu', 'mem', 'diskread', 'diskwrite', 'netin', 'netout').
+        active_only (bool): Only anomalies still in progress.
+        since_minutes (int): Look-back window in minutes (default 60).
+        node (str, optional): Only guests on this node.
+        tag (str, optional): Only guests carrying this tag.
+        source (str): 'auto' (default): background detector when it runs, else RRD history.
+                      'live': background detector (PROXMOX_ANOMALY_WATCH or PROXMOX_HISTORY_DB).
+                      'rrd': replay the last hour of RRD data of the running guests.
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: list_anomalies(metric={metric}, active_only={active_only}, since={since_minutes}, node={node}, tag={tag}, source={source})")
+    if not proxmox: return NOT_CONFIGURED
+    if source == 'live' and not collector: return "Détection continue désactivée (définissez PROXMOX_ANOMALY_WATCH=true ou PROXMOX_HISTORY_DB)."
+    try:
+        inventory = await proxmox.get_all_machines()
+        failures = list(inventory.failures)
+        source = 'live' if source == 'live' or (source == 'auto' and collector) else 'rrd'
+        if source == 'live':
+            found = detector
+        else:
+            running = [m for m in select_fleet(inventory, node=node, tag=tag) if m.get('status') == 'running']
+            fetched = await proxmox.get_machines_rrd_data(running, 'hour')
+            failures += fetched.failures
+            found = detect_from_rrd(dict(fetched))
+        windows = found.anomalies(active_only, metric, since=int(time.time()) - since_minutes * 60)
+        data = {'source': source, 'since_minutes': since_minutes, 'anomalies': annotate(windows, inventory, node, tag), 'failures': failures}
+        return render(data, _format_anomalies, output)
+    except Exception as e:
+        logger.error(f"Error in list_anomalies: {e}")
+        return f"Erreur lors de la détection d'anomalies : {e}"
+
+def _format_anomalies(data):
+    origin = "détection continue" if data['source'] == 'live' else "historique RRD"
+    if not data['anomalies']:
+        return f"Aucune anomalie sur les {data['since_minutes']} dernières minutes ({origin})." + _format_failures(data['failures'])
+    lines = [f"Anomalies sur les {data['since_minutes']} dernières minutes ({origin}) :"]
+    for a in data['anomalies']:
+        metric = a['metric']
+        usual = f"habituel {_fmt_metric(metric, a['baseline'])} ± {_fmt_metric(metric, a['std'])}"
+        if a['active']:
+            when = f"en cours depuis {_fmt_time(a['start'])}"
+        else:
+            when = f"du {_fmt_time(a['start'])} au {_fmt_time(a['end'])}"
+        icon = "🔴" if a['active'] else "⚪"
+        lines.append(f"  - {icon} {a['vmid']} ({a['name']}) sur {a['node']} | {metric} : pic {_fmt_metric(metric, a['peak'])} ({usual}, z={a['z']:+.1f}) {when}, {a['samples']} mesure(s)")
+    return "\n".join(lines) + "\n" + _format_failures(data['failures'])
+
+@mcp.tool()
+async def list_available_lxc_templates(node: str, output: Optional[Literal['text', 'json']] = None):
     """
     Lists LXC templates available for download (e.g., Ubuntu, Alpine, TurnKey).
+
+    Args:
+        node (str): Node name.
+        output (str, optional): 'text' (default, top 20) or 'json' for structured records (all templates).
     """
     logger.info(f"Tool called: list_available_lxc_templates(node={node})")
-    if not proxmox: return "Client Proxmox non configuré."
-    try:
-        tmps = proxmox.list_lxc_templates(node)
-        if not tmps: return "Aucun template trouvé. (Essayez 'pveam update' sur le nœud si vide)."
-        
-        result = f"Templates LXC Disponibles ({len(tmps)}) :\n"
-        # Sort and limit to avoid huge output if many templates
-        for t in tmps[:20]: # Limit to top 20 for safety
-            name = t.get('template')
-            desc = t.get('headline', t.get('description', ''))[:50] # Truncate description
-            result += f"  - {name} : {desc}\n"
-        if len(tmps) > 20:
-            result += f"... et {len(tmps)-20} autres.\n"
-        return result
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        tmps = await proxmox.list_lxc_templates(node)
+        data = [{'template': t.get('template'), 'headline': t.get('headline', t.get('description', ''))} for t in tmps or []]
+        return render(data, _format_lxc_templates, output)
     except Exception as e:
         logger.error(f"Error in list_available_lxc_templates: {e}")
         return f"Erreur lors du listage des templates : {e}"
 
+def _format_lxc_templates(templates):
+    if not templates: return "Aucun template trouvé. (Essayez 'pveam update' sur le nœud si vide)."
+    lines = [f"Templates LXC Disponibles ({len(templates)}) :"]
+    # Limit to top 20 for safety, descriptions truncated
+    lines.extend(f"  - {t['template']} : {t['headline'][:50]}" for t in templates[:20])
+    if len(templates) > 20:
+        lines.append(f"... et {len(templates)-20} autres.")
+    return "\n".join(lines) + "\n"
+
 @mcp.tool()
-def download_lxc_template(node: str, storage: str, template_name: str):
+async def download_lxc_template(node: str, storage: str, template_name: str):
     """
     Downloads a specific LXC template to storage.
     
@@ -729,34 +1334,157 @@ def download_lxc_template(node: str, storage: str, template_name: str):
         template_name (str): Exact name of the template (from list_available_lxc_templates).
     """
     logger.info(f"Tool called: download_lxc_template(name={template_name})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.download_lxc_template(node, storage, template_name)
-        return f"Téléchargement du template '{template_name}' lancé vers {storage}."
+        upid = await proxmox.download_lxc_template(node, storage, template_name)
+        return _reply(f"Téléchargement du template '{template_name}' lancé vers {storage}.", node=node, storage=storage, template=template_name, upid=upid)
     except Exception as e:
         logger.error(f"Error in download_lxc_template: {e}")
         return f"Erreur lors du téléchargement : {e}"
 
 @mcp.tool()
-def set_machine_tags(vmid: int, node: str, type: Literal['qemu', 'lxc'], tags: str):
+async def set_machine_tags(vmid: int, tags: str, node: Optional[str] = None, type: Optional[Literal['qemu', 'lxc']] = None):
     """
     Sets tags for a machine to organize them (e.g., 'production,db').
     Replaces existing tags.
     
     Args:
         vmid (int): Machine ID.
-        node (str): Node name.
-        type (str): 'qemu' or 'lxc'.
         tags (str): Comma-separated tags (e.g., 'dev,test').
+        node (str, optional): Node name. Resolved from the vmid if omitted.
+        type (str, optional): 'qemu' or 'lxc'. Resolved from the vmid if omitted.
     """
     logger.info(f"Tool called: set_machine_tags(vmid={vmid}, tags={tags})")
-    if not proxmox: return "Client Proxmox non configuré."
+    if not proxmox: return NOT_CONFIGURED
     try:
-        proxmox.set_machine_tags(node, vmid, type, tags)
-        return f"Tags '{tags}' appliqués à la machine {vmid}."
+        node, type = await _locate(vmid, node, type)
+        await proxmox.set_machine_tags(node, vmid, type, tags)
+        return _reply(f"Tags '{tags}' appliqués à la machine {vmid}.", vmid=vmid, node=node, tags=tags)
     except Exception as e:
         logger.error(f"Error in set_machine_tags: {e}")
         return f"Erreur lors de l'ajout des tags : {e}"
 
-if __name__ == "__main__":
+@mcp.tool()
+async def get_task_status(upid: str, output: Optional[Literal['text', 'json']] = None):
+    """
+    Shows the state of a Proxmox task (running or finished, exit status, duration).
+
+    Args:
+        upid (str): Task ID returned by a command (starts with 'UPID:').
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: get_task_status(upid={upid})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        return render(await proxmox.get_task_status(upid), _format_task, output)
+    except Exception as e:
+        logger.error(f"Error in get_task_status: {e}")
+        return f"Erreur lors de la récupération de la tâche : {e}"
+
+@mcp.tool()
+async def wait_for_task(upid: str, timeout: int = 300, output: Optional[Literal['text', 'json']] = None):
+    """
+    Waits until a Proxmox task finishes, then shows its exit status and duration.
+    Use it to chain operations (e.g. clone, then start the clone).
+
+    Args:
+        upid (str): Task ID returned by a command (starts with 'UPID:').
+        timeout (int): Maximum wait in seconds (default 300).
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: wait_for_task(upid={upid}, timeout={timeout})")
+    if not proxmox: return NOT_CONFIGURED
+    try:
+        task = await proxmox.wait_for_task(upid, timeout)
+        task.update(timed_out=task['status'] == 'running', timeout=timeout)
+        return render(task, _format_task, output)
+    except Exception as e:
+        logger.error(f"Error in wait_for_task: {e}")
+        return f"Erreur lors de l'attente de la tâche : {e}"
+
+@mcp.tool()
+async def get_connection_pool_stats(output: Optional[Literal['text', 'json']] = None):
+    """
+    Shows how the HTTP connection pool to the Proxmox API is used
+    (requests served on reused connections vs new connections and TLS handshakes).
+
+    Args:
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info("Tool called: get_connection_pool_stats")
+    if not proxmox: return NOT_CONFIGURED
+    return render(proxmox.get_pool_stats(), _format_pool_stats, output)
+
+def _format_pool_stats(stats):
+    limits = stats['limits']
+    return "\n".join([
+        "Pool de connexions Proxmox :",
+        f"  - Requêtes: {stats['requests']} | Connexions réutilisées: {stats['pool_hits']} | Nouvelles connexions: {stats['new_connections']} | Handshakes TLS: {stats['tls_handshakes']}",
+        f"  - Limites: {limits['max_connections']} connexions max | {limits['max_keepalive']} en keep-alive | expiration {limits['keepalive_expiry']:g}s",
+    ]) + "\n"
+
+@mcp.tool()
+async def get_cache_stats(output: Optional[Literal['text', 'json']] = None):
+    """
+    Shows the inventory cache statistics (hits, misses, TTLs) per resource kind.
+    Useful to tune the PROXMOX_CACHE_TTL_* settings.
+
+    Args:
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info("Tool called: get_cache_stats")
+    if not proxmox: return NOT_CONFIGURED
+    return render(proxmox.get_cache_stats(), _format_cache_stats, output)
+
+def _format_cache_stats(stats):
+    lines = [f"Cache d'inventaire : {stats['size']}/{stats['maxsize']} entrées"]
+    for kind, ttl in stats['ttls'].items():
+        counters = stats['kinds'].get(kind)
+        if not counters:
+            lines.append(f"  - {kind} (TTL {ttl:g}s) : aucune requête")
+            continue
+        lines.append(f"  - {kind} (TTL {ttl:g}s) : {counters['hits']} hits / {counters['misses']} misses "
+                     f"({counters['hit_ratio'] * 100:.0f}%) | expirés: {counters['expired']} | évincés: {counters['evictions']} | invalidés: {counters['invalidations']}")
+    return "\n".join(lines) + "\n"
+
+@mcp.tool()
+async def get_client_stats(slowest: int = 10, output: Optional[Literal['text', 'json']] = None):
+    """
+    Shows where the time of the Proxmox API calls goes: per endpoint (path template)
+    calls, errors, bytes, p50/p95/max latency and the mean connect (DNS/TCP/TLS),
+    server, transfer and JSON decode time, plus the slowest recent calls with their arguments.
+
+    Args:
+        slowest (int): Number of slowest recent calls to list (default 10).
+        output (str, optional): 'text' (default) or 'json' for structured records.
+    """
+    logger.info(f"Tool called: get_client_stats(slowest={slowest})")
+    if not proxmox: return NOT_CONFIGURED
+    return render(proxmox.get_call_stats(slowest), _format_client_stats, output)
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+def _format_client_stats(stats):
+    if not stats['endpoints']:
+        return "Aucun appel à l'API Proxmox enregistré.\n"
+    lines = ["Appels à l'API Proxmox (temps total décroissant) :"]
+    for e in stats['endpoints']:
+        mean = e['mean']
+        lines.append(f"  - {e['method']} {e['path']} : {e['calls']} appel(s), {e['errors']} erreur(s), {e['bytes'] / 1024:.1f} KB"
+                     f" | p50 {_ms(e['p50'])} | p95 {_ms(e['p95'])} | max {_ms(e['max'])}")
+        lines.append(f"      moyenne : connexion {_ms(mean['connect'])} | serveur {_ms(mean['server'])} | transfert {_ms(mean['transfer'])}"
+                     f" | décodage {_ms(mean['decode'])} | total {_ms(mean['total'])}")
+    lines.append("")
+    lines.append("Appels les plus lents récents :")
+    for c in stats['slowest']:
+        args = ", ".join(f"{k}={v}" for k, v in c['args'].items())
+        lines.append(f"  - {_ms(c['total'])} | {c['method']} {c['path']}" + (f" ({args})" if args else "") + f" -> {c['status'] or 'sans réponse'}")
+    return "\n".join(lines) + "\n"
+
+def main():
+    setup_logging()
     mcp.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+def load_env():
+    """
+    Applies the .env file (if any) to the environment; variables already set win.
+
+    Called by the entry points before they read their settings and again on
+    every client construction attempt, so a fixed .env is picked up by the
+    next retry without a restart.
+    """
+    load_dotenv()
+
+def load_settings():
+    """
+    Reads the Proxmox connection settings from environment variables.
+
+    Returns:
+        dict: host, port, user, token_id, token_secret and verify_ssl.
+
+    Raises:
+        ValueError: If required environment variables are missing.
+    """
+    load_env()
+    url = os.getenv("PROXMOX_URL")
+    if not url:
+        raise ValueError("PROXMOX_URL is not set in .env")
+
+    parsed_url = urlparse(url)
+    settings = {
+        'host': parsed_url.hostname,
+        'port': parsed_url.port or 8006,
+        'user': os.getenv("PROXMOX_USER"),
+        'token_id': os.getenv("PROXMOX_TOKEN_ID"),
+        'token_secret': os.getenv("PROXMOX_TOKEN_SECRET"),
+        'verify_ssl': os.getenv("PROXMOX_VERIFY_SSL", "false").lower() == "true",
+    }
+    if not all([settings['user'], settings['token_id'], settings['token_secret']]):
+        raise ValueError("Proxmox credentials (USER, TOKEN_ID, TOKEN_SECRET) are missing in .env")
+    return settings
+
+def load_pool_settings():
+    """
+    Reads the HTTP connection pool settings from environment variables.
+
+    Returns:
+        dict: max_connections (per host), max_keepalive (idle connections kept)
+              and keepalive_expiry (seconds an idle connection is kept open).
+    """
+    return {
+        'max_connections': int(os.getenv("PROXMOX_POOL_MAXSIZE", "20")),
+        'max_keepalive': int(os.getenv("PROXMOX_POOL_KEEPALIVE", "10")),
+        'keepalive_expiry': float(os.getenv("PROXMOX_KEEPALIVE_EXPIRY", "60")),
+    }
@@ -0,0 +1,185 @@
+import os
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+def parse_upid(upid):
+    """
+    Splits a Proxmox task identifier.
+
+    Format: UPID:<node>:<pid>:<pstart>:<starttime>:<type>:<id>:<user>:
+    (pid, pstart and starttime are hexadecimal).
+
+    Returns:
+        dict: upid, node, pid, pstart, starttime, type, id and user.
+
+    Raises:
+        ValueError: If the string is not a UPID.
+    """
+    parts = str(upid).split(':')
+    if len(parts) < 9 or parts[0] != 'UPID':
+        raise ValueError(f"UPID invalide : {upid}")
+    node, pid, pstart, starttime, task_type, task_id, user = parts[1:8]
+    return {
+        'upid': upid,
+        'node': node,
+        'pid': int(pid, 16),
+        'pstart': int(pstart, 16),
+        'starttime': int(starttime, 16),
+        'type': task_type,
+        'id': task_id,
+        'user': user,
+    }
+
+def task_succeeded(exitstatus):
+    """bool: True for a Proxmox exit status meaning success ('OK' or 'WARNINGS: n')."""
+    return exitstatus == 'OK' or str(exitstatus).startswith('WARNINGS')
+
+class TaskTracker:
+    """
+    Records the UPIDs issued by the client and the last known state of each task.
+
+    The tracker does no I/O: the client polls the cluster (one /cluster/tasks
+    call, plus one per-node tasks call for UPIDs it did not list) and feeds the
+    entries to `apply`. `claim_poll` coalesces concurrent waiters onto a single
+    poll per interval, and `backoff` spaces out the polls of a long wait.
+    """
+
+    def __init__(self, history=None, poll_interval=None, max_interval=None):
+        """
+        Args:
+            history (int, optional): Number of tasks remembered (env: PROXMOX_TASK_HISTORY, default 200).
+            poll_interval (float, optional): Minimum delay between two polls, and first backoff
+                                             step (env: PROXMOX_TASK_POLL_INTERVAL, default 0.5).
+            max_interval (float, optional): Backoff ceiling in seconds (env: PROXMOX_TASK_POLL_MAX, default 5).
+        """
+        self.history = history or int(os.getenv("PROXMOX_TASK_HISTORY", "200"))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("PROXMOX_TASK_POLL_INTERVAL", "0.5"))
+        self.max_interval = max_interval if max_interval is not None else float(os.getenv("PROXMOX_TASK_POLL_MAX", "5"))
+        self._tasks = OrderedDict()
+        self._last_poll = None
+        self._lock = threading.Lock()
+
+    def track(self, upid):
+        """
+        Starts following a task (no-op if it is already tracked).
+
+        Returns:
+            dict: A copy of the task record.
+        """
+        with self._lock:
+            record = self._tasks.get(upid)
+            if record is None:
+                record = parse_upid(upid)
+                record.update(status='running', exitstatus=None, endtime=None, duration=None, success=None)
+                self._tasks[upid] = record
+                self._trim()
+            return dict(record)
+
+    def _trim(self):
+        # Forget the oldest finished tasks first, running ones only as a last resort
+        while len(self._tasks) > self.history:
+            finished = next((upid for upid, t in self._tasks.items() if t['status'] == 'stopped'), None)
+            if finished is None:
+                self._tasks.popitem(last=False)
+            else:
+                del self._tasks[finished]
+
+    def get(self, upid):
+        """
+        Returns:
+            dict: A copy of the task record, or None if the UPID is not tracked.
+        """
+        with self._lock:
+            record = self._tasks.get(upid)
+            return dict(record) if record else None
+
+    def list(self):
+        """list: Copies of every tracked task record, oldest first."""
+        with self._lock:
+            return [dict(t) for t in self._tasks.values()]
+
+    def pending(self):
+        """list: Copies of the records of the tasks still running."""
+        with self._lock:
+            return [dict(t) for t in self._tasks.values() if t['status'] == 'running']
+
+    def claim_poll(self):
+        """
+        Reserves the next poll for the caller.
+
+        Returns:
+            bool: False if another caller polled less than `poll_interval` ago
+                  (its results are already in the tracker).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._last_poll is not None and now - self._last_poll < self.poll_interval:
+                return False
+            self._last_poll = now
+            return True
+
+    def apply(self, entries):
+        """
+        Updates the tracked tasks from task list entries (/cluster/tasks or nodes/{node}/tasks).
+
+        Entries without an 'endtime' describe running tasks; entries for untracked
+        UPIDs are ignored.
+
+        Returns:
+            list: Copies of the records that finished with this update.
+        """
+        finished = []
+        with self._lock:
+            for entry in entries or []:
+                record = self._tasks.get(entry.get('upid'))
+                if record is None or record['status'] != 'running' or entry.get('endtime') is None:
+                    continue
+                exitstatus = entry.get('status')
+                record.update(
+                    status='stopped',
+                    exitstatus=exitstatus,
+                    endtime=int(entry['endtime']),
+                    duration=int(entry['endtime']) - record['starttime'],
+                    success=task_succeeded(exitstatus),
+                )
+                finished.append(dict(record))
+        return finished
+
+    def backoff(self):
+        """Yields exponentially growing poll delays, from poll_interval up to max_interval."""
+        delay = self.poll_interval
+        while True:
+            yield delay
+            delay = min(delay * 2, self.max_interval)
+
+def _record(tracker, result):
+    """Tracks result if it is a UPID; anything else (None, malformed UPID) is left alone."""
+    if isinstance(result, str) and result.startswith('UPID:'):
+        try:
+            tracker.track(result)
+        except ValueError:
+            pass
+
+def tracks_task(func):
+    """
+    Decorator for client methods (sync or async) that start a Proxmox task.
+
+    Records the UPID they return in the client's task tracker.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            result = await func(self, *args, **kwargs)
+            _record(self.tasks, result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        result = func(self, *args, **kwargs)
+        _record(self.tasks, result)
+        return result
+    return wrapper
@@ -0,0 +1,80 @@
+import time
+import heapq
+from src.bulk import machine_tags
+
+# Metrics accepted by top_consumers ('mem_ratio' is mem / maxmem)
+TOP_METRICS = ('cpu', 'mem', 'mem_ratio', 'diskread', 'diskwrite', 'netin', 'netout')
+# Cumulative byte counters in /cluster/resources, ranked as bytes/s
+RATE_METRICS = ('diskread', 'diskwrite', 'netin', 'netout')
+
+def metric_value(machine, metric, previous=None, now=None):
+    """
+    Current value of a metric for a guest from a /cluster/resources entry.
+
+    I/O counters are cumulative since the guest started: with a previous
+    sample (ts, counters) of the same guest the value is the rate since that
+    sample, otherwise the average rate since the guest started (counter / uptime).
+
+    Returns:
+        float: The value, or None when the guest does not report it.
+    """
+    if metric == 'mem_ratio':
+        return machine['mem'] / machine['maxmem'] if machine.get('mem') is not None and machine.get('maxmem') else None
+    value = machine.get(metric)
+    if value is None or metric not in RATE_METRICS:
+        return value
+    if previous:
+        ts, counters = previous
+        elapsed = (now or time.time()) - ts
+        before = counters.get(metric)
+        if elapsed > 0 and before is not None and value >= before:
+            return (value - before) / elapsed
+    uptime = machine.get('uptime')
+    return value / uptime if uptime else None
+
+def top_consumers(machines, metric='cpu', limit=10, node=None, tag=None, previous=None, now=None):
+    """
+    Selects the running guests with the highest value of a metric.
+
+    Uses a bounded heap (heapq.nlargest), so the cost is O(n log limit)
+    instead of sorting the whole inventory.
+
+    Args:
+        machines (list): Guests from one /cluster/resources snapshot.
+        metric (str): One of TOP_METRICS.
+        limit (int): Number of guests to return.
+        node (str, optional): Only guests on this node.
+        tag (str, optional): Only guests carrying this tag.
+        previous (dict, optional): {vmid: (ts, counters)} of a previous sample, for I/O rates.
+        now (float, optional): Timestamp of the snapshot (defaults to now).
+
+    Returns:
+        list: Dicts with vmid, name, node, type and value, highest value first.
+
+    Raises:
+        ValueError: If the metric is unknown or limit < 1.
+    """
+    if metric not in TOP_METRICS:
+        raise ValueError(f"Métrique inconnue '{metric}' (valeurs possibles : {', '.join(TOP_METRICS)}).")
+    if limit < 1:
+        raise ValueError("limit doit être >= 1.")
+    now = now or time.time()
+    previous = previous or {}
+
+    def candidates():
+        for m in machines:
+            if m.get('status') != 'running' or m.get('template'):
+                continue
+            if node and m.get('node') != node:
+                continue
+            if tag and tag not in machine_tags(m):
+                continue
+            value = metric_value(m, metric, previous.get(int(m['vmid'])), now)
+            if value is not None:
+                yield value, m
+
+    best = heapq.nlargest(limit, candidates(), key=lambda c: (c[0], -int(c[1]['vmid'])))
+    return [
+        {'vmid': m['vmid'], 'name': m.get('name'), 'node': m.get('node'), 'type': m.get('type'), 'value': value}
+        for value, m in best
+    ]
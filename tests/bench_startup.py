@@ -0,0 +1,139 @@
+"""
+Startup benchmark of the MCP server and the REST API.
+
+Each run starts a fresh interpreter, as an editor spawning the stdio server
+does, and measures:
+  - import: `import src.server` (or src.api), i.e. the time before the server can answer;
+  - first_call: the first tool call, which builds the Proxmox client and opens
+    the first connection to the fake pveproxy;
+  - second_call: the same call again, on the warm client;
+  - stdio (with --stdio): process spawn to MCP initialize, then to the first tool result.
+
+A run saved as JSON can be compared to a later one to flag regressions.
+
+Usage:
+    python -m tests.bench_startup --repeat 5 --save startup.json
+    python -m tests.bench_startup --repeat 5 --stdio --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+from tests.fake_pveproxy import FakeCluster, FakePveProxy
+
+# Runs in the child interpreter: prints the timings of one cold start as JSON
+CHILD = """
+import time, json, sys, asyncio
+start = time.perf_counter()
+import {module} as target
+timings = {{'import': time.perf_counter() - start, 'modules': len(sys.modules)}}
+if {call!r}:
+    async def calls():
+        for phase in ('first_call', 'second_call'):
+            start = time.perf_counter()
+            await target.mcp.call_tool({call!r}, {{}})
+            timings[phase] = time.perf_counter() - start
+    asyncio.run(calls())
+print(json.dumps(timings))
+"""
+
+def run_child(module, call, env):
+    """dict: Timings of one cold start in a fresh interpreter."""
+    code = CHILD.format(module=module, call=call)
+    done = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=120)
+    if done.returncode:
+        raise RuntimeError(f"{module} : échec du démarrage\n{done.stderr[-2000:]}")
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+async def run_stdio(call, env):
+    """dict: Spawn-to-initialize and spawn-to-first-result times of the stdio server."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=["-m", "src.server"], env=env, cwd=os.getcwd())
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                initialized = time.perf_counter() - start
+                await session.call_tool(call, {})
+                first_result = time.perf_counter() - start
+    return {'stdio_initialize': initialized, 'stdio_first_result': first_result}
+
+def summarize(runs):
+    """dict: Median, min and max of every phase over the runs."""
+    phases = [k for k in runs[0] if k != 'modules']
+    summary = {}
+    for phase in phases:
+        values = [r[phase] for r in runs if phase in r]
+        summary[phase] = {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+    summary['modules'] = runs[0].get('modules')
+    return summary
+
+def compare(current, baseline, tolerance=0.10):
+    """list: Phases whose median got slower than the baseline by more than `tolerance` (relative)."""
+    regressions = []
+    for target, phases in current.items():
+        for phase, now in phases.items():
+            before = baseline.get(target, {}).get(phase)
+            if phase == 'modules' or not before:
+                continue
+            if now['median'] > before['median'] * (1 + tolerance):
+                regressions.append(f"{target} {phase} : {now['median'] * 1000:.0f} ms contre {before['median'] * 1000:.0f} ms")
+    return regressions
+
+def print_summary(results):
+    print(f"{'cible':<12} {'phase':<20} {'méd. ms':>9} {'min ms':>9} {'max ms':>9}")
+    for target, phases in results.items():
+        for phase, s in phases.items():
+            if phase != 'modules':
+                print(f"{target:<12} {phase:<20} {s['median'] * 1000:>9.1f} {s['min'] * 1000:>9.1f} {s['max'] * 1000:>9.1f}")
+        print(f"{target:<12} {'modules chargés':<20} {phases['modules']:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage du serveur MCP et de l'API")
+    parser.add_argument("--repeat", type=int, default=5, help="démarrages à froid par cible")
+    parser.add_argument("--tool", default="list_infrastructure", help="outil du premier appel")
+    parser.add_argument("--guests", type=int, default=100, help="invités du faux pveproxy")
+    parser.add_argument("--stdio", action="store_true", help="mesure aussi le serveur stdio complet (initialize + premier appel)")
+    parser.add_argument("--save", help="fichier où écrire le résumé JSON")
+    parser.add_argument("--compare", help="résumé JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="écart relatif toléré avant régression")
+    args = parser.parse_args()
+
+    proxy = FakePveProxy(FakeCluster(nodes=3, guests=args.guests)).start()
+    env = dict(os.environ, **proxy.env(), PROXMOX_HISTORY_DB="", PROXMOX_OUTPUT_FORMAT="text", PYTHONPATH=os.getcwd())
+    try:
+        server = [run_child("src.server", args.tool, env) for _ in range(args.repeat)]
+        if args.stdio:
+            for run in server:
+                run.update(asyncio.run(run_stdio(args.tool, env)))
+        api = [run_child("src.api", None, env) for _ in range(args.repeat)]
+    finally:
+        proxy.stop()
+
+    results = {'server': summarize(server), 'api': summarize(api)}
+    print_summary(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Résumé écrit dans {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) par rapport à {args.compare} :")
+            for r in regressions:
+                print(f"   - {r}")
+            return 1
+        print(f"✅ Pas de régression par rapport à {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
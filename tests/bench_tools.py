@@ -0,0 +1,112 @@
+"""
+Benchmark of the MCP tools against the fake pveproxy (tests/fake_pveproxy.py).
+
+Runs each tool on clusters of every size of the matrix (nodes x guests) and
+records its latency and the Proxmox API requests it sent. The inventory cache
+is cleared and the guest states restored before every run, so each run is a
+cold call doing the same work.
+
+Usage:
+    python -m tests.bench_tools
+    python -m tests.bench_tools --nodes 3,15 --guests 100,1000 --latency 0.005 --repeat 5 --json bench.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from tests.fake_pveproxy import FakeCluster, FakePveProxy, client_env
+
+# Tool name -> arguments of the benchmarked call
+TOOLS = {
+    'list_infrastructure': {},
+    'list_machines': {'limit': 100},
+    'list_storage': {},
+    'bulk_start_machines': {'tag': 'dev'},
+    'bulk_stop_machines': {'tag': 'web', 'use_node_endpoints': False},
+}
+
+async def bench_tool(server, proxy, name, arguments, repeat):
+    """Runs one tool `repeat` times; returns its latency and request statistics."""
+    cluster = proxy.cluster
+    latencies, requests, sent = [], [], []
+    for _ in range(repeat):
+        statuses = {vmid: g['status'] for vmid, g in cluster.guests.items()}
+        server.proxmox.cache.clear()
+        proxy.reset_counters()
+        start = time.perf_counter()
+        await server.mcp.call_tool(name, arguments)
+        latencies.append(time.perf_counter() - start)
+        requests.append(proxy.request_count())
+        sent.append(proxy.bytes_sent)
+        for vmid, status in statuses.items():
+            cluster.guests[vmid]['status'] = status
+    return {
+        'tool': name,
+        'median': statistics.median(latencies),
+        'min': min(latencies),
+        'max': max(latencies),
+        'requests': max(requests),
+        'bytes': max(sent),
+    }
+
+async def bench_cluster(server, nodes, guests, args):
+    """Benchmarks every tool on one cluster size."""
+    from src.async_client import AsyncProxmoxClient
+
+    cluster = FakeCluster(nodes, guests, seed=args.seed)
+    proxy = FakePveProxy(cluster, args.latency, args.jitter, args.failure_rate, seed=args.seed).start()
+    os.environ.update(proxy.env())
+    server.proxmox = AsyncProxmoxClient()
+    try:
+        results = []
+        for name in args.tools:
+            result = await bench_tool(server, proxy, name, TOOLS[name], args.repeat)
+            results.append(dict(result, nodes=nodes, guests=guests))
+            print(f"{nodes:>6} {guests:>8}  {name:<22} {result['median'] * 1000:>9.1f} {result['min'] * 1000:>9.1f} "
+                  f"{result['max'] * 1000:>9.1f} {result['requests']:>9} {result['bytes'] / 1024:>10.0f}")
+        return results
+    finally:
+        await server.proxmox.aclose()
+        proxy.stop()
+
+def _sizes(value):
+    return [int(v) for v in value.split(',')]
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark des outils MCP contre un faux pveproxy")
+    parser.add_argument("--nodes", type=_sizes, default=[3, 15, 50], help="tailles de cluster (ex. 3,15,50)")
+    parser.add_argument("--guests", type=_sizes, default=[100, 1000, 10000], help="nombres d'invités (ex. 100,1000,10000)")
+    parser.add_argument("--tools", type=lambda v: v.split(','), default=list(TOOLS), help=f"outils parmi {','.join(TOOLS)}")
+    parser.add_argument("--latency", type=float, default=0.002, help="latence ajoutée à chaque requête (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latence aléatoire supplémentaire maximale (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="part des requêtes en erreur 500")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="fichier où écrire les résultats")
+    args = parser.parse_args()
+    unknown = set(args.tools) - set(TOOLS)
+    if unknown:
+        parser.error(f"outils inconnus : {', '.join(sorted(unknown))}")
+
+    # The server module reads its settings at import time
+    os.environ.update(client_env("https://127.0.0.1:8006"))
+    os.environ.setdefault("PROXMOX_OUTPUT_FORMAT", "text")
+    import src.server as server
+
+    print(f"{'nœuds':>6} {'invités':>8}  {'outil':<22} {'méd. ms':>9} {'min ms':>9} {'max ms':>9} {'requêtes':>9} {'Ko reçus':>10}")
+    results = []
+    for nodes in args.nodes:
+        for guests in args.guests:
+            results += await bench_cluster(server, nodes, guests, args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'latency': args.latency, 'jitter': args.jitter, 'failure_rate': args.failure_rate,
+                       'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"\n✅ Résultats écrits dans {args.json}")
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
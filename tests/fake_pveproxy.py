@@ -0,0 +1,460 @@
+"""
+Fake Proxmox VE API server (pveproxy) for benchmarks and socket-level tests.
+
+Serves the /api2/json routes used by the clients over HTTPS (self-signed
+certificate, HTTP/1.1 keep-alive) from a generated cluster of N nodes and M
+guests, with optional per-request latency and failure injection.
+
+Usage:
+    python -m tests.fake_pveproxy --nodes 15 --guests 1000 --latency 0.005
+"""
+import os
+import re
+import ssl
+import json
+import math
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.metrics import path_template
+
+# Seconds between two RRD rows per timeframe (Proxmox returns ~70 rows)
+RRD_STEPS = {'hour': 60, 'day': 1800, 'week': 10800, 'month': 43200, 'year': 604800}
+TAGS = ('prod', 'dev', 'web', 'db', 'backup')
+GB = 1024**3
+
+class FakeCluster:
+    """
+    In-memory cluster state: nodes, guests, storages and tasks.
+
+    Generated deterministically from the seed. Power commands change the guest
+    status and create tasks that finish `task_duration` seconds later.
+    """
+
+    def __init__(self, nodes=3, guests=100, lxc_share=0.3, running_share=0.7, task_duration=0.0, seed=0):
+        rng = random.Random(seed)
+        self.task_duration = task_duration
+        self.nodes = [f"pve{i + 1}" for i in range(nodes)]
+        self.guests = {}
+        for i in range(guests):
+            vmid = 100 + i
+            lxc = rng.random() < lxc_share
+            self.guests[vmid] = {
+                'vmid': vmid,
+                'type': 'lxc' if lxc else 'qemu',
+                'node': self.nodes[i % nodes],
+                'name': f"{'ct' if lxc else 'vm'}-{vmid}",
+                'status': 'running' if rng.random() < running_share else 'stopped',
+                'tags': ";".join(sorted(rng.sample(TAGS, rng.randint(0, 2)))),
+                'maxcpu': rng.choice((1, 2, 4, 8)),
+                'maxmem': rng.choice((1, 2, 4, 8, 16)) * GB,
+                'maxdisk': rng.choice((8, 32, 64, 128)) * GB,
+                'cpu_base': rng.random() * 0.5,
+                'mem_share': 0.2 + rng.random() * 0.6,
+            }
+        self.storages = [
+            {'storage': 'local', 'type': 'dir', 'content': 'iso,vztmpl,backup', 'shared': 0, 'total': 100 * GB},
+            {'storage': 'local-lvm', 'type': 'lvmthin', 'content': 'images,rootdir', 'shared': 0, 'total': 500 * GB},
+            {'storage': 'nas', 'type': 'nfs', 'content': 'backup,iso', 'shared': 1, 'total': 4000 * GB},
+        ]
+        self.tasks = {}
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    # --- Views ---
+
+    def _guest_view(self, g, now):
+        running = g['status'] == 'running'
+        wave = (1 + math.sin(now / 300 + g['vmid'])) / 2
+        return {
+            'vmid': g['vmid'], 'name': g['name'], 'status': g['status'], 'tags': g['tags'],
+            'maxcpu': g['maxcpu'], 'maxmem': g['maxmem'], 'maxdisk': g['maxdisk'],
+            'cpu': g['cpu_base'] * wave if running else 0,
+            'mem': int(g['maxmem'] * g['mem_share']) if running else 0,
+            'disk': int(g['maxdisk'] * 0.4),
+            'netin': g['vmid'] * 1000 * int(now) if running else 0,
+            'netout': g['vmid'] * 500 * int(now) if running else 0,
+            'diskread': g['vmid'] * 200 * int(now) if running else 0,
+            'diskwrite': g['vmid'] * 100 * int(now) if running else 0,
+            'uptime': 3600 if running else 0,
+        }
+
+    def _node_view(self, node):
+        guests = [g for g in self.guests.values() if g['node'] == node and g['status'] == 'running']
+        maxmem = max(64 * GB, sum(g['maxmem'] for g in guests))
+        return {
+            'node': node, 'status': 'online', 'maxcpu': 32, 'maxmem': maxmem,
+            'cpu': min(1.0, sum(g['cpu_base'] for g in guests) / 32),
+            'mem': sum(int(g['maxmem'] * g['mem_share']) for g in guests),
+            'disk': 20 * GB, 'maxdisk': 100 * GB, 'uptime': 86400,
+        }
+
+    def _storage_view(self, node, s):
+        used = int(s['total'] * (0.3 if s['shared'] else 0.1 + 0.05 * (self.nodes.index(node) % 8)))
+        return {
+            'storage': s['storage'], 'type': s['type'], 'content': s['content'], 'shared': s['shared'],
+            'active': 1, 'enabled': 1, 'total': s['total'], 'used': used, 'avail': s['total'] - used,
+            'used_fraction': used / s['total'],
+        }
+
+    def resources(self, kind=None):
+        """/cluster/resources entries of the given type ('vm', 'node', 'storage' or all)."""
+        now = time.time()
+        entries = []
+        if kind in (None, 'node'):
+            entries += [dict(self._node_view(n), type='node', id=f"node/{n}") for n in self.nodes]
+        if kind in (None, 'vm'):
+            entries += [
+                dict(self._guest_view(g, now), type=g['type'], node=g['node'], template=0, id=f"{g['type']}/{g['vmid']}")
+                for g in self.guests.values()
+            ]
+        if kind in (None, 'storage'):
+            for n in self.nodes:
+                for s in self.storages:
+                    view = self._storage_view(n, s)
+                    entries.append({
+                        'type': 'storage', 'id': f"storage/{n}/{s['storage']}", 'node': n, 'storage': s['storage'],
+                        'plugintype': s['type'], 'content': s['content'], 'shared': s['shared'],
+                        'status': 'available', 'disk': view['used'], 'maxdisk': s['total'],
+                    })
+        return entries
+
+    def rrddata(self, timeframe, seed, keys):
+        """~70 rows of the timeframe ending now, one smooth curve per key."""
+        step = RRD_STEPS.get(timeframe, 60)
+        end = int(time.time()) // step * step
+        rows = []
+        for i in range(70):
+            t = end - (69 - i) * step
+            phase = (t / step + seed) / 7
+            rows.append({'time': t, **{k: scale * (1 + math.sin(phase)) / 2 for k, scale in keys.items()}})
+        return rows
+
+    # --- Tasks ---
+
+    def _task(self, node, task_type, task_id):
+        with self._lock:
+            self._pid += 1
+            now = int(time.time())
+            upid = f"UPID:{node}:{self._pid:08X}:{self._pid:08X}:{now:08X}:{task_type}:{task_id}:root@pam!bench:"
+            self.tasks[upid] = {'upid': upid, 'node': node, 'type': task_type, 'id': str(task_id),
+                                'user': 'root@pam!bench', 'starttime': now, 'end': time.time() + self.task_duration}
+        return upid
+
+    def _task_entry(self, task):
+        entry = {k: v for k, v in task.items() if k != 'end'}
+        if time.time() >= task['end']:
+            entry.update(endtime=max(int(task['end']), task['starttime']), status='OK')
+        else:
+            entry.update(status='running')
+        return entry
+
+    def power(self, node, vmid, action):
+        g = self.guests.get(vmid)
+        if g is None or g['node'] != node:
+            raise KeyError(f"Configuration file for {vmid} does not exist")
+        if action == 'start':
+            g['status'] = 'running'
+        elif action in ('stop', 'shutdown'):
+            g['status'] = 'stopped'
+        return self._task(node, f"qm{action}" if g['type'] == 'qemu' else f"vz{action}", vmid)
+
+    def power_node(self, node, endpoint, vms):
+        wanted = {int(v) for v in vms.split(',')} if vms else None
+        for g in self.guests.values():
+            if g['node'] == node and (wanted is None or g['vmid'] in wanted):
+                g['status'] = 'running' if endpoint == 'startall' else 'stopped'
+        return self._task(node, endpoint, '')
+
+    def snapshot(self, node, machine_type, vmid, snapname):
+        self._guest(node, machine_type, vmid)
+        self.guests[int(vmid)].setdefault('snapshots', []).append(snapname)
+        return self._task(node, 'qmsnapshot' if machine_type == 'qemu' else 'vzsnapshot', vmid)
+
+    def vzdump(self, node, vmid):
+        g = self.guests.get(int(vmid))
+        if g is None or g['node'] != node:
+            raise KeyError(f"unable to find VM '{vmid}'")
+        return self._task(node, 'vzdump', vmid)
+
+    # --- Routing ---
+
+    def route(self, method, path, args):
+        """
+        Answers one API call.
+
+        Returns:
+            tuple: (HTTP status, data).
+
+        Raises:
+            KeyError: For an unknown node, guest or storage (answered as a 500, like pveproxy).
+        """
+        for route_method, pattern, handler in self._routes():
+            if route_method == method:
+                match = pattern.fullmatch(path)
+                if match:
+                    return 200, handler(args, *match.groups())
+        return 501, None
+
+    def _routes(self):
+        guest = r'/nodes/([^/]+)/(qemu|lxc)/(\d+)'
+        return [
+            ('GET', re.compile(r'/version'), lambda a: {'version': '8.2.4', 'release': '8.2'}),
+            ('GET', re.compile(r'/nodes'), lambda a: [self._node_view(n) for n in self.nodes]),
+            ('GET', re.compile(r'/cluster/resources'), lambda a: self.resources(a.get('type'))),
+            ('GET', re.compile(r'/cluster/tasks'), lambda a: [self._task_entry(t) for t in list(self.tasks.values())[-1000:]]),
+            ('GET', re.compile(r'/nodes/([^/]+)/status'), lambda a, n: self._node_status(n)),
+            ('GET', re.compile(r'/nodes/([^/]+)/(qemu|lxc)'), self._list_guests),
+            ('GET', re.compile(guest + r'/status/current'), lambda a, n, t, v: self._guest(n, t, v)),
+            ('GET', re.compile(guest + r'/config'), self._config),
+            ('GET', re.compile(guest + r'/rrddata'), lambda a, n, t, v: self._guest_rrd(a, n, t, v)),
+            ('POST', re.compile(guest + r'/status/(start|stop|shutdown|reboot|suspend|resume)'),
+             lambda a, n, t, v, action: self.power(self._check_node(n), int(v), action)),
+            ('POST', re.compile(guest + r'/snapshot'), lambda a, n, t, v: self.snapshot(n, t, v, a.get('snapname'))),
+            ('POST', re.compile(r'/nodes/([^/]+)/vzdump'), lambda a, n: self.vzdump(self._check_node(n), a.get('vmid'))),
+            ('POST', re.compile(r'/nodes/([^/]+)/(startall|stopall)'),
+             lambda a, n, endpoint: self.power_node(self._check_node(n), endpoint, a.get('vms'))),
+            ('GET', re.compile(r'/nodes/([^/]+)/rrddata'),
+             lambda a, n: self.rrddata(a.get('timeframe'), self.nodes.index(self._check_node(n)),
+                                       {'cpu': 1, 'memused': 48 * GB, 'memtotal': 64 * GB, 'rootused': 20 * GB, 'roottotal': 100 * GB})),
+            ('GET', re.compile(r'/nodes/([^/]+)/storage'), lambda a, n: self._storages(n, a.get('content'))),
+            ('GET', re.compile(r'/nodes/([^/]+)/storage/([^/]+)/status'), lambda a, n, s: self._storage(n, s)),
+            ('GET', re.compile(r'/nodes/([^/]+)/storage/([^/]+)/content'), lambda a, n, s: self._content(n, s)),
+            ('GET', re.compile(r'/nodes/([^/]+)/storage/([^/]+)/rrddata'),
+             lambda a, n, s: self.rrddata(a.get('timeframe'), len(s), {'used': self._storage(n, s)['used'], 'total': self._storage(n, s)['total']})),
+            ('GET', re.compile(r'/nodes/([^/]+)/tasks'),
+             lambda a, n: [self._task_entry(t) for t in list(self.tasks.values()) if t['node'] == n][-500:]),
+            ('GET', re.compile(r'/nodes/([^/]+)/tasks/([^/]+)/status'), lambda a, n, upid: self._task_entry(self.tasks[upid])),
+        ]
+
+    def _check_node(self, node):
+        if node not in self.nodes:
+            raise KeyError(f"hostname lookup '{node}' failed")
+        return node
+
+    def _node_status(self, node):
+        view = self._node_view(self._check_node(node))
+        return {
+            'cpu': view['cpu'], 'cpuinfo': {'cpus': view['maxcpu']}, 'uptime': view['uptime'],
+            'memory': {'used': view['mem'], 'total': view['maxmem'], 'free': view['maxmem'] - view['mem']},
+            'rootfs': {'used': view['disk'], 'total': view['maxdisk']},
+        }
+
+    def _list_guests(self, args, node, machine_type):
+        self._check_node(node)
+        now = time.time()
+        return [self._guest_view(g, now) for g in self.guests.values() if g['node'] == node and g['type'] == machine_type]
+
+    def _guest(self, node, machine_type, vmid):
+        g = self.guests.get(int(vmid))
+        if g is None or g['node'] != node or g['type'] != machine_type:
+            raise KeyError(f"Configuration file '{machine_type}/{vmid}.conf' does not exist")
+        return self._guest_view(g, time.time())
+
+    def _config(self, args, node, machine_type, vmid):
+        g = self._guest(node, machine_type, vmid)
+        return {'name': g['name'], 'cores': g['maxcpu'], 'memory': g['maxmem'] // 1024**2, 'tags': g['tags'], 'onboot': 1}
+
+    def _guest_rrd(self, args, node, machine_type, vmid):
+        g = self._guest(node, machine_type, vmid)
+        return self.rrddata(args.get('timeframe'), int(vmid), {
+            'cpu': 0.6, 'mem': g['maxmem'] * 0.8, 'maxmem': g['maxmem'], 'netin': 2e6, 'netout': 1e6, 'diskread': 4e6, 'diskwrite': 2e6,
+        })
+
+    def _storages(self, node, content=None):
+        self._check_node(node)
+        return [self._storage_view(node, s) for s in self.storages if not content or content in s['content'].split(',')]
+
+    def _storage(self, node, storage):
+        for s in self.storages:
+            if s['storage'] == storage:
+                return self._storage_view(self._check_node(node), s)
+        raise KeyError(f"storage '{storage}' does not exist")
+
+    def _content(self, node, storage):
+        self._storage(node, storage)
+        return [{'volid': f"{storage}:iso/debian-12.{i}-amd64.iso", 'content': 'iso', 'format': 'iso', 'size': 600 * 1024**2} for i in range(5)]
+
+def client_env(url):
+    """dict: Client settings (PROXMOX_* variables) for a fake server at this URL."""
+    return {
+        'PROXMOX_URL': url,
+        'PROXMOX_USER': 'root@pam',
+        'PROXMOX_TOKEN_ID': 'bench',
+        'PROXMOX_TOKEN_SECRET': 'secret',
+        'PROXMOX_VERIFY_SSL': 'false',
+    }
+
+def self_signed_context():
+    """Server SSL context with a throwaway self-signed certificate for 127.0.0.1."""
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-pveproxy")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=7))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path, key_path = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+        with open(cert_path, "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(key_path, "wb") as f:
+            f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+    return context
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a slow answer (timeouts) close the TLS connection mid-request
+        pass
+
+class FakePveProxy:
+    """
+    HTTPS server answering the Proxmox API from a FakeCluster.
+
+    Counts the requests per method and path template, and can delay or fail
+    requests: `latency` (+ up to `jitter`) seconds each, extra `node_latency`
+    for the calls about given nodes, and a `failure_rate` of 500 answers.
+    """
+
+    def __init__(self, cluster=None, latency=0.0, jitter=0.0, failure_rate=0.0, node_latency=None, seed=0, host="127.0.0.1", port=0):
+        self.cluster = cluster or FakeCluster()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.node_latency = node_latency or {}
+        self.requests = {}
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        # Handshakes happen in the connection threads, not in the accept loop
+        self._server.socket = self_signed_context().wrap_socket(self._server.socket, server_side=True, do_handshake_on_connect=False)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"https://{host}:{port}"
+
+    def env(self):
+        """dict: Environment variables pointing the clients to this server."""
+        return client_env(self.url)
+
+    def request_count(self):
+        """int: Requests answered so far."""
+        with self._lock:
+            return sum(self.requests.values())
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-pveproxy", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _answer(self, method, raw_path, body):
+        url = urlparse(raw_path)
+        path = url.path.removeprefix('/api2/json')
+        args = dict(parse_qsl(url.query, keep_blank_values=True))
+        args.update(parse_qsl(body, keep_blank_values=True))
+        with self._lock:
+            key = (method, path_template(path))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            fail = self.failure_rate and self._rng.random() < self.failure_rate
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        match = re.match(r'/nodes/([^/]+)', path)
+        delay += self.node_latency.get(match.group(1), 0) if match else 0
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return 500, {'data': None, 'errors': {'fake': 'injected failure'}}
+        try:
+            status, data = self.cluster.route(method, path, args)
+        except KeyError as e:
+            return 500, {'data': None, 'errors': {'message': str(e).strip("'")}}
+        return status, {'data': data}
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately: without TCP_NODELAY,
+            # Nagle + delayed ACKs would add ~40 ms to every response
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode() if length else ''
+                status, payload = proxy._answer(self.command, self.path, body)
+                data = json.dumps(payload).encode()
+                with proxy._lock:
+                    proxy.bytes_sent += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Proxmox VE API server")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--guests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, up to this many seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--task-duration", type=float, default=0.0, help="seconds before a task finishes")
+    parser.add_argument("--port", type=int, default=8006)
+    args = parser.parse_args()
+
+    cluster = FakeCluster(args.nodes, args.guests, task_duration=args.task_duration)
+    proxy = FakePveProxy(cluster, args.latency, args.jitter, args.failure_rate, port=args.port).start()
+    print(f"🧪 Faux pveproxy sur {proxy.url} : {args.nodes} nœud(s), {args.guests} invité(s)")
+    for k, v in proxy.env().items():
+        print(f"   {k}={v}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        proxy.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Load test of the REST API (src/api.py) against the fake pveproxy.
+
+Starts the fake Proxmox backend and the API (uvicorn) as subprocesses, drives
+the API with N concurrent clients for a while, then reports throughput,
+p50/p95/p99 latency, errors and Proxmox API calls per request (read from
+/stats/calls) per endpoint. A run saved as JSON can be compared to a later one
+to flag regressions.
+
+Usage:
+    python -m tests.load_api --concurrency 20 --duration 15 --save baseline.json
+    python -m tests.load_api --concurrency 20 --duration 15 --compare baseline.json
+    python -m tests.load_api --url http://localhost:8000 --endpoints /machines   # existing API
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from contextlib import contextmanager
+import httpx
+from src.rrd import percentile
+from tests.fake_pveproxy import client_env
+
+DEFAULT_ENDPOINTS = ['/machines', '/storage', '/infrastructure']
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"le processus s'est arrêté (code {process.returncode})")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"port {port} toujours fermé après {timeout}s")
+
+@contextmanager
+def spawn(args, port, env=None):
+    """Runs a Python module in a subprocess until the block exits, once its port accepts connections."""
+    process = subprocess.Popen([sys.executable, "-m", *args], env=dict(os.environ, **(env or {})),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+async def upstream_calls(http):
+    """int: Proxmox API calls made so far by the API (None if /stats/calls is unavailable)."""
+    try:
+        resp = await http.get("/stats/calls", params={'slowest': 0})
+        resp.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    return sum(e['calls'] for e in resp.json()['endpoints'])
+
+async def drive(url, endpoints, concurrency, duration, revalidate=False):
+    """
+    Sends requests from `concurrency` workers, cycling through the endpoints, for `duration` seconds.
+
+    With `revalidate`, each worker sends back the last ETag of an endpoint in
+    If-None-Match, like a polling dashboard (a 304 counts as a success).
+
+    Returns:
+        tuple: (samples [(endpoint, status, seconds)], elapsed seconds, upstream calls or None).
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        # Warm-up: opens the Proxmox connection pool and fills the location index
+        for endpoint in endpoints:
+            await http.get(endpoint)
+        before = await upstream_calls(http)
+        samples = []
+        start = time.perf_counter()
+        stop_at = start + duration
+
+        async def worker(offset):
+            i = offset
+            etags = {}
+            while time.perf_counter() < stop_at:
+                endpoint = endpoints[i % len(endpoints)]
+                i += 1
+                headers = {'If-None-Match': etags[endpoint]} if endpoint in etags else {}
+                sent = time.perf_counter()
+                try:
+                    resp = await http.get(endpoint, headers=headers)
+                    status = resp.status_code
+                    if revalidate and 'etag' in resp.headers:
+                        etags[endpoint] = resp.headers['etag']
+                except httpx.HTTPError:
+                    status = 0
+                samples.append((endpoint, status, time.perf_counter() - sent))
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        after = await upstream_calls(http)
+    upstream = after - before if before is not None and after is not None else None
+    return samples, elapsed, upstream
+
+def summarize(samples, elapsed, upstream=None):
+    """
+    Aggregates load samples.
+
+    Args:
+        samples (list): (endpoint, status, seconds) tuples; status 0 or >= 400 counts as an error.
+        elapsed (float): Wall time of the run.
+        upstream (int, optional): Proxmox API calls made during the run.
+
+    Returns:
+        dict: requests, errors, throughput (req/s), p50/p95/p99 (seconds) and
+              upstream_per_request, overall and per endpoint.
+    """
+    def stats(group):
+        ordered = sorted(s[2] for s in group)
+        return {
+            'requests': len(group),
+            'errors': sum(1 for s in group if not 0 < s[1] < 400),
+            'throughput': len(group) / elapsed if elapsed else 0.0,
+            'p50': percentile(ordered, 0.50) if ordered else None,
+            'p95': percentile(ordered, 0.95) if ordered else None,
+            'p99': percentile(ordered, 0.99) if ordered else None,
+        }
+
+    summary = stats(samples)
+    summary['upstream_per_request'] = upstream / len(samples) if upstream is not None and samples else None
+    summary['endpoints'] = {
+        endpoint: stats([s for s in samples if s[0] == endpoint])
+        for endpoint in sorted({s[0] for s in samples})
+    }
+    return summary
+
+def compare(current, baseline, tolerance=0.10):
+    """
+    Lists the regressions of a run against a baseline run.
+
+    A regression is a throughput lower, or a p95/p99 latency or an error count
+    higher, by more than `tolerance` (relative), overall or for an endpoint.
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none).
+    """
+    regressions = []
+
+    def check(scope, now, before):
+        if before['throughput'] and now['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{scope} : débit {now['throughput']:.1f} req/s contre {before['throughput']:.1f}")
+        for q in ('p95', 'p99'):
+            if before[q] and now[q] and now[q] > before[q] * (1 + tolerance):
+                regressions.append(f"{scope} : {q} {now[q] * 1000:.1f} ms contre {before[q] * 1000:.1f} ms")
+        if now['errors'] > before['errors'] * (1 + tolerance):
+            regressions.append(f"{scope} : {now['errors']} erreur(s) contre {before['errors']}")
+
+    check("global", current, baseline)
+    for endpoint, now in current['endpoints'].items():
+        if endpoint in baseline['endpoints']:
+            check(endpoint, now, baseline['endpoints'][endpoint])
+    return regressions
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+def print_summary(summary):
+    print(f"{'endpoint':<20} {'requêtes':>9} {'erreurs':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(summary['endpoints'].items()) + [('(total)', summary)]
+    for endpoint, s in rows:
+        print(f"{endpoint:<20} {s['requests']:>9} {s['errors']:>8} {s['throughput']:>8.1f} {_ms(s['p50']):>8} {_ms(s['p95']):>8} {_ms(s['p99']):>8}")
+    if summary['upstream_per_request'] is not None:
+        print(f"Appels Proxmox par requête : {summary['upstream_per_request']:.2f}")
+
+async def run(args):
+    endpoints = args.endpoints
+    if args.url:
+        samples, elapsed, upstream = await drive(args.url, endpoints, args.concurrency, args.duration, args.revalidate)
+        return summarize(samples, elapsed, upstream)
+
+    proxy_port, api_port = free_port(), free_port()
+    env = dict(client_env(f"https://127.0.0.1:{proxy_port}"), PROXMOX_HISTORY_DB="")
+    if args.no_cache:
+        env['PROXMOX_CACHE_SIZE'] = "0"
+    fake = ["tests.fake_pveproxy", "--nodes", str(args.nodes), "--guests", str(args.guests),
+            "--latency", str(args.latency), "--port", str(proxy_port)]
+    api = ["uvicorn", "src.api:app", "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning"]
+    with spawn(fake, proxy_port), spawn(api, api_port, env):
+        samples, elapsed, upstream = await drive(f"http://127.0.0.1:{api_port}", endpoints, args.concurrency, args.duration, args.revalidate)
+    return summarize(samples, elapsed, upstream)
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API REST")
+    parser.add_argument("--url", help="API déjà démarrée (sinon faux pveproxy + uvicorn locaux)")
+    parser.add_argument("--endpoints", type=lambda v: v.split(','), default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=10, help="clients simultanés")
+    parser.add_argument("--duration", type=float, default=10, help="durée de la mesure (s)")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--guests", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.002, help="latence du faux pveproxy (s)")
+    parser.add_argument("--no-cache", action="store_true", help="désactive le cache d'inventaire de l'API")
+    parser.add_argument("--revalidate", action="store_true", help="renvoie les ETag reçus (If-None-Match), comme un tableau de bord")
+    parser.add_argument("--save", help="fichier où écrire le résumé JSON")
+    parser.add_argument("--compare", help="résumé JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="écart relatif toléré avant régression")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    summary['settings'] = {k: getattr(args, k) for k in ('url', 'endpoints', 'concurrency', 'duration', 'nodes', 'guests', 'latency', 'no_cache', 'revalidate')}
+    print_summary(summary)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"✅ Résumé écrit dans {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) par rapport à {args.compare} :")
+            for r in regressions:
+                print(f"   - {r}")
+            return 1
+        print(f"✅ Pas de régression par rapport à {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from src.server import get_console_url
 
@@ -9,5 +10,5 @@ VMID = 200
 NODE = 'proxmox'
 
 print(f"Génération du lien pour la VM {VMID}...")
-result = get_console_url(vmid=VMID, node=NODE, type='qemu')
+result = asyncio.run(get_console_url(vmid=VMID, node=NODE, type='qemu'))
 print(result)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from src.server import get_vm_agent_network
 
@@ -10,5 +11,5 @@ VMID = 200
 NODE = 'proxmox'
 
 print(f"Tentative de récupération des IPs pour la VM {VMID}...")
-result = get_vm_agent_network(vmid=VMID, node=NODE)
+result = asyncio.run(get_vm_agent_network(vmid=VMID, node=NODE))
 print(result)
@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from src.anomaly import AnomalyDetector, annotate, detect_from_rrd
+from src.history import HistoryCollector
+
+# A guest idling around 10% CPU, spiking to 90% for two samples at t=20-21
+BASELINE = [{'time': 60 * t, 'cpu': 0.10 + (0.01 if t % 2 else -0.01)} for t in range(30)]
+SPIKE = [dict(p, cpu=0.9) if 20 <= i <= 21 else p for i, p in enumerate(BASELINE)]
+
+class TestAnomaly(unittest.TestCase):
+
+    def test_spike_opens_and_closes_window(self):
+        detector = AnomalyDetector(alpha=0.1, threshold=3, warmup=10, history=10)
+
+        # Execute
+        for p in SPIKE[:21]:
+            detector.observe(100, p['time'], p)
+        active = detector.anomalies(active_only=True)
+        for p in SPIKE[21:]:
+            detector.observe(100, p['time'], p)
+        closed = detector.anomalies()
+
+        # Verify
+        self.assertEqual([(w['metric'], w['start'], w['active']) for w in active], [('cpu', 1200, True)])
+        self.assertEqual(len(closed), 1)
+        self.assertEqual((closed[0]['start'], closed[0]['end'], closed[0]['samples'], closed[0]['active']), (1200, 1260, 2, False))
+        self.assertAlmostEqual(closed[0]['peak'], 0.9)
+        self.assertEqual(detector.anomalies(active_only=True), [])
+        self.assertEqual(detector.anomalies(since=2000), [])
+        self.assertEqual(detector.stats(), {'baselines': 1, 'active': 0, 'closed': 1})
+        print("✅ Test Fenêtre d'anomalie (ouverture, fermeture) passé.")
+
+    def test_flat_baseline_and_warmup(self):
+        flat = [{'time': t, 'cpu': 0.05} for t in range(20)]
+
+        # Execute
+        blip = detect_from_rrd({100: flat + [{'time': 20, 'cpu': 0.06}]})
+        early = detect_from_rrd({101: flat[:3] + [{'time': 3, 'cpu': 0.9}]}, warmup=10)
+        real = detect_from_rrd({102: flat + [{'time': 20, 'cpu': 0.5}]})
+
+        # Verify
+        self.assertEqual(blip.anomalies(), [])  # MIN_STD: no z-score explosion on a flat line
+        self.assertEqual(early.anomalies(), [])
+        self.assertEqual([w['vmid'] for w in real.anomalies()], [102])
+        print("✅ Test Ligne de base plate et préchauffage passé.")
+
+    def test_collector_feeds_detector(self):
+        client = MagicMock()
+        client.get_cluster_resources = AsyncMock()
+        detector = MagicMock()
+        collector = HistoryCollector(client, None, interval=60, detector=detector)
+        client.get_cluster_resources.return_value = [
+            {'type': 'qemu', 'vmid': 100, 'status': 'running', 'cpu': 0.5, 'netin': 0},
+            {'type': 'lxc', 'vmid': 101, 'status': 'stopped', 'cpu': 0},
+        ]
+
+        # Execute
+        count = asyncio.run(collector.sample())
+        windows = annotate(
+            [{'vmid': 100, 'metric': 'cpu'}, {'vmid': 999, 'metric': 'cpu'}],
+            [{'vmid': 100, 'name': 'web', 'node': 'pve1', 'type': 'qemu', 'tags': 'prod'}],
+            tag='prod'
+        )
+
+        # Verify
+        self.assertEqual(count, 2)
+        ts, rows = detector.observe_rows.call_args.args
+        self.assertEqual([r['vmid'] for r in rows], [100])
+        self.assertEqual(windows, [{'vmid': 100, 'metric': 'cpu', 'name': 'web', 'node': 'pve1', 'type': 'qemu'}])
+        print("✅ Test Collecteur alimentant la détection passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import asyncio
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs
+import httpx
+from proxmoxer.core import ResourceException
+from src.async_client import AsyncProxmoxClient
+
+class TestAsyncClient(unittest.TestCase):
+
+    def make_client(self, handler):
+        with patch.dict('os.environ', {
+            'PROXMOX_URL': 'https://test.proxmox.com:8006',
+            'PROXMOX_USER': 'root@pam',
+            'PROXMOX_TOKEN_ID': 'test-id',
+            'PROXMOX_TOKEN_SECRET': 'test-secret',
+            'PROXMOX_VERIFY_SSL': 'false'
+        }):
+            return AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+    def test_set_machine_state(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={'data': 'UPID:pve1:0001:start'})
+
+        client = self.make_client(handler)
+
+        # Execute
+        upid = asyncio.run(client.set_machine_state("pve1", 100, "qemu", "start"))
+
+        # Verify
+        self.assertEqual(upid, 'UPID:pve1:0001:start')
+        self.assertEqual(requests[0].method, 'POST')
+        self.assertEqual(requests[0].url.path, '/api2/json/nodes/pve1/qemu/100/status/start')
+        self.assertEqual(requests[0].headers['Authorization'], 'PVEAPIToken=root@pam!test-id=test-secret')
+        print("✅ Test Async set_machine_state passé.")
+
+    def test_post_form_data_and_errors(self):
+        def handler(request):
+            if request.url.path.endswith('/clone'):
+                return httpx.Response(200, json={'data': parse_qs(request.content.decode())})
+            return httpx.Response(500, json={'data': None, 'errors': {'vmid': 'locked'}})
+
+        client = self.make_client(handler)
+
+        # Execute
+        form = asyncio.run(client.clone_machine("pve1", 9000, 101, "web", "qemu"))
+
+        # Verify
+        self.assertEqual(form, {'newid': ['101'], 'name': ['web']})
+        with self.assertRaises(ResourceException):
+            asyncio.run(client.get_machine_config("pve1", 100, "qemu"))
+        print("✅ Test Async formulaire & erreurs passé.")
+
+    def test_get_all_machines_concurrent_fallback(self):
+        def handler(request):
+            path = request.url.path
+            if path.endswith('/cluster/resources'):
+                return httpx.Response(403, json={'data': None})
+            if path.endswith('/nodes'):
+                return httpx.Response(200, json={'data': [{'node': 'pve1'}, {'node': 'pve2'}]})
+            if path == '/api2/json/nodes/pve1/qemu':
+                return httpx.Response(200, json={'data': [{'vmid': 100}]})
+            if path == '/api2/json/nodes/pve2/lxc':
+                return httpx.Response(500, json={'data': None})
+            return httpx.Response(200, json={'data': []})
+
+        client = self.make_client(handler)
+
+        # Execute
+        machines = asyncio.run(client.get_all_machines())
+
+        # Verify
+        self.assertEqual(machines, [{'vmid': 100, 'node': 'pve1', 'type': 'qemu'}])
+        self.assertEqual([(f['node'], f['resource']) for f in machines.failures], [('pve2', 'lxc')])
+        print("✅ Test Async get_all_machines (fan-out) passé.")
+
+    def test_unreachable_node_status(self):
+        def handler(request):
+            if request.url.path.endswith('/cluster/resources'):
+                return httpx.Response(403, json={'data': None})
+            if request.url.path.endswith('/nodes'):
+                return httpx.Response(200, json={'data': [{'node': 'pve1'}, {'node': 'pve2'}]})
+            if request.url.path.startswith('/api2/json/nodes/pve2'):
+                return httpx.Response(595, text="595 No route to host")
+            return httpx.Response(200, json={'data': [{'vmid': 100}]})
+
+        client = self.make_client(handler)
+
+        # Execute
+        with self.assertRaises(ResourceException) as ctx:
+            asyncio.run(client.get_node_resources("pve2"))
+        machines = asyncio.run(client.get_all_machines())
+
+        # Verify
+        self.assertEqual(ctx.exception.status_code, 595)
+        self.assertEqual(ctx.exception.status_message, 'Errors during connection establishment, proxy handshake')
+        self.assertEqual(len(machines), 2)
+        self.assertEqual({(f['node'], f['reason']) for f in machines.failures}, {('pve2', 'error')})
+        self.assertTrue(all(f['error'].startswith('595 Errors during connection') for f in machines.failures))
+        print("✅ Test Nœud injoignable (statut 595) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
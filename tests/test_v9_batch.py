@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import src.api as api
+from src.async_client import AsyncProxmoxClient
+from src.batch import plan_batch, run_batch
+from tests.fake_pveproxy import FakeCluster, FakePveProxy
+
+class TestBatchPlan(unittest.TestCase):
+
+    def test_dependencies_first(self):
+        # Execute
+        plan = plan_batch([
+            {'id': 'backup', 'action': 'backup', 'params': {'vmid': 100, 'storage': 'local'}, 'depends_on': ['snap']},
+            {'action': 'start', 'params': {'vmid': 101}},
+            {'id': 'snap', 'action': 'snapshot', 'params': {'vmid': 100, 'snapname': 'pre'}},
+        ])
+
+        # Verify
+        self.assertEqual([op.id for _, op, _ in plan], ['1', 'snap', 'backup'])
+        self.assertEqual([position for position, _, _ in plan], [1, 2, 0])
+        self.assertEqual(plan[1][2].snapname, 'pre')
+        print("✅ Test Ordre du lot (dépendances d'abord) passé.")
+
+    def test_invalid_batches(self):
+        cases = {
+            'inconnue': [{'action': 'destroy', 'params': {'vmid': 100}}],
+            'snapshot': [{'action': 'snapshot', 'params': {'vmid': 100}}],  # snapname missing
+            'double': [{'id': 'a', 'action': 'start', 'params': {'vmid': 1}}, {'id': 'a', 'action': 'start', 'params': {'vmid': 2}}],
+            'ghost': [{'action': 'start', 'params': {'vmid': 1}, 'depends_on': ['ghost']}],
+            'circulaires': [{'id': 'a', 'action': 'start', 'params': {'vmid': 1}, 'depends_on': ['b']},
+                            {'id': 'b', 'action': 'start', 'params': {'vmid': 2}, 'depends_on': ['a']}],
+            'aucune': [],
+        }
+        for expected, operations in cases.items():
+            # Execute / Verify
+            with self.assertRaises(ValueError) as ctx:
+                plan_batch(operations)
+            self.assertIn(expected, str(ctx.exception))
+        print("✅ Test Lots invalides refusés passé.")
+
+class TestBatchRun(unittest.TestCase):
+    """Batches run against the fake pveproxy."""
+
+    def setUp(self):
+        self.proxy = FakePveProxy(FakeCluster(nodes=2, guests=20)).start()
+        self.env = patch.dict('os.environ', dict(self.proxy.env(), PROXMOX_TASK_POLL_INTERVAL="0.05"))
+        self.env.start()
+        guests = self.proxy.cluster.guests
+        self.qemu = [v for v, g in guests.items() if g['type'] == 'qemu'][:3]
+
+    def tearDown(self):
+        self.env.stop()
+        self.proxy.stop()
+
+    def test_run_with_dependencies(self):
+        first, second, third = self.qemu
+        operations = [
+            {'id': 'snap', 'action': 'snapshot', 'params': {'vmid': first, 'snapname': 'pre-upgrade'}},
+            {'id': 'backup', 'action': 'backup', 'params': {'vmid': first, 'storage': 'local'}, 'depends_on': ['snap']},
+            {'id': 'start', 'action': 'start', 'params': {'vmid': second}},
+            {'id': 'ghost', 'action': 'reboot', 'params': {'vmid': 99999}},
+            {'id': 'after-ghost', 'action': 'stop', 'params': {'vmid': third, 'force': True}, 'depends_on': ['ghost']},
+        ]
+
+        async def scenario():
+            client = AsyncProxmoxClient()
+            try:
+                return await run_batch(client, operations)
+            finally:
+                await client.aclose()
+
+        # Execute
+        results = asyncio.run(scenario())
+
+        # Verify
+        by_id = {r['id']: r for r in results}
+        self.assertEqual([r['id'] for r in results], ['snap', 'backup', 'start', 'ghost', 'after-ghost'])
+        self.assertEqual(by_id['snap']['status'], 'ok')
+        self.assertTrue(by_id['snap']['task']['success'])  # waited for: the backup depends on it
+        self.assertIsNone(by_id['start']['task'])
+        self.assertTrue(by_id['backup']['upid'].startswith('UPID:'))
+        self.assertEqual(by_id['ghost']['status'], 'error')
+        self.assertEqual(by_id['after-ghost']['status'], 'skipped')
+        self.assertEqual(self.proxy.cluster.guests[first]['snapshots'], ['pre-upgrade'])
+        self.assertEqual(self.proxy.cluster.guests[second]['status'], 'running')
+        task_types = [t['type'] for t in self.proxy.cluster.tasks.values()]
+        self.assertLess(task_types.index('qmsnapshot'), task_types.index('vzdump'))
+        self.assertNotIn('qmstop', task_types)
+        print("✅ Test Lot concurrent avec dépendances passé.")
+
+    def test_endpoint(self):
+        previous, api.proxmox = api.proxmox, AsyncProxmoxClient()
+        http = TestClient(api.app).__enter__()
+        try:
+            # Execute
+            ok = http.post('/batch', json={'operations': [
+                {'action': 'start', 'params': {'vmid': vmid}} for vmid in self.qemu
+            ], 'wait': True})
+            bad = http.post('/batch', json={'operations': [{'action': 'snapshot', 'params': {'vmid': 100}}]})
+        finally:
+            http.__exit__(None, None, None)
+            api.proxmox = previous
+
+        # Verify
+        self.assertEqual(ok.status_code, 200)
+        self.assertEqual([r['status'] for r in ok.json()], ['ok'] * 3)
+        self.assertTrue(all(r['task']['success'] for r in ok.json()))
+        self.assertEqual(bad.status_code, 400)
+        print("✅ Test Endpoint /batch passé.")
+
+if __name__ == '__main__':
+    unittest.main()
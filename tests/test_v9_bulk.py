@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs
+import httpx
+from src.async_client import AsyncProxmoxClient
+from src.bulk import select_machines
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+RESOURCES = [
+    {'type': 'qemu', 'vmid': 100, 'node': 'pve1', 'name': 'web-1', 'tags': 'prod;web'},
+    {'type': 'lxc', 'vmid': 101, 'node': 'pve1', 'name': 'web-2', 'tags': 'prod'},
+    {'type': 'qemu', 'vmid': 102, 'node': 'pve2', 'name': 'db-1', 'tags': 'prod'},
+    {'type': 'qemu', 'vmid': 103, 'node': 'pve2', 'name': 'test-1', 'tags': 'dev'},
+    {'type': 'qemu', 'vmid': 900, 'node': 'pve2', 'name': 'tpl', 'tags': 'prod', 'template': 1},
+]
+
+def make_client(handler, **env):
+    with patch.dict('os.environ', dict(ENV, **env)):
+        return AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+class TestBulkPower(unittest.TestCase):
+
+    def test_bulk_start_by_tag(self):
+        posts = []
+
+        def handler(request):
+            path = request.url.path.replace('/api2/json', '', 1)
+            if path == '/cluster/resources':
+                return httpx.Response(200, json={'data': RESOURCES})
+            posts.append((path, parse_qs(request.content.decode())))
+            if path.endswith('/startall'):
+                return httpx.Response(200, json={'data': "UPID:pve1:00000001:00000001:65000000:startall::root@pam:"})
+            return httpx.Response(200, json={'data': "UPID:pve2:00000002:00000002:65000000:qmstart:102:root@pam:"})
+
+        client = make_client(handler)
+
+        # Execute
+        results = asyncio.run(client.bulk_set_machine_state('start', tag='prod', vmids=[100, 101, 102, 999]))
+
+        # Verify
+        self.assertEqual(sorted(posts), [('/nodes/pve1/startall', {'vms': ['100,101'], 'force': ['1']}),
+                                         ('/nodes/pve2/qemu/102/status/start', {})])
+        self.assertEqual([(r['vmid'], r['via'], r['status']) for r in results],
+                         [(100, 'startall', 'ok'), (101, 'startall', 'ok'), (102, 'status', 'ok'), (999, None, 'error')])
+        self.assertEqual(len(client.tasks.pending()), 2)
+        print("✅ Test Démarrage groupé (startall + status) passé.")
+
+    def test_per_node_concurrency_cap(self):
+        active = {'pve1': 0, 'pve2': 0}
+        peak = {'pve1': 0, 'pve2': 0}
+
+        async def handler(request):
+            path = request.url.path.replace('/api2/json', '', 1)
+            if path == '/cluster/resources':
+                return httpx.Response(200, json={'data': RESOURCES})
+            node = path.split('/')[2]
+            active[node] += 1
+            peak[node] = max(peak[node], active[node])
+            await asyncio.sleep(0.05)
+            active[node] -= 1
+            return httpx.Response(200, json={'data': None})
+
+        client = make_client(handler, PROXMOX_BULK_PER_NODE='1')
+
+        # Execute
+        results = asyncio.run(client.bulk_set_machine_state('reboot', name_pattern='*-*'))
+
+        # Verify
+        self.assertEqual([r['vmid'] for r in results], [100, 101, 102, 103])
+        self.assertEqual(peak, {'pve1': 1, 'pve2': 1})
+        print("✅ Test Limite de concurrence par nœud passé.")
+
+    def test_unanswered_calls_reported_unknown(self):
+        async def handler(request):
+            path = request.url.path.replace('/api2/json', '', 1)
+            if path == '/cluster/resources':
+                return httpx.Response(200, json={'data': RESOURCES})
+            if '/102/' in path:
+                await asyncio.sleep(1)  # sent, then cut by the fan-out deadline
+            if '/101/' in path:
+                raise httpx.ReadTimeout("timed out", request=request)
+            if '/103/' in path:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={'data': "UPID:pve1:00000001:00000001:65000000:qmreboot:100:root@pam:"})
+
+        client = make_client(handler, PROXMOX_NODE_TIMEOUT='0.2')
+
+        # Execute
+        results = asyncio.run(client.bulk_set_machine_state('reboot', name_pattern='*-*'))
+
+        # Verify
+        self.assertEqual([(r['vmid'], r['status']) for r in results],
+                         [(100, 'ok'), (101, 'unknown'), (102, 'unknown'), (103, 'error')])
+        self.assertIn("avant de relancer", results[2]['error'])
+        print("✅ Test Commandes envoyées sans réponse (résultat inconnu) passé.")
+
+    def test_selection_requires_criterion(self):
+        with self.assertRaises(ValueError):
+            select_machines(RESOURCES)
+        self.assertEqual([m['vmid'] for m in select_machines(RESOURCES, name_pattern='web-*')], [100, 101])
+        print("✅ Test Sélection (critère obligatoire, motif) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import time
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from proxmoxer.core import ResourceException
+from src.async_client import AsyncProxmoxClient
+from src.cache import TTLCache
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+def make_client(handler):
+    with patch.dict('os.environ', ENV):
+        return AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+class TestInventoryCache(unittest.TestCase):
+
+    def test_config_cached_and_invalidated(self):
+        requests = []
+
+        def handler(request):
+            requests.append((request.method, request.url.path))
+            if request.method == 'GET':
+                return httpx.Response(200, json={'data': {'cores': 2}})
+            return httpx.Response(200, json={'data': None})
+
+        client = make_client(handler)
+
+        async def scenario():
+            await client.get_machine_config("pve1", 100, "qemu")
+            await client.get_machine_config("pve1", 100, "qemu")
+            await client.resize_machine_resources("pve1", 100, "qemu", cores=4)
+            await client.get_machine_config("pve1", 100, "qemu")
+
+        # Execute
+        asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(requests.count(('GET', '/api2/json/nodes/pve1/qemu/100/config')), 2)
+        stats = client.get_cache_stats()['kinds']['config']
+        self.assertEqual((stats['hits'], stats['misses'], stats['invalidations']), (1, 2, 1))
+        print("✅ Test Cache config + invalidation passé.")
+
+    def test_failed_mutation_keeps_cache(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request.url.path)
+            if request.method == 'POST':
+                return httpx.Response(500, json={'data': None})
+            return httpx.Response(200, json={'data': [{'type': 'qemu', 'vmid': 100, 'node': 'pve1'}]})
+
+        client = make_client(handler)
+
+        async def scenario():
+            await client.get_all_machines()
+            with self.assertRaises(ResourceException):
+                await client.set_machine_state("pve1", 100, "qemu", "start")
+            await client.get_all_machines()
+
+        # Execute
+        asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(requests.count('/api2/json/cluster/resources'), 1)
+        print("✅ Test Cache conservé si la mutation échoue passé.")
+
+    def test_ttl_and_lru(self):
+        cache = TTLCache(maxsize=2, ttls={'config': 0.05})
+
+        # Execute
+        cache.set(('config', 'pve1', 100, 'qemu'), 'a', tags=[('vmid', 100)])
+        cache.set(('config', 'pve1', 101, 'qemu'), 'b', tags=[('vmid', 101)])
+        cache.get(('config', 'pve1', 100, 'qemu'))
+        cache.set(('config', 'pve1', 102, 'qemu'), 'c', tags=[('vmid', 102)])
+
+        # Verify: 101 was the least recently used entry
+        self.assertEqual(cache.get(('config', 'pve1', 101, 'qemu')), (False, None))
+        self.assertEqual(cache.get(('config', 'pve1', 100, 'qemu')), (True, 'a'))
+        time.sleep(0.06)
+        self.assertEqual(cache.get(('config', 'pve1', 102, 'qemu')), (False, None))
+        self.assertEqual(cache.stats()['kinds']['config']['evictions'], 1)
+        print("✅ Test Cache TTL & LRU passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from src.callstats import CallStats, trace_phases
+
+class TestCallStats(unittest.TestCase):
+
+    def test_endpoint_stats_and_slowest(self):
+        stats = CallStats(window=3, recent=10)
+
+        # Execute
+        for vmid, total in ((100, 0.1), (101, 0.2), (102, 0.3), (103, 0.4)):
+            stats.record('GET', f'/nodes/pve1/qemu/{vmid}/config', 200, {'server': total / 2, 'total': total}, 100, {'current': 1})
+        stats.record('POST', '/nodes/pve1/qemu/100/config', 500, {'total': 1.5}, 10, {'cipassword': 'hunter2', 'ciuser': 'admin'})
+        snapshot = stats.snapshot(slowest=2)
+
+        # Verify
+        post, get = snapshot['endpoints']
+        self.assertEqual((post['method'], post['path'], post['errors']), ('POST', '/nodes/{node}/qemu/{vmid}/config', 1))
+        self.assertEqual((get['calls'], get['bytes'], get['p50'], get['max']), (4, 400, 0.3, 0.4))  # window keeps 0.2-0.4
+        self.assertAlmostEqual(get['mean']['server'], 0.125)
+        self.assertIsNone(get['mean']['connect'])
+        self.assertEqual([c['total'] for c in snapshot['slowest']], [1.5, 0.4])
+        self.assertEqual(snapshot['slowest'][0]['args'], {'cipassword': '***', 'ciuser': 'admin'})
+        print("✅ Test Statistiques par endpoint (fenêtre, masquage des secrets) passé.")
+
+    def test_trace_phases(self):
+        marks = {
+            'connect_tcp.started': 0.0, 'connect_tcp.complete': 0.01,
+            'start_tls.started': 0.01, 'start_tls.complete': 0.03,
+            'send_request_headers.started': 0.03, 'receive_response_headers.complete': 0.13,
+            'receive_response_body.started': 0.13, 'receive_response_body.complete': 0.15,
+        }
+        pooled = {k: v for k, v in marks.items() if not k.startswith(('connect', 'start_tls'))}
+
+        # Execute
+        fresh = trace_phases(marks)
+        reused = trace_phases(pooled)
+
+        # Verify
+        self.assertAlmostEqual(fresh['connect'], 0.03)
+        self.assertAlmostEqual(fresh['server'], 0.10)
+        self.assertAlmostEqual(fresh['transfer'], 0.02)
+        self.assertEqual(reused['connect'], 0.0)
+        self.assertEqual(trace_phases({}), {})
+        print("✅ Test Phases d'appel (connexion, serveur, transfert) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from fastapi.testclient import TestClient
+import src.api as api
+from src.events import snapshot, diff_snapshots, ClusterWatcher
+
+def resources(status='running', node='pve1', disk=50, node_status='online'):
+    return [
+        {'type': 'node', 'node': 'pve1', 'status': node_status},
+        {'type': 'node', 'node': 'pve2', 'status': 'online'},
+        {'type': 'qemu', 'vmid': 100, 'name': 'web1', 'node': node, 'status': status},
+        {'type': 'lxc', 'vmid': 200, 'name': 'db1', 'node': 'pve2', 'status': 'running'},
+        {'type': 'qemu', 'vmid': 900, 'name': 'tpl', 'node': 'pve1', 'status': 'stopped', 'template': 1},
+        {'type': 'storage', 'storage': 'ceph', 'node': 'pve1', 'shared': 1, 'disk': disk, 'maxdisk': 100},
+        {'type': 'storage', 'storage': 'ceph', 'node': 'pve2', 'shared': 1, 'disk': disk, 'maxdisk': 100},
+    ]
+
+class FakeClient:
+    """Async client serving a mutable /cluster/resources and /cluster/tasks listing."""
+
+    def __init__(self):
+        self.resources = resources()
+        self.tasks = [{'upid': 'UPID:pve1:1', 'node': 'pve1', 'type': 'qmstart', 'id': '100', 'status': 'OK', 'endtime': 10}]
+        self.calls = 0
+
+    async def get_cluster_resources(self, resource_type=None):
+        self.calls += 1
+        return self.resources
+
+    async def get_cluster_tasks(self):
+        return self.tasks
+
+class TestEvents(unittest.TestCase):
+
+    def test_diff_snapshots(self):
+        # Execute
+        before = snapshot(resources(), [{'upid': 'A', 'endtime': 1}, {'upid': 'B'}])
+        after = snapshot(resources(status='stopped', node='pve2', disk=95, node_status='offline'),
+                         [{'upid': 'A', 'endtime': 1}, {'upid': 'B', 'endtime': 5, 'type': 'vzdump', 'status': 'OK'}])
+        events = diff_snapshots(before, after, threshold=0.9)
+        back = diff_snapshots(after, before, threshold=0.9)
+
+        # Verify
+        types = [e['type'] for e in events]
+        self.assertEqual(sorted(types), ['guest_migrated', 'guest_stopped', 'node_offline', 'storage_threshold', 'task_finished'])
+        stopped = next(e for e in events if e['type'] == 'guest_stopped')
+        self.assertEqual((stopped['vmid'], stopped['previous']), (100, 'running'))
+        self.assertEqual(next(e for e in events if e['type'] == 'guest_migrated')['source'], 'pve1')
+        self.assertEqual(next(e for e in events if e['type'] == 'task_finished')['upid'], 'B')
+        self.assertEqual(sorted(e['type'] for e in back),
+                         ['guest_migrated', 'guest_started', 'node_online', 'storage_recovered'])
+        self.assertEqual(diff_snapshots(before, before, threshold=0.9), [])
+        print("✅ Test Différences entre deux instantanés du cluster passé.")
+
+    def test_watcher_shares_one_poll(self):
+        async def scenario():
+            client = FakeClient()
+            watcher = ClusterWatcher(client, interval=3600)
+            async with watcher.subscribe() as first, watcher.subscribe() as second:
+                await asyncio.sleep(0)  # poller takes the baseline
+                client.resources = resources(status='stopped')
+                client.tasks = client.tasks + [{'upid': 'UPID:pve1:2', 'node': 'pve1', 'type': 'qmstop', 'status': 'OK', 'endtime': 20}]
+                await watcher.poll()
+                received = [await first.get(), await first.get()], [await second.get(), await second.get()]
+                running = watcher._task is not None
+                # A reconnecting client only gets the events after the last one it saw
+                async with watcher.subscribe(last_event_id=1) as late:
+                    replayed = late.get_nowait()
+            return client, watcher, received, running, replayed
+
+        # Execute
+        client, watcher, (first, second), running, replayed = asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(client.calls, 2)
+        self.assertEqual([e['type'] for e in first], ['guest_stopped', 'task_finished'])
+        self.assertEqual(first, second)
+        self.assertEqual([e['id'] for e in first], [1, 2])
+        self.assertEqual(replayed['id'], 2)
+        self.assertTrue(running)
+        self.assertIsNone(watcher._task)
+        self.assertEqual(watcher.subscribers, 0)
+        print("✅ Test Une seule interrogation partagée par les abonnés passé.")
+
+    def test_slow_subscriber_drops_oldest(self):
+        async def scenario():
+            watcher = ClusterWatcher(FakeClient(), interval=3600, queue_size=2)
+            async with watcher.subscribe() as queue:
+                for i in range(1, 4):
+                    watcher._publish({'id': i, 'type': 'guest_started'})
+                return watcher, [queue.get_nowait()['id'] for _ in range(queue.qsize())]
+
+        # Execute
+        watcher, ids = asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(ids, [2, 3])
+        self.assertEqual(watcher.dropped, 1)
+        print("✅ Test Abonné lent (événements les plus anciens abandonnés) passé.")
+
+    def test_endpoint_rejects_unknown_type(self):
+        previous = api.proxmox, api.watcher
+        api.proxmox = FakeClient()
+        api.watcher = ClusterWatcher(api.proxmox, interval=3600)
+        try:
+            # Execute
+            resp = TestClient(api.app).get('/events', params={'types': 'guest_started,bogus'})
+        finally:
+            api.proxmox, api.watcher = previous
+
+        # Verify
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('bogus', resp.json()['detail'])
+        print("✅ Test Type d'événement inconnu refusé passé.")
+
+if __name__ == '__main__':
+    unittest.main()
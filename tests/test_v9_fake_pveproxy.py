@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from src.async_client import AsyncProxmoxClient
+from tests.fake_pveproxy import FakeCluster, FakePveProxy
+
+class TestFakePveProxy(unittest.TestCase):
+    """Socket-level checks of the async client against the fake pveproxy (HTTPS, keep-alive)."""
+
+    def setUp(self):
+        self.proxy = FakePveProxy(FakeCluster(nodes=3, guests=30), node_latency={'pve3': 2}).start()
+
+    def tearDown(self):
+        self.proxy.stop()
+
+    def _run(self, scenario):
+        async def wrapper():
+            client = AsyncProxmoxClient()
+            try:
+                return await scenario(client)
+            finally:
+                await client.aclose()
+        with patch.dict('os.environ', self.proxy.env()):
+            return asyncio.run(wrapper())
+
+    def test_inventory_and_power(self):
+        async def scenario(client):
+            machines = await client.get_all_machines()
+            rows = await client.bulk_set_machine_state('start', vmids=[100, 101])
+            return machines, rows, client.get_pool_stats()
+
+        # Execute
+        machines, rows, pool = self._run(scenario)
+
+        # Verify
+        self.assertEqual(len(machines), 30)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({self.proxy.cluster.guests[v]['status'] for v in (100, 101)}, {'running'})
+        self.assertEqual(self.proxy.requests[('GET', '/cluster/resources')], 1)
+        self.assertEqual(pool['tls_handshakes'], pool['new_connections'])
+        print("✅ Test Faux pveproxy : inventaire et actions (HTTPS) passé.")
+
+    @patch.dict('os.environ', {'PROXMOX_NODE_TIMEOUT': '0.5'})
+    def test_slow_node_partial_result(self):
+        async def scenario(client):
+            machines = await client.get_all_machines()
+            return await client.get_machines_rrd_data(machines, 'hour')
+
+        # Execute
+        fetched = self._run(scenario)
+        series = dict(fetched)
+
+        # Verify
+        guests = self.proxy.cluster.guests
+        self.assertEqual(set(series), {v for v, g in guests.items() if g['node'] != 'pve3'})
+        self.assertEqual({f['node'] for f in fetched.failures}, {'pve3'})
+        self.assertEqual(len(series[100]), 70)
+        print("✅ Test Faux pveproxy : nœud lent passé.")
+
+if __name__ == '__main__':
+    unittest.main()
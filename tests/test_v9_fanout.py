@@ -0,0 +1,60 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from src.client import ProxmoxClient
+from src.fanout import FanOut
+
+class TestFanOut(unittest.TestCase):
+
+    @patch('src.client.ProxmoxAPI')
+    @patch.dict('os.environ', {
+        'PROXMOX_URL': 'https://test.proxmox.com:8006',
+        'PROXMOX_USER': 'root@pam',
+        'PROXMOX_TOKEN_ID': 'test-id',
+        'PROXMOX_TOKEN_SECRET': 'test-secret',
+        'PROXMOX_VERIFY_SSL': 'false'
+    })
+    def test_get_all_machines_partial(self, mock_api_cls):
+        mock_api_instance = MagicMock()
+        mock_api_cls.return_value = mock_api_instance
+        client = ProxmoxClient()
+
+        pve1, pve2 = MagicMock(), MagicMock()
+        pve1.qemu.get.return_value = [{'vmid': 100, 'name': 'web'}]
+        pve1.lxc.get.return_value = [{'vmid': 200, 'name': 'dns'}]
+        pve2.qemu.get.side_effect = Exception("connection refused")
+        pve2.lxc.get.return_value = []
+        mock_api_instance.nodes.get.return_value = [{'node': 'pve1'}, {'node': 'pve2'}]
+        mock_api_instance.nodes.side_effect = {'pve1': pve1, 'pve2': pve2}.get
+        mock_api_instance.cluster.resources.get.side_effect = Exception("403 Forbidden")
+
+        # Execute
+        machines = client.get_all_machines()
+
+        # Verify
+        self.assertEqual([(m['vmid'], m['type'], m['node']) for m in machines], [(100, 'qemu', 'pve1'), (200, 'lxc', 'pve1')])
+        self.assertEqual(machines.failures, [{'node': 'pve2', 'resource': 'qemu', 'reason': 'error', 'error': 'connection refused'}])
+        print("✅ Test Fan-out get_all_machines (résultats partiels) passé.")
+
+    def test_node_deadline(self):
+        fanout = FanOut(max_workers=4, timeout=0.2)
+
+        def fetch(node, resource):
+            if node == 'slow':
+                time.sleep(1)
+            return node
+
+        # Execute
+        start = time.monotonic()
+        result = fanout.run(fetch, [('pve1', 'status'), ('slow', 'status'), ('pve2', 'status')])
+        elapsed = time.monotonic() - start
+
+        # Verify
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(list(result), [('pve1', 'status', 'pve1'), ('pve2', 'status', 'pve2')])
+        self.assertEqual(result.failures[0]['node'], 'slow')
+        self.assertEqual(result.failures[0]['reason'], 'timeout')
+        print("✅ Test Fan-out deadline par nœud passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from src.async_client import AsyncProxmoxClient
+from src.fleet import fleet_summary, select_fleet
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+MACHINES = [
+    {'type': 'qemu', 'vmid': 100, 'node': 'pve1', 'tags': 'prod'},
+    {'type': 'lxc', 'vmid': 101, 'node': 'pve1', 'tags': 'prod;web'},
+    {'type': 'qemu', 'vmid': 102, 'node': 'pve2'},
+    {'type': 'qemu', 'vmid': 900, 'node': 'pve2', 'template': 1},
+]
+
+SERIES = {
+    100: [{'time': 60, 'cpu': 0.1}, {'time': 120, 'cpu': 0.3}],
+    101: [{'time': 60, 'cpu': 0.5}, {'time': 120, 'cpu': float('nan')}],
+    102: [{'time': 120, 'cpu': 0.9}],
+}
+
+class TestFleet(unittest.TestCase):
+
+    def test_batch_rrd_fetch(self):
+        requests = []
+        routes = {'/nodes/pve1/qemu/100/rrddata': SERIES[100], '/nodes/pve1/lxc/101/rrddata': SERIES[101][:1]}
+
+        def handler(request):
+            path = request.url.path.replace('/api2/json', '', 1)
+            requests.append((path, request.url.params['timeframe']))
+            if path not in routes:
+                return httpx.Response(500, json={'data': None})
+            return httpx.Response(200, json={'data': routes[path]})
+
+        with patch.dict('os.environ', ENV):
+            client = AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+        # Execute
+        fetched = asyncio.run(client.get_machines_rrd_data(select_fleet(MACHINES), 'day'))
+
+        # Verify
+        self.assertEqual(dict(fetched), {100: SERIES[100], 101: SERIES[101][:1]})
+        self.assertEqual([(f['node'], f['resource']) for f in fetched.failures], [('pve2', 102)])
+        self.assertIn(('/nodes/pve1/lxc/101/rrddata', 'day'), requests)
+        self.assertEqual(len(requests), 3)
+        print("✅ Test Récupération RRD groupée (échecs isolés) passé.")
+
+    def test_aggregates_and_groups(self):
+        # Execute
+        fleet = fleet_summary(MACHINES, SERIES, 'cpu')
+        by_node = fleet_summary(MACHINES, SERIES, 'cpu', 'node')
+        by_tag = fleet_summary(MACHINES, SERIES, 'cpu', 'tag')
+
+        # Verify
+        first, second = fleet['groups']['all']['points']
+        self.assertEqual((first['time'], first['count']), (60, 2))
+        self.assertAlmostEqual(first['sum'], 0.6)
+        self.assertEqual((second['count'], second['p50'], second['p99']), (2, 0.3, 0.9))
+        self.assertEqual({k: g['guests'] for k, g in by_node['groups'].items()}, {'pve1': [100, 101], 'pve2': [102]})
+        self.assertEqual({k: g['guests'] for k, g in by_tag['groups'].items()}, {'(sans tag)': [102], 'prod': [100, 101], 'web': [101]})
+        with self.assertRaises(ValueError):
+            fleet_summary(MACHINES, SERIES, 'cpu', 'pool')
+        print("✅ Test Agrégats de flotte (alignement, percentiles, groupes) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from src.async_client import AsyncProxmoxClient
+from src.forecast import DAY, capacity_targets, capacity_forecasts, forecast_usage
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+NOW = 1700000000
+# 30 days growing 1 GB/day from 40 GB out of 100 GB, with a one-night 30 GB spike
+GROWING = [
+    {'time': NOW - DAY * (29 - i), 'used': (40 + i + (30 if i == 20 else 0)) * 2**30, 'total': 100 * 2**30}
+    for i in range(30)
+]
+
+class TestForecast(unittest.TestCase):
+
+    def test_forecast_eta(self):
+        # Execute
+        robust = forecast_usage(GROWING, 'used', 'total', 0.95, 'theil-sen', NOW)
+        flat = forecast_usage([dict(p, used=50 * 2**30) for p in GROWING], 'used', 'total', 0.95, now=NOW)
+        full = forecast_usage(GROWING, 'used', 'total', 0.5, now=NOW)
+
+        # Verify
+        self.assertAlmostEqual(robust['growth_per_day'], 2**30)
+        self.assertAlmostEqual(robust['days_left'], 26.0)  # 69 GB today, 95 GB in 26 days
+        self.assertIsNone(flat['eta'])
+        self.assertEqual((full['days_left'], full['eta']), (0.0, NOW))
+        with self.assertRaises(ValueError):
+            forecast_usage(GROWING, 'used', 'total', method='bogus')
+        print("✅ Test Prévision d'échéance (Theil-Sen robuste au pic) passé.")
+
+    def test_targets_and_ordering(self):
+        storages = [
+            {'node': 'pve1', 'storage': 'local', 'active': 1, 'shared': 0},
+            {'node': 'pve1', 'storage': 'nas', 'active': 1, 'shared': 1},
+            {'node': 'pve2', 'storage': 'nas', 'active': 1, 'shared': 1},
+            {'node': 'pve2', 'storage': 'usb', 'active': 0, 'shared': 0},
+        ]
+
+        # Execute
+        targets = capacity_targets(['pve1', 'pve2'], storages)
+        forecasts = capacity_forecasts([('pve1', None, [{'time': NOW, 'memused': 1, 'memtotal': 2}]), ('pve1', 'local', GROWING)], now=NOW)
+
+        # Verify
+        self.assertEqual(targets, [('pve1', None), ('pve2', None), ('pve1', 'local'), ('pve1', 'nas')])
+        self.assertEqual(capacity_targets(['pve1', 'pve2'], storages, storage='nas'), [('pve1', 'nas')])
+        self.assertEqual([(f['storage'], f['resource']) for f in forecasts], [('local', 'storage'), (None, 'memory')])
+        print("✅ Test Cibles de prévision (stockages partagés lus une fois) passé.")
+
+    def test_node_and_storage_rrd(self):
+        requests = []
+
+        def handler(request):
+            requests.append((request.url.path, dict(request.url.params)))
+            if '/storage/' in request.url.path:
+                return httpx.Response(500, json={'data': None, 'errors': {'storage': "storage 'nas' is not online"}})
+            return httpx.Response(200, json={'data': [{'time': NOW, 'memused': 1}]})
+
+        with patch.dict('os.environ', ENV):
+            client = AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+        # Execute
+        fetched = asyncio.run(client.get_capacity_rrd_data([('pve1', None), ('pve1', 'nas')], 'month'))
+
+        # Verify
+        self.assertEqual(sorted(requests), [('/api2/json/nodes/pve1/rrddata', {'timeframe': 'month'}),
+                                            ('/api2/json/nodes/pve1/storage/nas/rrddata', {'timeframe': 'month'})])
+        self.assertEqual(list(fetched), [('pve1', None, [{'time': NOW, 'memused': 1}])])
+        self.assertEqual(fetched.failures[0]['resource'], 'nas')
+        print("✅ Test RRD nœud et stockage passé.")
+
+if __name__ == '__main__':
+    unittest.main()
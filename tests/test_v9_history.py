@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from src.history import HistoryStore, HistoryCollector
+from src.rrd import summarize
+
+DAY = 86400
+TIERS = [(0, 1 * DAY), (300, 7 * DAY), (3600, 30 * DAY)]
+NOW = 1700000000 - 1700000000 % 3600 + 3600 * 24 * 10
+
+class TestHistory(unittest.TestCase):
+
+    def test_rollup_and_retention(self):
+        store = HistoryStore(':memory:', TIERS)
+        start = NOW - 2 * DAY
+        # Two days of samples every minute, one CPU spike
+        for i in range(0, 2 * DAY, 60):
+            store.record(start + i, [{'vmid': 100, 'cpu': 0.9 if i == 3600 else 0.1, 'mem': 1000}])
+
+        # Execute
+        deleted = store.maintain(NOW)
+
+        # Verify
+        self.assertEqual(deleted, DAY // 60)  # raw samples older than one day
+        recent = store.query(100, NOW - 3600, now=NOW)
+        self.assertEqual(len(recent), 60)
+        self.assertEqual(recent[0]['count'], 1)
+        older = store.query(100, start, now=NOW)  # beyond raw retention: 5 min tier
+        self.assertEqual(len(older), 2 * DAY // 300)
+        spike = [p for p in older if p['cpu_max'] == 0.9]
+        self.assertEqual(len(spike), 1)
+        self.assertAlmostEqual(spike[0]['cpu'], (0.9 + 4 * 0.1) / 5)
+        self.assertEqual(summarize(older, 4)['overall']['cpu']['max'], 0.9)
+        self.assertEqual(store.oldest(100), start)
+        print("✅ Test Historique local (rollup 5 min, rétention) passé.")
+
+    def test_collector_counter_rates(self):
+        client = MagicMock()
+        client.get_cluster_resources = AsyncMock()
+        collector = HistoryCollector(client, HistoryStore(':memory:', TIERS), interval=60)
+
+        # Execute
+        first = collector.rows(1000, [{'type': 'qemu', 'vmid': 100, 'cpu': 0.5, 'netin': 1000, 'diskread': 500},
+                                      {'type': 'qemu', 'vmid': 900, 'template': 1}])
+        second = collector.rows(1010, [{'type': 'qemu', 'vmid': 100, 'cpu': 0.5, 'netin': 6000, 'diskread': 100}])
+
+        # Verify
+        self.assertEqual([r['vmid'] for r in first], [100])
+        self.assertNotIn('netin', first[0])
+        self.assertEqual(second[0]['netin'], 500.0)
+        self.assertNotIn('diskread', second[0])  # counter reset (guest restarted)
+        print("✅ Test Collecteur (compteurs convertis en débits) passé.")
+
+    def test_collector_sample(self):
+        client = MagicMock()
+        client.get_cluster_resources = AsyncMock(return_value=[{'type': 'lxc', 'vmid': 101, 'cpu': 0.2, 'mem': 10}])
+        store = HistoryStore(':memory:', TIERS)
+        collector = HistoryCollector(client, store, interval=60)
+
+        # Execute
+        count = asyncio.run(collector.sample())
+
+        # Verify
+        client.get_cluster_resources.assert_awaited_once_with('vm')
+        self.assertEqual(count, 1)
+        self.assertEqual(store.stats()[0], 1)
+        print("✅ Test Collecteur (un seul appel /cluster/resources) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import src.api as api
+from src.async_client import AsyncProxmoxClient
+from tests.fake_pveproxy import FakeCluster, FakePveProxy
+
+class TestHttpCache(unittest.TestCase):
+    """ETag / If-None-Match and gzip on the REST listings, against the fake pveproxy."""
+
+    def setUp(self):
+        self.proxy = FakePveProxy(FakeCluster(nodes=2, guests=200)).start()
+        with patch.dict('os.environ', self.proxy.env()):
+            self.client = AsyncProxmoxClient()
+        self.previous, api.proxmox = api.proxmox, self.client
+        # One event loop for the whole test (the lifespan closes the client on exit)
+        self.http = TestClient(api.app).__enter__()
+
+    def tearDown(self):
+        self.http.__exit__(None, None, None)
+        api.proxmox = self.previous
+        self.proxy.stop()
+
+    def test_not_modified(self):
+        # Execute
+        first = self.http.get('/machines')
+        again = self.http.get('/machines', headers={'If-None-Match': first.headers['etag']})
+        self.proxy.cluster.guests[100]['status'] = 'paused'
+        self.client.cache.clear()
+        changed = self.http.get('/machines', headers={'If-None-Match': first.headers['etag']})
+
+        # Verify
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.headers['etag'].startswith('W/"'))
+        self.assertEqual((again.status_code, again.content), (304, b''))
+        self.assertEqual(again.headers['x-total-count'], '200')
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['etag'], first.headers['etag'])
+        print("✅ Test ETag / If-None-Match (304 tant que rien ne change) passé.")
+
+    def test_gzip_large_listing(self):
+        # Execute
+        compressed = self.http.get('/machines', headers={'Accept-Encoding': 'gzip'})
+        small = self.http.get('/storage', params={'content_filter': 'vztmpl'}, headers={'Accept-Encoding': 'gzip'})
+
+        # Verify
+        self.assertEqual(compressed.headers['content-encoding'], 'gzip')
+        self.assertLess(int(compressed.headers['content-length']), len(compressed.content))
+        self.assertEqual(len(compressed.json()), 200)
+        self.assertNotIn('content-encoding', small.headers)
+        print("✅ Test Compression gzip des grosses listes passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from src.async_client import AsyncProxmoxClient
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+def make_client(routes, requests):
+    """AsyncProxmoxClient answering GET <path> from `routes`, logging every request in `requests`."""
+    def handler(request):
+        requests.append(request)
+        path = request.url.path.replace('/api2/json', '', 1)
+        if path not in routes:
+            return httpx.Response(404, json={'data': None})
+        return httpx.Response(200, json={'data': routes[path]})
+
+    with patch.dict('os.environ', ENV):
+        return AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+class TestClusterInventory(unittest.TestCase):
+
+    def test_get_all_machines_single_call(self):
+        requests = []
+        client = make_client({'/cluster/resources': [
+            {'id': 'qemu/100', 'type': 'qemu', 'vmid': 100, 'name': 'web', 'node': 'pve1', 'status': 'running'},
+            {'id': 'lxc/200', 'type': 'lxc', 'vmid': 200, 'name': 'dns', 'node': 'pve2', 'status': 'stopped'}
+        ]}, requests)
+
+        # Execute
+        machines = asyncio.run(client.get_all_machines())
+
+        # Verify
+        self.assertEqual([(r.url.path, r.url.params['type']) for r in requests], [('/api2/json/cluster/resources', 'vm')])
+        self.assertEqual([(m['vmid'], m['type'], m['node']) for m in machines], [(100, 'qemu', 'pve1'), (200, 'lxc', 'pve2')])
+        print("✅ Test Inventaire machines via /cluster/resources passé.")
+
+    def test_get_all_storage_fallback_for_missing_content(self):
+        requests = []
+        client = make_client({
+            '/cluster/resources': [
+                {'id': 'storage/pve1/local', 'type': 'storage', 'storage': 'local', 'node': 'pve1', 'plugintype': 'dir',
+                 'content': 'iso,backup', 'disk': 250, 'maxdisk': 1000, 'shared': 0, 'status': 'available'},
+                {'id': 'storage/pve2/local', 'type': 'storage', 'storage': 'local', 'node': 'pve2', 'plugintype': 'dir',
+                 'disk': 10, 'maxdisk': 100, 'shared': 0, 'status': 'available'}
+            ],
+            '/nodes/pve2/storage': [{'storage': 'local', 'type': 'dir', 'content': 'iso', 'active': 1}],
+        }, requests)
+
+        # Execute
+        storages = asyncio.run(client.get_all_storage(['pve1', 'pve2']))
+
+        # Verify
+        self.assertEqual([r.url.path for r in requests], ['/api2/json/cluster/resources', '/api2/json/nodes/pve2/storage'])
+        self.assertEqual(storages[0]['type'], 'dir')
+        self.assertEqual(storages[0]['avail'], 750)
+        self.assertEqual(storages[0]['active'], 1)
+        self.assertEqual(storages[1]['node'], 'pve2')
+        self.assertEqual(storages[1]['content'], 'iso')
+        print("✅ Test Inventaire stockage via /cluster/resources passé.")
+
+    def test_get_all_node_resources_offline(self):
+        client = make_client({'/cluster/resources': [
+            {'id': 'node/pve1', 'type': 'node', 'node': 'pve1', 'status': 'online', 'cpu': 0.25, 'mem': 4, 'maxmem': 16},
+            {'id': 'node/pve2', 'type': 'node', 'node': 'pve2', 'status': 'offline'}
+        ]}, [])
+
+        # Execute
+        resources = asyncio.run(client.get_all_node_resources())
+
+        # Verify
+        self.assertEqual(len(resources), 1)
+        self.assertEqual(resources[0]['memory'], {'used': 4, 'total': 16, 'free': 12})
+        self.assertEqual(resources.failures[0]['node'], 'pve2')
+        self.assertEqual(resources.failures[0]['reason'], 'offline')
+        print("✅ Test Inventaire nœuds via /cluster/resources passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import asyncio
+import unittest
+import tempfile
+import subprocess
+from unittest.mock import MagicMock
+from src.lazy import LazyClient
+
+class TestLazyClient(unittest.TestCase):
+
+    def test_built_on_first_use(self):
+        client = MagicMock()
+        factory = MagicMock(return_value=client)
+
+        # Execute
+        lazy = LazyClient(factory)
+        built_at_start = lazy.built
+        ready = bool(lazy)
+        lazy.get_nodes()
+        lazy.get_nodes()
+
+        # Verify
+        self.assertFalse(built_at_start)
+        self.assertTrue(ready)
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(client.get_nodes.call_count, 2)
+        print("✅ Test Client construit au premier usage passé.")
+
+    def test_retry_after_failure(self):
+        factory = MagicMock(side_effect=[ValueError("PROXMOX_URL is not set in .env"), MagicMock()])
+
+        # Execute
+        patient = LazyClient(factory, retry_interval=3600)
+        first, again = bool(patient), bool(patient)
+        with self.assertRaises(RuntimeError) as ctx:
+            patient.get_nodes()
+        patient.retry_interval = 0
+        recovered = bool(patient)
+
+        # Verify
+        self.assertEqual((first, again, recovered), (False, False, True))
+        self.assertIn("PROXMOX_URL", str(ctx.exception))
+        self.assertEqual(factory.call_count, 2)
+        self.assertIsNone(patient.error)
+        print("✅ Test Nouvel essai après un échec d'initialisation passé.")
+
+    def test_aclose_without_client(self):
+        factory = MagicMock()
+
+        # Execute
+        asyncio.run(LazyClient(factory).aclose())
+
+        # Verify
+        factory.assert_not_called()
+        print("✅ Test Fermeture sans client construit passé.")
+
+    def test_server_import_is_lazy(self):
+        # Fresh interpreter without any Proxmox setting: the import must not build the client,
+        # open the audit log nor create the history database
+        code = ("import os, sys, json, logging; import src.server as s; "
+                "print(json.dumps({'built': s.proxmox.built, 'client': 'src.async_client' in sys.modules, "
+                "'requests': 'requests' in sys.modules, 'ready': bool(s.proxmox), "
+                "'audit_log': any(isinstance(h, logging.FileHandler) for h in logging.getLogger().handlers), "
+                "'history_db': os.path.exists(os.environ['PROXMOX_HISTORY_DB']), 'collector': s.collector is not None}))")
+
+        # Execute
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {'PATH': '', 'PROXMOX_URL': '', 'PROXMOX_HISTORY_DB': os.path.join(tmp, 'history.db')}
+            done = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=60)
+
+        # Verify
+        self.assertEqual(done.returncode, 0, done.stderr)
+        state = json.loads(done.stdout.strip().splitlines()[-1])
+        self.assertEqual(state, {'built': False, 'client': False, 'requests': False, 'ready': False,
+                                 'audit_log': False, 'history_db': False, 'collector': True})
+        print("✅ Test Import du serveur sans construire le client passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from tests.load_api import compare, summarize
+
+SAMPLES = [('/machines', 200, 0.010 * (i + 1)) for i in range(10)] + [('/storage', 200, 0.005), ('/storage', 502, 0.5)]
+
+class TestLoadHarness(unittest.TestCase):
+
+    def test_summary(self):
+        # Execute
+        summary = summarize(SAMPLES, elapsed=2.0, upstream=6)
+
+        # Verify
+        self.assertEqual((summary['requests'], summary['errors'], summary['throughput']), (12, 1, 6.0))
+        self.assertEqual(summary['upstream_per_request'], 0.5)
+        machines = summary['endpoints']['/machines']
+        self.assertAlmostEqual(machines['p50'], 0.05)  # nearest rank
+        self.assertAlmostEqual(machines['p99'], 0.1)
+        self.assertEqual(summary['endpoints']['/storage']['errors'], 1)
+        print("✅ Test Résumé de charge (débit, percentiles, appels amont) passé.")
+
+    def test_compare_flags_regressions(self):
+        baseline = summarize(SAMPLES, elapsed=2.0)
+        slower = summarize([(e, s, t * 1.5) for e, s, t in SAMPLES], elapsed=2.0)
+        jitter = summarize([(e, s, t * 1.05) for e, s, t in SAMPLES], elapsed=2.05)
+
+        # Execute
+        regressions = compare(slower, baseline, tolerance=0.10)
+
+        # Verify
+        self.assertIn("global : p95", " ".join(regressions))
+        self.assertTrue(any(r.startswith("/machines : p99") for r in regressions))
+        self.assertEqual(compare(jitter, baseline, tolerance=0.10), [])
+        print("✅ Test Comparaison de runs (régressions au-delà de la tolérance) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from src.async_client import AsyncProxmoxClient
+from src.locations import LocationIndex
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+RESOURCES = [
+    {'type': 'qemu', 'vmid': 100, 'node': 'pve1', 'name': 'web', 'status': 'running'},
+    {'type': 'lxc', 'vmid': 200, 'node': 'pve2', 'name': 'dns', 'status': 'running'},
+]
+
+UPID_MIGRATE = "UPID:pve1:00001234:00ABCDEF:65000000:qmigrate:100:root@pam:"
+UPID_CLONE = "UPID:pve1:00001235:00ABCDF0:65000002:qmclone:100:root@pam:"
+
+def make_client(requests, tasks=None):
+    """AsyncProxmoxClient serving RESOURCES and the `tasks` list, answering migrations and clones with a UPID."""
+    def handler(request):
+        requests.append(request)
+        path = request.url.path
+        if path.endswith('/cluster/resources'):
+            return httpx.Response(200, json={'data': RESOURCES})
+        if path.endswith('/cluster/tasks'):
+            return httpx.Response(200, json={'data': tasks or []})
+        return httpx.Response(200, json={'data': UPID_MIGRATE if path.endswith('/migrate') else UPID_CLONE})
+
+    with patch.dict('os.environ', ENV):
+        return AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+class TestLocationIndex(unittest.TestCase):
+
+    def test_locate_and_migrate(self):
+        requests, tasks = [], []
+        client = make_client(requests, tasks)
+
+        async def scenario():
+            first = await client.locate(100)
+            second = await client.locate(200)
+            await client.migrate_machine("pve1", 100, "qemu", "pve2")
+            during = await client.locate(100)
+            tasks.append({'upid': UPID_MIGRATE, 'endtime': 0x65000000 + 30, 'status': 'OK'})
+            await client.poll_tasks()
+            return first, second, during, await client.locate(100)
+
+        # Execute
+        first, second, during, migrated = asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(first, ('pve1', 'qemu'))
+        self.assertEqual(second, ('pve2', 'lxc'))
+        self.assertEqual(during, ('pve1', 'qemu'))  # still where the inventory shows it while the task runs
+        self.assertEqual(migrated, ('pve2', 'qemu'))
+        self.assertEqual(sum(r.url.path.endswith('/cluster/resources') for r in requests), 2)
+        with self.assertRaises(ValueError):
+            asyncio.run(client.locate(999))
+        print("✅ Test Index vmid -> (nœud, type) passé.")
+
+    def test_failed_tasks_not_indexed(self):
+        requests, tasks = [], []
+        client = make_client(requests, tasks)
+
+        async def scenario():
+            await client.locate(100)
+            await client.migrate_machine("pve1", 100, "qemu", "pve2")
+            await client.clone_machine("pve1", 100, 300, "web-copy", "qemu", target_node="pve2")
+            tasks.extend([
+                {'upid': UPID_MIGRATE, 'endtime': 0x65000000 + 5, 'status': 'migration aborted'},
+                {'upid': UPID_CLONE, 'endtime': 0x65000002 + 5, 'status': 'clone failed: no space left'},
+            ])
+            await client.poll_tasks()
+            return await client.locate(100)
+
+        # Execute
+        located = asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(located, ('pve1', 'qemu'))
+        self.assertIsNone(client.locations.get(300))
+        with self.assertRaises(ValueError):
+            asyncio.run(client.locate(300))
+        print("✅ Test Migration et clone échoués non indexés passé.")
+
+    def test_unlock_uses_indexed_type(self):
+        requests = []
+        client = make_client(requests)
+        client.locations.set(200, 'pve1', 'lxc')
+
+        # Execute
+        asyncio.run(client.unlock_machine("pve1", 200))
+
+        # Verify
+        self.assertEqual([(r.method, r.url.path, r.content) for r in requests],
+                         [('POST', '/api2/json/nodes/pve1/lxc/200/config', b'delete=lock')])
+        print("✅ Test Unlock avec type indexé passé.")
+
+    def test_incremental_refresh(self):
+        index = LocationIndex(max_age=60)
+        index.refresh([{'vmid': 100, 'node': 'pve1', 'type': 'qemu'}, {'vmid': 101, 'node': 'pve1', 'type': 'qemu'}])
+
+        # Execute
+        partial = index.refresh([{'vmid': 100, 'node': 'pve2', 'type': 'qemu'}], complete=False)
+        full = index.refresh([{'vmid': 100, 'node': 'pve2', 'type': 'qemu'}])
+
+        # Verify
+        self.assertEqual((partial, full), (1, 1))
+        self.assertEqual(index.get(101), None)
+        self.assertFalse(index.stale)
+        print("✅ Test Rafraîchissement incrémental de l'index passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+import httpx
+from proxmoxer.core import ResourceException
+from src.async_client import AsyncProxmoxClient
+from src import server
+from src.lazy import LazyClient
+from src.metrics import Registry, ERRORS, UPSTREAM_REQUESTS, UPSTREAM_BYTES, path_template, track
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false'
+}
+
+class TestMetrics(unittest.TestCase):
+
+    def test_path_template(self):
+        # Execute
+        paths = [
+            path_template('/api2/json/nodes/pve1/qemu/100/status/current'),
+            path_template('https://pve:8006/api2/json/nodes/pve2/storage/local/content/local:iso/debian.iso?x=1'),
+            path_template('/nodes/storage/lxc/101/snapshot/before-upgrade/rollback'),
+            path_template('/cluster/resources'),
+        ]
+
+        # Verify
+        self.assertEqual(paths, [
+            '/nodes/{node}/qemu/{vmid}/status/current',
+            '/nodes/{node}/storage/{storage}/content/{volume}',
+            '/nodes/{node}/lxc/{vmid}/snapshot/{snapname}/rollback',
+            '/cluster/resources',
+        ])
+        print("✅ Test Gabarits de chemins (faible cardinalité) passé.")
+
+    def test_histogram_exposition(self):
+        registry = Registry()
+        latency = registry.histogram('demo_seconds', 'Demo.', ('tool', 'status'), buckets=(0.1, 1))
+        latency.observe(0.05, tool='a', status='ok')
+        latency.observe(0.5, tool='a', status='ok')
+
+        # Execute
+        with self.assertRaises(RuntimeError):
+            with track('tool', latency, tool='b'):
+                raise RuntimeError("boom")
+        with track('tool', latency, tool='c') as outcome:
+            outcome['status'] = 'error'
+        text = registry.render()
+
+        # Verify
+        self.assertIn('# TYPE demo_seconds histogram', text)
+        self.assertIn('demo_seconds_bucket{tool="a",status="ok",le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{tool="a",status="ok",le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{tool="a",status="ok",le="+Inf"} 2', text)
+        self.assertIn('demo_seconds_count{tool="b",status="error"} 1', text)
+        self.assertIn('demo_seconds_count{tool="c",status="error"} 1', text)
+        print("✅ Test Exposition Prometheus (histogrammes cumulés) passé.")
+
+    def test_client_upstream_metrics(self):
+        with patch.dict('os.environ', ENV):
+            client = AsyncProxmoxClient(transport=httpx.MockTransport(lambda request: httpx.Response(500, json={'data': None})))
+        labels = {'method': 'GET', 'path': '/nodes/{node}/qemu/{vmid}/config'}
+        before = UPSTREAM_REQUESTS.value(status=500, **labels)
+
+        # Execute
+        with self.assertRaises(ResourceException):
+            asyncio.run(client.api.nodes('pve9').qemu(4242).config.get(current=1))
+
+        # Verify
+        self.assertEqual(UPSTREAM_REQUESTS.value(status=500, **labels), before + 1)
+        self.assertGreaterEqual(UPSTREAM_BYTES.value(**labels), 13)
+        self.assertEqual(client.get_call_stats()['slowest'][0]['args'], {'current': 1})
+        print("✅ Test Métriques des appels Proxmox passé.")
+
+    def test_unconfigured_client_counts_as_error(self):
+        # Proxmox unreachable or not configured: the lazy client cannot be built
+        unavailable = LazyClient(MagicMock(side_effect=ValueError("PROXMOX_URL is not set in .env")), retry_interval=3600)
+        before = ERRORS.value(side='tool', error='ClientUnavailable')
+
+        # Execute
+        with patch.object(server, 'proxmox', unavailable):
+            result = asyncio.run(server.mcp.call_tool('list_machines', {}))
+
+        # Verify
+        blocks = result[0] if isinstance(result, tuple) else result
+        self.assertEqual(blocks[0].text, server.NOT_CONFIGURED)
+        self.assertEqual(ERRORS.value(side='tool', error='ClientUnavailable'), before + 1)
+        print("✅ Test Client non configuré compté comme une erreur passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from mcp.types import CallToolResult
+from src import server
+from src.output import render
+from src.fanout import PartialResult
+
+MACHINES = [
+    {'type': 'qemu', 'vmid': 100, 'name': 'web', 'node': 'pve1', 'status': 'running'},
+    {'type': 'lxc', 'vmid': 200, 'name': 'dns', 'node': 'pve2', 'status': 'stopped'},
+]
+
+class TestOutput(unittest.TestCase):
+
+    def test_render_formats(self):
+        data = [{'vmid': 100}]
+
+        # Execute
+        text = render(data, lambda d: f"{len(d)} machine(s)")
+        result = render(data, lambda d: f"{len(d)} machine(s)", 'json')
+
+        # Verify
+        self.assertEqual(text, "1 machine(s)")
+        self.assertIsInstance(result, CallToolResult)
+        self.assertEqual(result.structuredContent, {'result': data})
+        self.assertEqual(json.loads(result.content[0].text), {'result': data})
+        with self.assertRaises(ValueError):
+            render(data, str, 'xml')
+        print("✅ Test Rendu texte / JSON passé.")
+
+    @patch.dict('os.environ', {'PROXMOX_OUTPUT_FORMAT': 'json'})
+    def test_env_default(self):
+        result = render({'vmid': 100}, str)
+
+        # Verify
+        self.assertEqual(result.structuredContent, {'vmid': 100})
+        self.assertEqual(render({'vmid': 100}, lambda d: "texte", 'text'), "texte")
+        print("✅ Test Format par défaut (PROXMOX_OUTPUT_FORMAT) passé.")
+
+    def test_list_machines_json(self):
+        fake = MagicMock()
+        fake.get_all_machines = AsyncMock(return_value=PartialResult(MACHINES, [{'node': 'pve3', 'resource': 'vm', 'reason': 'timeout', 'error': 'timed out'}]))
+
+        # Execute
+        with patch.object(server, 'proxmox', fake):
+            result = asyncio.run(server.list_machines(status_filter='running', output='json'))
+            text = asyncio.run(server.list_machines(status_filter='running'))
+
+        # Verify
+        content = result.structuredContent
+        self.assertEqual(content['machines'], [{'vmid': 100, 'name': 'web', 'type': 'qemu', 'status': 'running', 'node': 'pve1'}])
+        self.assertEqual((content['total'], content['next_cursor']), (1, None))
+        self.assertEqual(content['failures'][0]['node'], 'pve3')
+        self.assertIn("ID: 100 | Nom: web", text)
+        print("✅ Test list_machines en sortie JSON passé.")
+
+if __name__ == '__main__':
+    unittest.main()
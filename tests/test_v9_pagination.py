@@ -0,0 +1,45 @@
+import unittest
+from src.pagination import SnapshotPager, sort_machines
+
+MACHINES = [
+    {'vmid': 102, 'name': 'db', 'mem': 4},
+    {'vmid': 100, 'name': 'Web', 'mem': 2},
+    {'vmid': 101, 'name': 'app', 'mem': 4},
+    {'vmid': 103, 'name': 'new'},
+]
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_walk_is_stable(self):
+        pager = SnapshotPager(ttl=60)
+        listing = sort_machines(list(MACHINES), 'vmid')
+        query = (None, None, None, 'vmid')
+
+        # Execute
+        first = pager.page(3, None, query, listing)
+        listing.clear()  # the inventory changing must not affect later pages
+        second = pager.page(3, first.next_cursor, query)
+
+        # Verify
+        self.assertEqual([m['vmid'] for m in first.items], [100, 101, 102])
+        self.assertEqual([m['vmid'] for m in second.items], [103])
+        self.assertEqual((second.total, second.offset, second.next_cursor), (4, 3, None))
+        with self.assertRaises(ValueError):
+            pager.page(3, first.next_cursor, (None, None, None, 'name'))
+        with self.assertRaises(ValueError):
+            pager.page(3, "not-a-cursor", query)
+        print("✅ Test Pagination par curseur (instantané stable) passé.")
+
+    def test_sort_keys(self):
+        by_mem = [m['vmid'] for m in sort_machines(MACHINES, '-mem')]
+        by_name = [m['vmid'] for m in sort_machines(MACHINES, 'name')]
+
+        # Verify
+        self.assertEqual(by_mem, [102, 101, 100, 103])
+        self.assertEqual(by_name, [101, 102, 103, 100])
+        with self.assertRaises(ValueError):
+            sort_machines(MACHINES, 'bogus')
+        print("✅ Test Clés de tri passé.")
+
+if __name__ == '__main__':
+    unittest.main()
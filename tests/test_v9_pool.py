@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+import httpx
+from src.client import ProxmoxClient
+from src.async_client import AsyncProxmoxClient
+
+class TestConnectionPool(unittest.TestCase):
+
+    @patch('src.client.ProxmoxAPI')
+    @patch.dict('os.environ', {
+        'PROXMOX_URL': 'https://test.proxmox.com:8006',
+        'PROXMOX_USER': 'root@pam',
+        'PROXMOX_TOKEN_ID': 'test-id',
+        'PROXMOX_TOKEN_SECRET': 'test-secret',
+        'PROXMOX_VERIFY_SSL': 'false',
+        'PROXMOX_POOL_MAXSIZE': '32'
+    })
+    def test_sync_pool_mounted(self, mock_api_cls):
+        mock_api_instance = MagicMock()
+        mock_api_cls.return_value = mock_api_instance
+        client = ProxmoxClient()
+
+        # Verify
+        mock_api_instance._store['session'].mount.assert_called_once_with('https://', client.adapter)
+        self.assertEqual(client.adapter._pool_maxsize, 32)
+        self.assertEqual(client.get_pool_stats()['requests'], 0)
+        print("✅ Test Pool de connexions (sync) passé.")
+
+    @patch.dict('os.environ', {
+        'PROXMOX_URL': 'https://test.proxmox.com:8006',
+        'PROXMOX_USER': 'root@pam',
+        'PROXMOX_TOKEN_ID': 'test-id',
+        'PROXMOX_TOKEN_SECRET': 'test-secret',
+        'PROXMOX_VERIFY_SSL': 'false'
+    })
+    def test_async_pool_counters(self):
+        client = AsyncProxmoxClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={'data': []})))
+
+        async def scenario():
+            await client.get_cluster_log()
+            # Simulate httpcore opening one TLS connection for the first request
+            await client._on_trace('connection.connect_tcp.complete', {})
+            await client._on_trace('connection.start_tls.complete', {})
+            await client.get_cluster_log()
+            await client.get_cluster_log()
+
+        # Execute
+        asyncio.run(scenario())
+        stats = client.get_pool_stats()
+
+        # Verify
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['new_connections'], 1)
+        self.assertEqual(stats['tls_handshakes'], 1)
+        self.assertEqual(stats['pool_hits'], 2)
+        print("✅ Test Pool de connexions (async) passé.")
+
+if __name__ == '__main__':
+    unittest.main()
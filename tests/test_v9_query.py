@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+import src.api as api
+from src.async_client import AsyncProxmoxClient
+from src.query import parse_number, compile_condition, compile_query, build_query
+from tests.fake_pveproxy import FakeCluster, FakePveProxy
+
+GB = 1024**3
+
+MACHINES = [
+    {'vmid': 100, 'name': 'web-1', 'node': 'pve1', 'type': 'qemu', 'status': 'running', 'cpu': 0.72, 'mem': 6 * GB, 'tags': 'prod;web'},
+    {'vmid': 101, 'name': 'web-2', 'node': 'pve2', 'type': 'qemu', 'status': 'running', 'cpu': 0.10, 'mem': 2 * GB, 'tags': 'prod'},
+    {'vmid': 102, 'name': 'DB-1', 'node': 'pve1', 'type': 'lxc', 'status': 'running', 'cpu': 0.55, 'mem': 8 * GB, 'tags': 'dev'},
+    {'vmid': 103, 'name': 'old', 'node': 'pve2', 'type': 'qemu', 'status': 'stopped', 'mem': 0},
+]
+
+class TestQuery(unittest.TestCase):
+
+    def test_conditions(self):
+        # Execute
+        def matching(condition):
+            predicate = compile_condition(condition)
+            return [m['vmid'] for m in MACHINES if predicate(m)]
+
+        # Verify
+        self.assertEqual(parse_number("4G"), 4 * GB)
+        self.assertEqual(parse_number("512MB"), 512 * 1024**2)
+        self.assertEqual(parse_number("50%"), 0.5)
+        self.assertEqual(matching("mem>4G"), [100, 102])
+        self.assertEqual(matching("cpu >= 55%"), [100, 102])
+        self.assertEqual(matching("cpu<0.5"), [101])  # 103 has no cpu: never matches
+        self.assertEqual(matching("name~db"), [102])
+        self.assertEqual(matching("tag=prod"), [100, 101])
+        self.assertEqual(matching("tag!=prod"), [102, 103])
+        self.assertEqual(matching("status!=running"), [103])
+        for bad in ("mem", "bogus=1", "mem~4G", "name>a", "tag>1", "mem>lots"):
+            with self.assertRaises(ValueError):
+                compile_condition(bad)
+        print("✅ Test Conditions précompilées passé.")
+
+    def test_select_sort_project(self):
+        # Execute
+        query = build_query(where=['mem>1G'], fields=['vmid', 'mem'], sort='-mem', status='running', tag='prod')
+        rows = query.run(MACHINES)
+
+        # Verify
+        self.assertEqual(rows, [{'vmid': 100, 'mem': 6 * GB}, {'vmid': 101, 'mem': 2 * GB}])
+        self.assertEqual(query.where, ('mem>1G', 'status=running', 'tag=prod'))
+        self.assertEqual(build_query(status='running').run(MACHINES)[0],
+                         {'vmid': 100, 'name': 'web-1', 'node': 'pve1', 'type': 'qemu', 'status': 'running', 'uptime': None})
+        self.assertEqual(build_query(fields=['*'], status='running').run(MACHINES)[0], MACHINES[0])
+        self.assertIs(compile_query(('mem>1G',), None, 'vmid'), compile_query(('mem>1G',), None, 'vmid'))
+        with self.assertRaises(ValueError):
+            build_query(fields=['vmid', 'password'])
+        with self.assertRaises(ValueError):
+            build_query(sort='-bogus')
+        print("✅ Test Sélection, tri et projection en une passe passé.")
+
+class TestQueryEndpoint(unittest.TestCase):
+    """/machines with where/fields against the fake pveproxy."""
+
+    def setUp(self):
+        self.proxy = FakePveProxy(FakeCluster(nodes=3, guests=300)).start()
+        with patch.dict('os.environ', self.proxy.env()):
+            self.client = AsyncProxmoxClient()
+        self.previous, api.proxmox = api.proxmox, self.client
+        self.http = TestClient(api.app).__enter__()
+
+    def tearDown(self):
+        self.http.__exit__(None, None, None)
+        api.proxmox = self.previous
+        self.proxy.stop()
+
+    def test_where_and_fields(self):
+        # Execute
+        resp = self.http.get('/machines', params=[('where', 'mem>1G'), ('where', 'type=qemu'), ('node', 'pve2'),
+                                                  ('fields', 'vmid,mem,node'), ('sort', '-mem')])
+        compact = self.http.get('/machines', params={'limit': 1})
+        full = self.http.get('/machines', params={'limit': 1, 'fields': '*'})
+        bad = self.http.get('/machines', params={'where': 'mem>>1'})
+
+        # Verify
+        self.assertEqual(resp.status_code, 200)
+        rows = resp.json()
+        self.assertTrue(rows)
+        self.assertEqual({tuple(r) for r in rows}, {('vmid', 'mem', 'node')})
+        self.assertTrue(all(r['mem'] > 1024**3 and r['node'] == 'pve2' for r in rows))
+        self.assertEqual([r['mem'] for r in rows], sorted((r['mem'] for r in rows), reverse=True))
+        self.assertEqual(set(compact.json()[0]), {'vmid', 'name', 'node', 'type', 'status', 'uptime'})
+        self.assertTrue({'vmid', 'name', 'mem', 'maxmem', 'cpu', 'disk'} <= set(full.json()[0]))
+        self.assertEqual(bad.status_code, 400)
+        print("✅ Test /machines avec where et fields passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from src.rrd import summarize, lttb
+
+# One week at 30 min resolution with a single one-sample CPU spike
+POINTS = [
+    {'time': 1700000000 + 1800 * i, 'cpu': 0.95 if i == 201 else 0.05, 'mem': 2**30, 'netin': 1000.0, 'netout': 500.0}
+    for i in range(336)
+]
+
+class TestRrd(unittest.TestCase):
+
+    def test_buckets_keep_spikes(self):
+        # Execute
+        summary = summarize(POINTS, buckets=12)
+
+        # Verify
+        buckets = summary['points']
+        self.assertEqual(len(buckets), 12)
+        self.assertEqual(sum(b['count'] for b in buckets), 336)
+        self.assertEqual([b['cpu']['max'] for b in buckets].count(0.95), 1)
+        self.assertEqual(summary['overall']['cpu']['max'], 0.95)
+        self.assertIsNone(summary['overall']['diskread'])
+        print("✅ Test Agrégation par intervalles (pics conservés) passé.")
+
+    def test_lttb_keeps_spike_and_ends(self):
+        times = [p['time'] for p in POINTS]
+        values = [p['cpu'] for p in POINTS]
+
+        # Execute
+        kept = lttb(times, values, 10)
+
+        # Verify
+        self.assertEqual(len(kept), 10)
+        self.assertEqual((kept[0], kept[-1]), (0, 335))
+        self.assertIn(201, kept)
+        self.assertEqual(kept, sorted(kept))
+        print("✅ Test LTTB (forme et pics conservés) passé.")
+
+    def test_gaps_and_validation(self):
+        points = [{'time': 3, 'cpu': float('nan')}, {'time': 1, 'cpu': 0.5}, {'time': 2}]
+
+        # Execute
+        summary = summarize(points, buckets=5, method='lttb')
+
+        # Verify
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual([p['time'] for p in summary['points']], [1])
+        with self.assertRaises(ValueError):
+            summarize(points, method='bogus')
+        with self.assertRaises(ValueError):
+            summarize(points, buckets=0)
+        print("✅ Test Données manquantes et validation passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import httpx
+from src.async_client import AsyncProxmoxClient
+from src.tasks import TaskTracker, parse_upid
+
+ENV = {
+    'PROXMOX_URL': 'https://test.proxmox.com:8006',
+    'PROXMOX_USER': 'root@pam',
+    'PROXMOX_TOKEN_ID': 'test-id',
+    'PROXMOX_TOKEN_SECRET': 'test-secret',
+    'PROXMOX_VERIFY_SSL': 'false',
+    'PROXMOX_TASK_POLL_INTERVAL': '0.01',
+    'PROXMOX_TASK_POLL_MAX': '0.02',
+}
+
+UPID_START = "UPID:pve1:00001234:00ABCDEF:65000000:qmstart:100:root@pam:"
+UPID_CLONE = "UPID:pve1:00001235:00ABCDF0:65000002:qmclone:100:root@pam:"
+
+def make_client(handler):
+    with patch.dict('os.environ', ENV):
+        return AsyncProxmoxClient(transport=httpx.MockTransport(handler))
+
+class TestTaskTracker(unittest.TestCase):
+
+    def test_wait_for_task(self):
+        requests = []
+        listings = iter([
+            [{'upid': UPID_START, 'node': 'pve1'}],
+            [{'upid': UPID_START, 'node': 'pve1'}],
+            [{'upid': UPID_START, 'node': 'pve1', 'endtime': 0x65000000 + 3, 'status': 'OK'}],
+        ])
+
+        def handler(request):
+            requests.append(request.url.path)
+            if request.url.path.endswith('/cluster/tasks'):
+                return httpx.Response(200, json={'data': next(listings)})
+            return httpx.Response(200, json={'data': UPID_START})
+
+        client = make_client(handler)
+
+        async def scenario():
+            upid = await client.set_machine_state("pve1", 100, "qemu", "start")
+            return await client.wait_for_task(upid, timeout=5)
+
+        # Execute
+        task = asyncio.run(scenario())
+
+        # Verify
+        self.assertEqual(requests.count('/api2/json/cluster/tasks'), 3)
+        self.assertEqual((task['status'], task['exitstatus'], task['duration'], task['success']), ('stopped', 'OK', 3, True))
+        self.assertNotIn('/api2/json/nodes/pve1/tasks', requests)
+        print("✅ Test wait_for_task avec backoff passé.")
+
+    def test_node_fallback_batches_upids(self):
+        node_calls = []
+
+        def handler(request):
+            if request.url.path.endswith('/cluster/tasks'):
+                return httpx.Response(200, json={'data': []})
+            node_calls.append((request.url.path, dict(request.url.params)))
+            return httpx.Response(200, json={'data': [
+                {'upid': UPID_START, 'endtime': 0x65000000 + 1, 'status': 'OK'},
+                {'upid': UPID_CLONE, 'endtime': 0x65000002 + 9, 'status': 'clone failed: no space left'},
+            ]})
+
+        client = make_client(handler)
+        client.tasks.track(UPID_START)
+        client.tasks.track(UPID_CLONE)
+
+        # Execute
+        finished = asyncio.run(client.poll_tasks())
+
+        # Verify
+        self.assertEqual(node_calls, [('/api2/json/nodes/pve1/tasks', {'source': 'all', 'since': str(0x65000000)})])
+        self.assertEqual([t['success'] for t in finished], [True, False])
+        self.assertEqual(asyncio.run(client.get_task_status(UPID_CLONE))['duration'], 9)
+        print("✅ Test Polling groupé par nœud passé.")
+
+    def test_parse_and_history(self):
+        tracker = TaskTracker(history=1, poll_interval=0.01)
+
+        # Execute
+        tracker.track(UPID_START)
+        tracker.apply([{'upid': UPID_START, 'endtime': 0x65000000 + 1, 'status': 'OK'}])
+        tracker.track(UPID_CLONE)
+
+        # Verify
+        self.assertEqual(parse_upid(UPID_CLONE)['type'], 'qmclone')
+        self.assertEqual([t['upid'] for t in tracker.list()], [UPID_CLONE])
+        with self.assertRaises(ValueError):
+            parse_upid("not-a-upid")
+        print("✅ Test Parsing UPID + historique borné passé.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from src.top import top_consumers
+
+MACHINES = [
+    {'type': 'qemu', 'vmid': 100, 'name': 'web', 'node': 'pve1', 'status': 'running', 'tags': 'prod', 'cpu': 0.2, 'mem': 2, 'maxmem': 4, 'netin': 1000, 'uptime': 10},
+    {'type': 'lxc', 'vmid': 101, 'name': 'dns', 'node': 'pve1', 'status': 'running', 'tags': 'infra', 'cpu': 0.9, 'mem': 1, 'maxmem': 8, 'netin': 9000, 'uptime': 1000},
+    {'type': 'qemu', 'vmid': 102, 'name': 'db', 'node': 'pve2', 'status': 'running', 'tags': 'prod', 'cpu': 0.5, 'mem': 6, 'maxmem': 8, 'netin': 50, 'uptime': 5},
+    {'type': 'qemu', 'vmid': 103, 'name': 'old', 'node': 'pve2', 'status': 'stopped', 'cpu': 0, 'mem': 0, 'maxmem': 8},
+    {'type': 'qemu', 'vmid': 104, 'name': 'batch', 'node': 'pve2', 'status': 'running', 'cpu': 0.9, 'mem': 1, 'maxmem': 2},
+]
+
+class TestTopConsumers(unittest.TestCase):
+
+    def test_top_by_metric(self):
+        # Execute
+        by_cpu = top_consumers(MACHINES, 'cpu', limit=3)
+        by_ratio = top_consumers(MACHINES, 'mem_ratio', limit=1)
+        prod = top_consumers(MACHINES, 'cpu', tag='prod', node='pve2')
+
+        # Verify
+        self.assertEqual([m['vmid'] for m in by_cpu], [101, 104, 102])  # ties broken by vmid
+        self.assertEqual((by_ratio[0]['vmid'], by_ratio[0]['value']), (102, 0.75))
+        self.assertEqual([m['vmid'] for m in prod], [102])
+        with self.assertRaises(ValueError):
+            top_consumers(MACHINES, 'bogus')
+        print("✅ Test Top consommateurs (cpu, ratio mémoire, filtres) passé.")
+
+    def test_io_rates(self):
+        # Execute
+        since_start = top_consumers(MACHINES, 'netin')
+        since_sample = top_consumers(MACHINES, 'netin', previous={101: (90, {'netin': 8000})}, now=100)
+
+        # Verify
+        self.assertEqual([(m['vmid'], m['value']) for m in since_start], [(100, 100.0), (102, 10.0), (101, 9.0)])
+        self.assertEqual(since_sample[0]['vmid'], 100)
+        self.assertEqual(since_sample[1]['value'], 100.0)  # (9000 - 8000) / 10s
+        print("✅ Test Débits I/O (depuis le démarrage / depuis l'échantillon) passé.")
+
+if __name__ == '__main__':
+    unittest.main()